@@ -0,0 +1,70 @@
+"""
+Measures how many messages per second make it through the prefix check.
+
+Compares the old path, which built the prefix list and scanned it with
+str.startswith for every message, to the compiled PrefixMatcher.
+
+    python -m benchmarks.prefix_path [--messages 100000] [--commands 0.03]
+"""
+
+import argparse
+import random
+import timeit
+
+from helpers.prefix_matcher import PrefixMatcher
+
+BOT_ID = 788278464474120202
+PREFIXES = ["db.", "duck ", "!", "?", "quack."]
+MENTIONS = (f"<@{BOT_ID}> ", f"<@!{BOT_ID}> ")
+
+
+def make_messages(count: int, command_ratio: float, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    words = ["hello", "lol", "what", "is", "the", "count", "at", "today", "gg", "nice", ":duck:", "https://x.y"]
+    messages = []
+    for _ in range(count):
+        if rng.random() < command_ratio:
+            messages.append(rng.choice(PREFIXES + list(MENTIONS)) + rng.choice(["help", "ping", "ban @x", "afk"]))
+        elif rng.random() < 0.05:
+            # chat that shares a first character with a prefix, but isn't a command.
+            messages.append(rng.choice(["!!!", "? what", "<:emoji:1>", "dbz is great"]))
+        else:
+            messages.append(" ".join(rng.choice(words) for _ in range(rng.randint(1, 12))))
+    return messages
+
+
+def old_path(messages: list) -> int:
+    matched = 0
+    for content in messages:
+        # what when_mentioned_or(*prefixes)(bot, message) and get_context did per message.
+        prefixes = [*MENTIONS, *PREFIXES]
+        if content.startswith(tuple(prefixes)):
+            matched += next(p for p in prefixes if content.startswith(p)) is not None
+    return matched
+
+
+def new_path(messages: list, matcher: PrefixMatcher) -> int:
+    matched = 0
+    for content in messages:
+        matched += matcher.match(content) is not None
+    return matched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--commands", type=float, default=0.03, help="share of messages that are commands")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages, args.commands)
+    matcher = PrefixMatcher(PREFIXES, MENTIONS)
+    assert old_path(messages) == new_path(messages, matcher)
+
+    for name, run in (("old", lambda: old_path(messages)), ("compiled", lambda: new_path(messages, matcher))):
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"{name:>8}: {len(messages) / best:>12,.0f} messages/s ({best * 1000:.1f}ms per {len(messages):,})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measures how long settling a trade takes, and how many round trips it costs, against the number of items traded.
+
+Compares the old path, which removed and added each item with its own
+statement, to the single transaction bulk settlement. Runs against the
+database in the PSQL_* environment variables the bot uses, on temporary
+tables, so nothing real is touched.
+
+    python -m benchmarks.trade_settlement [--items 1 5 20 50] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import asyncpg
+
+from helpers.trade_settlement import settle
+
+USER1, USER2 = 1, 2
+
+
+async def setup(conn: asyncpg.Connection, items: int) -> None:
+    # temporary tables come first in the search path, so these shadow the real ones on this connection.
+    await conn.execute(
+        """
+        CREATE TEMPORARY TABLE economy (user_id BIGINT PRIMARY KEY, balance BIGINT NOT NULL, deleted BOOLEAN DEFAULT FALSE);
+        CREATE TEMPORARY TABLE inventory (
+            user_id BIGINT, item_id BIGINT, amount BIGINT NOT NULL, PRIMARY KEY (user_id, item_id)
+        );
+        """
+    )
+    await conn.executemany("INSERT INTO economy (user_id, balance) VALUES ($1, 1000000)", [(USER1,), (USER2,)])
+    await conn.copy_records_to_table(
+        "inventory",
+        records=[(user_id, item_id, 10**9) for user_id in (USER1, USER2) for item_id in range(items)],
+        columns=("user_id", "item_id", "amount"),
+    )
+
+
+def make_transfers(items: int) -> list:
+    # each user gives away half of the items.
+    return [(USER1, USER2, i, 1) if i % 2 else (USER2, USER1, i, 1) for i in range(items)]
+
+
+async def old_path(conn: asyncpg.Connection, transfers: list) -> int:
+    # what TradeSession.end_session did: _remove_item then _add_item per item, outside a transaction.
+    for giver, receiver, item_id, amount in transfers:
+        await conn.execute(
+            'UPDATE inventory SET amount = amount - $3 WHERE user_id = $1 AND item_id = $2', giver, item_id, amount
+        )
+        await conn.execute(
+            'INSERT INTO inventory (user_id, item_id, amount) VALUES ($1, $2, $3) '
+            'ON CONFLICT (user_id, item_id) DO UPDATE SET amount = inventory.amount + $3',
+            receiver,
+            item_id,
+            amount,
+        )
+    return len(transfers) * 2
+
+
+async def new_path(conn: asyncpg.Connection, transfers: list) -> int:
+    settlement = await settle(conn, transfers, {USER1: -10, USER2: 10})
+    return settlement.round_trips
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, nargs="+", default=[1, 5, 10, 20, 50, 100])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(
+        user=os.getenv("PSQL_USER"),
+        password=os.getenv("PSQL_PASSWORD"),
+        database=os.getenv("PSQL_DB"),
+        host=os.getenv("PSQL_HOST"),
+        port=os.getenv("PSQL_PORT"),
+    )
+    try:
+        await setup(conn, max(args.items))
+        print(f"{'items':>6} {'path':>6} {'round trips':>12} {'median':>10} {'p95':>10}")
+        for items in args.items:
+            transfers = make_transfers(items)
+            for name, run in (("old", old_path), ("bulk", new_path)):
+                await run(conn, transfers)  # warm up the statement cache
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    round_trips = await run(conn, transfers)
+                    timings.append(time.perf_counter() - start)
+                timings.sort()
+                median = statistics.median(timings) * 1000
+                p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+                print(f"{items:>6} {name:>6} {round_trips:>12} {median:>8.2f}ms {p95:>8.2f}ms")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
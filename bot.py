@@ -53,17 +53,13 @@ class DuckBot(BaseDuck):
     async def get_welcome_channel(self, member: discord.Member):
         if not isinstance(member, discord.Member):
             raise errors.NoWelcomeChannel
-        try:
-            channel = self.welcome_channels[member.guild.id]
-        except KeyError:
-            raise errors.NoWelcomeChannel
-
+        config = await self.guild_config.get(member.guild.id)
+        channel = config.welcome_channel
         if not channel:
             raise errors.NoWelcomeChannel
 
-        welcome_channel = member.guild.get_channel(channel) or (await member.guild.fetch_channel(channel))
+        welcome_channel = config.get_welcome_channel(member.guild) or (await member.guild.fetch_channel(channel))
         if not welcome_channel:
-            self.welcome_channels[member.guild.id] = None
             raise errors.NoWelcomeChannel
         return welcome_channel
 
@@ -8,7 +8,7 @@ from discord.ext import commands
 
 from ._base import EconomyBase
 from .helper_classes import ShopItem, OwnedItem
-from .helper_functions import require_setup, refresh
+from .helper_functions import require_setup
 
 if TYPE_CHECKING:
     from helpers.context import CustomContext
@@ -22,12 +22,15 @@ class BuyAndSell(EconomyBase):
     @require_setup()
     async def inventory(self, ctx: CustomContext, page: typing.Optional[int] = 1, *, search: str = None):
         """View all the items in your inventory."""
+        records = await self.bot.db.fetch(
+            'SELECT item_id, amount FROM inventory WHERE user_id = $1 AND amount > 0', ctx.author.id
+        )
+        owned = {r['item_id']: r['amount'] for r in records if r['item_id'] in self.bot.item_catalog}
         if search is not None:
-            query = "SELECT inventory.item_id, item_name, price, amount FROM inventory, items WHERE SIMILARITY(item_name, $2) > 0.5 AND user_id = $3 AND items.item_id = inventory.item_id AND amount > 0 LIMIT 20 OFFSET $1"
-            result = await self.bot.db.fetch(query, (page - 1) * 10, search, ctx.author.id)
+            items = self.bot.item_catalog.search(search, among=owned)
         else:
-            query = 'SELECT inventory.item_id, item_name, price, amount FROM items, inventory WHERE user_id = $2 AND items.item_id = inventory.item_id AND amount > 0 LIMIT 20 OFFSET $1'
-            result = await self.bot.db.fetch(query, (page - 1) * 10, ctx.author.id)
+            items = [self.bot.item_catalog.get(item_id) for item_id in owned]
+        result = items[(page - 1) * 10 : page * 10]
         if not result and search:
             raise commands.BadArgument('❗ I couldn\'t find anything like that in your **📦 Storage Box**.')
         elif not result and page > 1:
@@ -39,16 +42,14 @@ class BuyAndSell(EconomyBase):
 
         table = []
         for index_number, item in enumerate(result, start=((page - 1) * 10) + 1):
-            item_id, item_name, price, stock = item
-            price = int(price - (price / 10))
-            time = discord.utils.snowflake_time(item_id).strftime('%Y-%m-%d %H:%M:%S')
+            price = int(item.price - (item.price / 10))
+            time = discord.utils.snowflake_time(item.item_id).strftime('%Y-%m-%d %H:%M:%S')
             table.append(
-                f'[{index_number})](https://tiny.one/duckbot "ITEM ID: {item_id}\nADDED AT: {time}") **{item_name}** ◦ {price} {self.coin_name} ◦ {stock} in your inventory'
+                f'[{index_number})](https://tiny.one/duckbot "ITEM ID: {item.item_id}\nADDED AT: {time}") **{item.item_name}** ◦ {price} {self.coin_name} ◦ {owned[item.item_id]} in your inventory'
             )
 
         embed = discord.Embed(title=f'📦 Your Storage Box', description='\n'.join(table), timestamp=ctx.message.created_at)
-        count = await self.bot.db.fetchval("SELECT COUNT(*) FROM items")
-        embed.set_footer(text=f'Page {page} / {math.ceil(count/10)}')
+        embed.set_footer(text=f'Page {page} / {math.ceil(len(items)/10)}')
         await ctx.send(embed=embed)
 
     @commands.command(name='market', aliases=['shop', 'store'])
@@ -57,11 +58,10 @@ class BuyAndSell(EconomyBase):
         """View the market. You can buy items with this command.
         You can also search for items by name."""
         if search is not None:
-            query = ""
-            result = await self.bot.db.fetch(query, (page - 1) * 10, search)
+            items = self.bot.item_catalog.search(search)
         else:
-            query = 'SELECT item_id, item_name, price, stock FROM items ORDER BY stock DESC OFFSET $1 LIMIT 20'
-            result = await self.bot.db.fetch(query, (page - 1) * 10)
+            items = sorted(self.bot.item_catalog, key=lambda item: item.stock, reverse=True)
+        result = items[(page - 1) * 10 : page * 10]
         if not result and search:
             raise commands.BadArgument('❗ No items found with that search and/or page.')
         elif not result and page > 1:
@@ -71,22 +71,19 @@ class BuyAndSell(EconomyBase):
 
         table = []
         for index_number, item in enumerate(result, start=((page - 1) * 10) + 1):
-            item_id, item_name, price, stock = item
-            time = discord.utils.snowflake_time(item_id).strftime('%Y-%m-%d %H:%M:%S')
+            time = discord.utils.snowflake_time(item.item_id).strftime('%Y-%m-%d %H:%M:%S')
             table.append(
-                f'[{index_number})](https://tiny.one/duckbot "ITEM ID: {item_id}\nADDED AT: {time}") **{item_name}** ◦ {price} {self.coin_name} ◦ {stock} in stock'
+                f'[{index_number})](https://tiny.one/duckbot "ITEM ID: {item.item_id}\nADDED AT: {time}") **{item.item_name}** ◦ {item.price} {self.coin_name} ◦ {item.stock} in stock'
             )
 
         embed = discord.Embed(
             title=f'🛒 {self.coin_name} Market', description='\n'.join(table), timestamp=ctx.message.created_at
         )
-        count = await self.bot.db.fetchval("SELECT COUNT(*) FROM items")
-        embed.set_footer(text=f'Page {page} / {math.ceil(count/10)}')
+        embed.set_footer(text=f'Page {page} / {math.ceil(len(items)/10)}')
         await ctx.send(embed=embed)
 
     @commands.command(name='buy', aliases=['purchase', 'buyitem', 'purchaseitem'])
     @require_setup()
-    @refresh()
     @commands.max_concurrency(1, wait=True)
     async def buy(self, ctx: CustomContext, quantity: typing.Optional[int] = 1, *, item: ShopItem):
         """Buy an item from the market."""
@@ -105,7 +102,6 @@ class BuyAndSell(EconomyBase):
 
     @commands.command(name='sell', aliases=['sellitem', 'sellitems'])
     @require_setup()
-    @refresh()
     async def sell(self, ctx: CustomContext, quantity: typing.Optional[int] = 1, *, item: OwnedItem):
         """Sell an item to the market."""
         async with ctx.wallet as wallet:
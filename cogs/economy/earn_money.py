@@ -11,7 +11,7 @@ from errors import (
 )
 from ._base import EconomyBase
 from .helper_classes import Wallet, DuckTrack
-from .helper_functions import require_setup, reset_cooldown, refresh
+from .helper_functions import require_setup, reset_cooldown
 
 if TYPE_CHECKING:
     from helpers.context import CustomContext
@@ -27,7 +27,7 @@ class EarnMoney(EconomyBase):
         """Work to earn a bit of money."""
         async with ctx.wallet as wallet:
             amount = random.randint(20, 50)
-            await wallet.add_money(amount)
+            await wallet.add_money(amount, 'work')
             await ctx.send(
                 random.choice(self.work_messages).format(coin=self.coin_emoji, amount=amount, currency=self.coin_name)
             )
@@ -39,7 +39,7 @@ class EarnMoney(EconomyBase):
         """Gets a daily reward."""
         async with ctx.wallet as wallet:
             amount = random.randint(75, 150)
-            await wallet.add_money(amount)
+            await wallet.add_money(amount, 'daily')
             await ctx.send(
                 f"{self.coin_emoji} **{ctx.me.name}** hands you **{amount} {self.coin_name}** as your daily reward."
             )
@@ -51,7 +51,7 @@ class EarnMoney(EconomyBase):
         """Gets a daily reward."""
         async with ctx.wallet as wallet:
             amount = random.randint(250, 500)
-            await wallet.add_money(amount)
+            await wallet.add_money(amount, 'weekly')
             await ctx.send(
                 f"{self.coin_emoji} **{ctx.me.name}** hands you **{amount} {self.coin_name}** as your weekly reward."
             )
@@ -63,7 +63,7 @@ class EarnMoney(EconomyBase):
         """Gets a daily reward."""
         async with ctx.wallet as wallet:
             amount = random.randint(500, 999)
-            await wallet.add_money(amount)
+            await wallet.add_money(amount, 'monthly')
             await ctx.send(
                 f"{self.coin_emoji} **{ctx.me.name}** hands you **{amount} {self.coin_name}** as your monthly reward."
             )
@@ -84,7 +84,6 @@ class EarnMoney(EconomyBase):
         return bet
 
     @require_setup()
-    @refresh()
     @commands.command()
     async def race(
         self, ctx: CustomContext, duck: int = None, bet: typing.Union[int, str] = None, fast_forward: bool = False
@@ -134,10 +133,10 @@ class EarnMoney(EconomyBase):
                     content = f'🏆 Ducks number **{winners}** won!'
 
                 if duck in winning_ints:
-                    await wallet.add_money(bet * 2)
+                    await wallet.add_money(bet * 2, 'race')
                     content += f'\n📈 You won **{bet*2} {self.coin_name}**!'
                 else:
-                    await wallet.remove_money(bet)
+                    await wallet.remove_money(bet, 'race')
                     content += f'\n📉 You lost **{bet} {self.coin_name}**!'
 
                 embed.clear_fields()
@@ -152,7 +151,6 @@ class EarnMoney(EconomyBase):
 
     @commands.command()
     @require_setup()
-    @refresh()
     async def slots(self, ctx: CustomContext, bet: typing.Union[int, str] = None, fast: bool = False):
         """Play a game of slots. You can bet some amount of money for one game.
         The `fast` argument fast-forwards the animation of the slots."""
@@ -180,7 +178,7 @@ class EarnMoney(EconomyBase):
                     await message.edit(embed=embed)
 
             if multiplier := self.win_multiplier(choices):
-                await wallet.add_money(bet * multiplier)
+                await wallet.add_money(bet * multiplier, 'slots')
                 embed.clear_fields()
                 embed.colour = discord.Color.green()
                 em = '<:upward_stonks:739614245997641740>' if multiplier == 2 else '📈'
@@ -193,7 +191,7 @@ class EarnMoney(EconomyBase):
                 else:
                     await ctx.send(embed=embed, footer=False)
             else:
-                await wallet.remove_money(bet)
+                await wallet.remove_money(bet, 'slots')
                 embed.clear_fields()
                 embed.colour = discord.Color.red()
                 embed.add_field(
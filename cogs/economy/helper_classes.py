@@ -27,6 +27,7 @@ from errors import (
     AccountAlreadyExists,
     WalletInUse,
 )
+from helpers.trade_settlement import Settlement, SettlementFailed, settle
 
 if TYPE_CHECKING:
     from bot import DuckBot
@@ -118,41 +119,35 @@ class ShopItem:
         )
 
     async def convert(self, ctx: CustomContext, argument: str):
+        item = ctx.bot.item_catalog.find(argument)
+        if item is None:
+            raise commands.BadArgument(f"{argument} is not in the market.{self._suggestion(ctx, argument)}")
+        return self.from_db(item)
+
+    @staticmethod
+    def _suggestion(ctx: CustomContext, argument: str, among: typing.Container[int] = None) -> str:
         if argument.isdigit():
-            row = await ctx.bot.db.fetchrow("SELECT * FROM items WHERE item_id = $1::int LIMIT 1", argument)
-        else:
-            row = await ctx.bot.db.fetchrow("SELECT * FROM items WHERE UPPER(item_name) = UPPER($1) LIMIT 1", argument)
-        if not row:
-            raise commands.BadArgument(f"{argument} is not in the market.")
-        else:
-            return self.from_db(row)
+            return ''
+        item = next(iter(ctx.bot.item_catalog.search(argument, threshold=0.3, among=among)), None)
+        return f" Did you mean **{item.item_name}**?" if item else ''
 
 
 # noinspection SqlResolve
 class OwnedItem(ShopItem):
     async def convert(self, ctx: CustomContext, argument: str):
-        if argument.isdigit():
-            row = await ctx.bot.db.fetchrow(
-                "SELECT items.item_id, stock, amount, price, item_name FROM inventory, items "
-                "WHERE user_id = $1 AND inventory.item_id = $2::bigint AND items.item_id = inventory.item_id",
-                ctx.author.id,
-                argument,
-            )
-        else:
-            row = await ctx.bot.db.fetchrow(
-                "SELECT items.item_id, stock, amount, price, item_name, noises FROM inventory, items WHERE user_id = $1 AND UPPER(items.item_name) = UPPER($2) AND items.item_id = inventory.item_id LIMIT 1",
-                ctx.author.id,
-                argument,
-            )
-        if not row:
-            raise commands.BadArgument(f"❗ **{argument[0:100]}** is not in your **📦 Storage Box**.")
-        else:
-            item = self.from_db(row)
-            if item.inventory == 0:
-                raise commands.BadArgument(
-                    f"❗ **{row.get('item_name', argument[0:100])}** is not in your **📦 Storage Box**."
-                )
-            return item
+        item = ctx.bot.item_catalog.find(argument)
+        if item is None:
+            owned = await ctx.bot.db.fetch("SELECT item_id FROM inventory WHERE user_id = $1 AND amount > 0", ctx.author.id)
+            suggestion = self._suggestion(ctx, argument, {r["item_id"] for r in owned})
+            raise commands.BadArgument(f"❗ **{argument[0:100]}** is not in your **📦 Storage Box**.{suggestion}")
+        amount = await ctx.bot.db.fetchval(
+            "SELECT amount FROM inventory WHERE user_id = $1 AND item_id = $2", ctx.author.id, item.item_id
+        )
+        if not amount:
+            raise commands.BadArgument(f"❗ **{item.item_name}** is not in your **📦 Storage Box**.")
+        owned = self.from_db(item)
+        owned.inventory = amount
+        return owned
 
     async def use(self, ctx: CustomContext):
         if self.inventory <= 0:
@@ -229,35 +224,43 @@ class TradeSession:
                 f'Both **{self.wallet1.user.name}** and **{self.wallet2.user.name}** confirmed to trade. {wallet.bot.user.name} is updating all wallets and storage boxes...'
             )
             try:
-                async with self.wallet1.bot.db.acquire() as conn:
-                    for item, amount in self.items1.items():
-                        try:
-                            await self.wallet1._remove_item(conn, item, amount)
-                        except Exception as e:
-                            logging.error(
-                                f"Error removing item {item.name} from {self.wallet1.user.name}'s wallet", exc_info=e
-                            )
-                        try:
-                            await self.wallet2._add_item(conn, item, amount)
-                        except Exception as e:
-                            logging.error(f"Error adding item {item.name} to {self.wallet2.user.name}'s wallet", exc_info=e)
-                    for item, amount in self.items2.items():
-                        try:
-                            await self.wallet2._remove_item(conn, item, amount)
-                        except Exception as e:
-                            logging.error(
-                                f"Error removing item {item.name} from {self.wallet2.user.name}'s wallet", exc_info=e
-                            )
-                        try:
-                            await self.wallet1._add_item(conn, item, amount)
-                        except Exception as e:
-                            logging.error(f"Error adding item {item.name} to {self.wallet1.user.name}'s wallet", exc_info=e)
+                return await self.settle(channel)
             finally:
                 self.wallet1.trade_session = None
                 self.wallet2.trade_session = None
         else:
             await channel.send(f'**{wallet.user.name}** has confirmed his trade.')
 
+    async def settle(self, channel: discord.TextChannel) -> typing.Optional[Settlement]:
+        """Exchanges everything both users added, all or nothing, and reports how it went."""
+        user1, user2 = self.wallet1.user, self.wallet2.user
+        if self.wallet1.deleted or self.wallet2.deleted:
+            await channel.send("❗ One of the wallets was deleted, the trade was cancelled and nothing was exchanged.")
+            return None
+        transfers = [(user1.id, user2.id, item.id, amount) for item, amount in self.items1.items() if amount]
+        transfers += [(user2.id, user1.id, item.id, amount) for item, amount in self.items2.items() if amount]
+        money = {user1.id: self.money2 - self.money1, user2.id: self.money1 - self.money2}
+        try:
+            async with self.wallet1.bot.db.acquire() as conn:
+                settlement = await settle(conn, transfers, money)
+        except SettlementFailed as e:
+            await channel.send(f"❗ The trade couldn't be completed because {e}. Nothing was exchanged.")
+            return None
+        except Exception as e:
+            logging.error(f"Error settling the trade between {user1} and {user2}", exc_info=e)
+            await channel.send("❗ Something went wrong while trading. Nothing was exchanged.")
+            return None
+
+        for wallet in (self.wallet1, self.wallet2):
+            if wallet.user.id in settlement.balances:
+                wallet.balance = settlement.balances[wallet.user.id]
+                wallet._record(settlement.money[wallet.user.id], 'trade')
+        await channel.send(
+            f"✅ Trade complete! **{user1.name}** gave {sum(self.items1.values())} items and"
+            f" **{user2.name}** gave {sum(self.items2.values())} items."
+        )
+        return settlement
+
     async def prompt(self, ctx):
         if not self.wallet2:
             raise commands.BadArgument('❗ The other user has not accepted the trade yet.')
@@ -438,49 +441,75 @@ class Wallet:
 
     # Money management
     async def transfer_money(self, to: discord.User, amount: int):
+        account = await self.bot.get_wallet(to)
+        async with account as a, self.bot.db.acquire() as conn:
+            try:
+                async with conn.transaction():
+                    sent = await self._spend_money(conn, amount)
+                    received = await a._add_money(conn, amount)
+            except AccountNotFound:
+                # rolled back, so the balance we got from spending is not the real one
+                await self.refresh(conn)
+                raise
+        self._record(sent, 'transfer')
+        a._record(received, 'transfer')
+
+    async def add_money(self, amount: int, reason: str = 'other'):
         async with self.bot.db.acquire() as conn:
-            account = await self.bot.get_wallet(to)
-            async with account as a:
-                if amount > self.balance:
-                    raise commands.BadArgument("You don't have enough money to do that.")
-                await a._add_money(conn, amount)
-                await self._remove_money(conn, amount)
-
-    async def add_money(self, amount: int):
-        async with self.bot.db.acquire() as conn:
-            await self._add_money(conn, amount)
+            self._record(await self._add_money(conn, amount), reason)
 
-    async def remove_money(self, amount: int):
+    async def remove_money(self, amount: int, reason: str = 'other'):
         async with self.bot.db.acquire() as conn:
-            await self._remove_money(conn, amount)
+            self._record(await self._remove_money(conn, amount), reason)
 
     async def update_balance(self, amount: int):
         async with self.bot.db.acquire() as conn:
-            await self.refresh()
-            amount = amount - self.balance
-            await self._add_money(conn, amount)
+            record = await conn.fetchrow(
+                "WITH old AS (SELECT balance FROM economy WHERE user_id = $2 AND NOT deleted FOR UPDATE) "
+                "UPDATE economy SET balance = $1 FROM old WHERE user_id = $2 "
+                "RETURNING economy.balance, economy.balance - old.balance AS delta",
+                amount,
+                self.user.id,
+            )
+            self._set_balance(record and record["balance"])
+        self._record(record["delta"], 'set')
 
     async def purchase_items(self, item: ShopItem, amount: int):
         async with self.bot.db.acquire() as conn:
-            if item.price * amount > self.balance:
-                raise commands.BadArgument("You don't have enough money to do that.")
             if amount > item.stock:
                 raise commands.BadArgument("There's not enough of that item in stock.")
-            await self._purchase_items(conn, item, amount)
+            try:
+                async with conn.transaction():
+                    delta = await self._purchase_items(conn, item, amount)
+            except commands.BadArgument:
+                # rolled back, so the balance we got from spending is not the real one
+                await self.refresh(conn)
+                raise
+        self.bot.item_catalog.set_stock(item.id, item.stock)
+        self._record(delta, 'purchase')
 
     async def add_items(self, item: ShopItem, amount: int):
         async with self.bot.db.acquire() as conn:
-            if item.price * amount > self.balance:
-                raise commands.BadArgument("You don't have enough money to do that.")
             if amount > item.stock:
                 raise commands.BadArgument("There's not enough of that item in stock.")
-            await self._purchase_items(conn, item, amount)
+            try:
+                async with conn.transaction():
+                    delta = await self._purchase_items(conn, item, amount)
+            except commands.BadArgument:
+                # rolled back, so the balance we got from spending is not the real one
+                await self.refresh(conn)
+                raise
+        self.bot.item_catalog.set_stock(item.id, item.stock)
+        self._record(delta, 'purchase')
 
     async def sell_items(self, item: OwnedItem, amount: int):
         async with self.bot.db.acquire() as conn:
             if amount > item.inventory:
                 raise commands.BadArgument("You don't have that many of that item.")
-            await self._sell_items(conn, item, amount)
+            async with conn.transaction():
+                delta = await self._sell_items(conn, item, amount)
+        self.bot.item_catalog.set_stock(item.id, item.stock)
+        self._record(delta, 'sale')
 
     async def remove_items(self, item: OwnedItem, amount: int):
         async with self.bot.db.acquire() as conn:
@@ -488,32 +517,84 @@ class Wallet:
                 raise commands.BadArgument("You don't have that many of that item.")
             await self._remove_item(conn, item, amount)
 
-    async def refresh(self):
-        async with self.bot.db.acquire() as conn:
-            self.balance, self._deleted = await conn.fetchrow(
-                "SELECT balance, deleted FROM economy WHERE user_id = $1", self.user.id
-            )
+    async def refresh(self, conn: typing.Optional[asyncpg.Connection] = None):
+        if conn is None:
+            async with self.bot.db.acquire() as conn:
+                return await self.refresh(conn)
+        record = await conn.fetchrow("SELECT balance, deleted FROM economy WHERE user_id = $1", self.user.id)
+        if record is None:
+            self._deleted = True
+            self.bot.leaderboard.remove(self.user.id)
+            raise AccountNotFound(self.user)
+        self.balance, self._deleted = record
+        if self._deleted:
+            self.bot.leaderboard.remove(self.user.id)
+        else:
+            self.bot.leaderboard.update(self.user.id, self.balance)
+
+    # Balances are only ever changed by deltas applied in SQL, so concurrent
+    # changes can't overwrite each other and the wallet needs no refresh first.
+    # The money methods return the change they made, which the public methods
+    # record in the economy ledger and the leaderboard once it is committed.
+    def _record(self, delta: int, reason: str):
+        self.bot.ledger.record(self.user.id, delta, reason)
+        self.bot.leaderboard.update(self.user.id, self.balance)
+
+    def _set_balance(self, balance: typing.Optional[int]):
+        if balance is None:
+            # the row is gone or was deleted elsewhere
+            self._deleted = True
+            raise AccountNotFound(self.user)
+        self.balance = balance
 
     async def _add_money(self, conn: asyncpg.Connection, amount: int):
         if self._deleted:
             raise AccountNotFound(self.user)
-        self.balance = await conn.fetchval(
-            "UPDATE economy SET balance = $1 WHERE user_id = $2 RETURNING balance", self.balance + amount, self.user.id
+        balance = await conn.fetchval(
+            "UPDATE economy SET balance = balance + $1 WHERE user_id = $2 AND NOT deleted RETURNING balance",
+            amount,
+            self.user.id,
         )
+        self._set_balance(balance)
+        return amount
 
     async def _remove_money(self, conn: asyncpg.Connection, amount: int):
+        """Removes up to `amount`, never leaving the balance below 0."""
         if self._deleted:
             raise AccountNotFound(self.user)
-        if amount > self.balance:
-            amount = self.balance
-        self.balance = await conn.fetchval(
-            "UPDATE economy SET balance = $1 WHERE user_id = $2 RETURNING balance", self.balance - amount, self.user.id
+        # the row is locked before it is read, so the change is exact even when the balance is clamped.
+        record = await conn.fetchrow(
+            "WITH old AS (SELECT balance FROM economy WHERE user_id = $2 AND NOT deleted FOR UPDATE) "
+            "UPDATE economy SET balance = GREATEST(old.balance - $1, 0) FROM old WHERE user_id = $2 "
+            "RETURNING economy.balance, economy.balance - old.balance AS delta",
+            amount,
+            self.user.id,
         )
+        self._set_balance(record and record["balance"])
+        return record["delta"]
+
+    async def _spend_money(self, conn: asyncpg.Connection, amount: int):
+        """Removes exactly `amount`, or raises if the balance is too low."""
+        if self._deleted:
+            raise AccountNotFound(self.user)
+        if amount < 0:
+            raise commands.BadArgument("You can't do that with a negative amount.")
+        record = await conn.fetchrow(
+            "UPDATE economy SET balance = balance - $1 WHERE user_id = $2 AND NOT deleted AND balance >= $1 "
+            "RETURNING balance",
+            amount,
+            self.user.id,
+        )
+        if record is None:
+            await self.refresh(conn)
+            raise commands.BadArgument("You don't have enough money to do that.")
+        self._set_balance(record["balance"])
+        return -amount
 
     async def _purchase_items(self, conn: asyncpg.Connection, item: ShopItem, amount: int):
         if self._deleted:
             raise AccountNotFound(self.user)
-        await self._remove_money(conn, item.price * amount)
+        delta = await self._spend_money(conn, item.price * amount)
         await conn.execute(
             'INSERT INTO inventory (user_id, item_id, amount) VALUES ($1, $2, $3)'
             'ON CONFLICT (user_id, item_id) DO UPDATE SET amount = inventory.amount + $3',
@@ -521,19 +602,28 @@ class Wallet:
             item.id,
             amount,
         )
-        await conn.execute('UPDATE items SET stock = $1 WHERE item_id = $2', item.stock - amount, item.id)
+        stock = await conn.fetchval(
+            'UPDATE items SET stock = stock - $1 WHERE item_id = $2 AND stock >= $1 RETURNING stock', amount, item.id
+        )
+        if stock is None:
+            raise commands.BadArgument("There's not enough of that item in stock.")
+        item.stock = stock
+        return delta
 
     async def _sell_items(self, conn: asyncpg.Connection, item: OwnedItem, amount: int):
         if self._deleted:
             raise AccountNotFound(self.user)
-        await self._add_money(conn, int(item.price * amount - (item.price / 10 * amount)))
+        delta = await self._add_money(conn, int(item.price * amount - (item.price / 10 * amount)))
         await conn.execute(
             'UPDATE inventory SET amount = $3 WHERE user_id = $1 AND item_id = $2',
             self.user.id,
             item.id,
             item.inventory - amount,
         )
-        await conn.execute('UPDATE items SET stock = stock + $1 WHERE item_id = $2', amount, item.id)
+        item.stock = await conn.fetchval(
+            'UPDATE items SET stock = stock + $1 WHERE item_id = $2 RETURNING stock', amount, item.id
+        )
+        return delta
 
     async def _add_item(self, conn: asyncpg.Connection, item: ShopItem, amount: int):
         if self._deleted:
@@ -560,8 +650,15 @@ class Wallet:
                 del self.bot.wallets[self.user.id]
             raise AccountNotFound(self.user)
         async with self.bot.db.acquire() as conn:
-            await conn.execute("UPDATE economy SET deleted = TRUE, " "balance = 200 " "where user_id = $1", self.user.id)
+            delta = await conn.fetchval(
+                "WITH old AS (SELECT balance FROM economy WHERE user_id = $1 FOR UPDATE) "
+                "UPDATE economy SET deleted = TRUE, balance = 200 FROM old WHERE user_id = $1 "
+                "RETURNING economy.balance - old.balance",
+                self.user.id,
+            )
             self._deleted = True
+        self.bot.ledger.record(self.user.id, delta or 0, 'reset')
+        self.bot.leaderboard.remove(self.user.id)
 
     @classmethod
     async def from_context(cls, ctx: CustomContext):
@@ -582,6 +679,7 @@ class Wallet:
         async with bot.db.acquire() as conn:
             try:
                 account = await conn.fetchrow("INSERT INTO economy (user_id) VALUES ($1) RETURNING *", user.id)
+                bot.ledger.record(user.id, account["balance"], 'open')
             except asyncpg.UniqueViolationError:
                 account = await conn.fetchrow("SELECT * FROM economy WHERE user_id = $1", user.id) or {}
                 if account.get('deleted'):
@@ -592,4 +690,5 @@ class Wallet:
                     raise AccountAlreadyExists(user)
             wallet = cls(bot, user, account)
             bot.wallets[user.id] = wallet
+            bot.leaderboard.update(user.id, wallet.balance)
             return wallet
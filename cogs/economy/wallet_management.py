@@ -2,11 +2,13 @@ import math
 from typing import TYPE_CHECKING
 
 import math
+import typing
 from typing import TYPE_CHECKING
 
 import discord
 from discord.ext import commands
 
+from helpers import paginator
 from helpers.time_inputs import human_timedelta
 from ._base import EconomyBase
 from .helper_classes import Wallet
@@ -30,7 +32,6 @@ class WalletManagement(EconomyBase):
         await ctx.send(f"{self.coin_emoji} **You** have **{ctx.wallet.balance} {self.coin_name}**.")
 
     @require_setup()
-    @refresh()
     @commands.command(name="pay", aliases=["give", "transfer"])
     async def pay(self, ctx: CustomContext, user: discord.User, amount: int):
         """Pay another user some money."""
@@ -130,26 +131,26 @@ class WalletManagement(EconomyBase):
             await ctx.send(embed=embed, footer=False)
 
     @economy.command(name='leaderboard', aliases=['lb', 'top'])
-    async def eco_leaderboard(self, ctx: CustomContext, page: int = 1):
-        """Shows the top richest users in the economy."""
+    async def eco_leaderboard(
+        self, ctx: CustomContext, page: typing.Optional[int] = 1, scope: typing.Literal['global', 'server'] = 'global'
+    ):
+        """Shows the top richest users in the economy, or in this server."""
         if page < 1:
             raise commands.BadArgument("Page must be greater than 0.")
-        page -= 1
-        count = await ctx.bot.db.fetchval("SELECT COUNT(*) FROM economy")
-        if count == 0:
+        if scope == 'server':
+            if not ctx.guild:
+                raise commands.BadArgument("❗ There is no server leaderboard in DMs.")
+            entries = ctx.bot.leaderboard.among(member.id for member in ctx.guild.members)
+            rank = next((number for number, (user_id, _) in enumerate(entries, start=1) if user_id == ctx.author.id), None)
+            title = f"Top {len(entries)} richest users in {ctx.guild.name}"
+        else:
+            entries = ctx.bot.leaderboard
+            rank = entries.rank(ctx.author.id)
+            title = f"Top {len(entries)} richest users"
+        if not entries:
             raise commands.BadArgument("❗ There are no users in the economy yet.")
-        users = await ctx.bot.db.fetch(
-            "SELECT user_id, balance FROM economy ORDER BY balance DESC LIMIT 10 OFFSET $1", page * 10
-        )
-        if not users:
+        if page > math.ceil(len(entries) / 10):
             raise commands.BadArgument("❗ That page does not exist.")
-        embed = discord.Embed(title=f"Top {count} richest users (page {page+1}/{math.ceil(count / 10)})")
-        leaderboard = []
-        for number, entry in enumerate(users, start=page * 10 + 1):
-            user = discord.utils.escape_markdown(str(ctx.bot.get_user(entry.get('user_id', 0)) or 'Unknown User'))
-            leaderboard.append(f"`{number}`) **{user}** - {entry.get('balance')} {self.coin_emoji}")
-        embed.description = "\n".join(leaderboard)
-        max_page = page * 10 + 10
-        max_page = max_page if max_page < count else count
-        embed.set_footer(text=f"Showing users {page * 10 + 1}-{max_page} of {count}.")
-        await ctx.send(embed=embed)
+        source = paginator.LeaderboardPageSource(entries, ctx=ctx, title=title, emoji=self.coin_emoji, rank=rank)
+        menu = paginator.ViewPaginator(source=source, ctx=ctx)
+        await menu.start(page_number=page - 1)
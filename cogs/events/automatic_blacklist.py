@@ -8,10 +8,17 @@ from ._base import EventsBase
 
 
 class AutoBlacklist(EventsBase):
+    async def cog_unload(self):
+        # the recorder outlives the cog, but don't leave rows behind on reloads.
+        try:
+            await self.bot.command_recorder.flush()
+        except Exception as e:
+            logging.error('Failed to flush command usage on unload', exc_info=e)
+        await discord.utils.maybe_coroutine(super().cog_unload)
+
     @commands.Cog.listener('on_command')
     async def on_command(self, ctx: CustomContext):
-        await self.bot.db.execute(
-            "INSERT INTO commands (guild_id, user_id, command, timestamp) VALUES ($1, $2, $3, $4)",
+        self.bot.command_recorder.record(
             getattr(ctx.guild, 'id', None),
             ctx.author.id,
             ctx.command.qualified_name,
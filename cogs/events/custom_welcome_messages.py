@@ -1,11 +1,15 @@
 import discord
 from discord.ext import commands
 
+from helpers.message_router import message_route
 from ._base import EventsBase
 
 
 class WelcomeMessages(EventsBase):
-    @commands.Cog.listener('on_message')
+    @message_route(
+        guilds=lambda bot: bot.counting_channels,
+        check=lambda bot, message: bot.counting_channels[message.guild.id]['channel'] == message.channel.id,
+    )
     async def on_count_receive(self, message: discord.Message):
         if (
             message.author.bot
@@ -23,10 +27,8 @@ class WelcomeMessages(EventsBase):
                 return await message.delete(delay=0)
             elif self.bot.counting_channels[message.guild.id]['reset'] is True:
                 self.bot.counting_channels[message.guild.id]['number'] = 0
+                self.bot.count_writer.mark(message.guild.id)
                 await message.reply(f'{message.author.mention} just put the **wrong number**! Start again from **0**')
-                await self.bot.db.execute(
-                    'UPDATE count_settings SET current_number = $2 WHERE guild_id = $1', message.guild.id, 0
-                )
                 return
         if message.author.id == self.bot.counting_channels[message.guild.id]['last_counter']:
             return await message.delete(delay=0)
@@ -34,31 +36,18 @@ class WelcomeMessages(EventsBase):
         self.bot.counting_channels[message.guild.id]['last_counter'] = message.author.id
         self.bot.counting_channels[message.guild.id]['last_message_id'] = message.id
         self.bot.counting_channels[message.guild.id]['messages'].append(message)
-        await self.bot.db.execute(
-            'UPDATE count_settings SET current_number = $2 WHERE guild_id = $1',
-            message.guild.id,
-            self.bot.counting_channels[message.guild.id]['number'],
-        )
-        if (
-            message.guild.id not in self.bot.counting_rewards
-            or int(message.content) not in self.bot.counting_rewards[message.guild.id]
-        ):
-            return
-        reward = await self.bot.db.fetchrow(
-            "SELECT * FROM counting WHERE (guild_id, reward_number) = ($1, $2)",
-            message.guild.id,
-            self.bot.counting_channels[message.guild.id]['number'],
-        )
+        self.bot.count_writer.mark(message.guild.id)
+        reward = self.bot.counting_rewards.get(message.guild.id, {}).get(int(message.content))
         if not reward:
             return
-        msg = reward['reward_message']
+        msg = reward.message
         if msg:
             try:
                 m = await message.channel.send(msg)
                 self.bot.saved_messages[message.id] = m
             except (discord.Forbidden, discord.HTTPException):
                 pass
-        role = reward['role_to_grant']
+        role = reward.role_id
         if role:
             role = message.guild.get_role(role)
             if role:
@@ -66,7 +55,7 @@ class WelcomeMessages(EventsBase):
                     await message.author.add_roles(role)
                 except (discord.Forbidden, discord.HTTPException):
                     pass
-        reaction = reward['reaction_to_add']
+        reaction = reward.reaction
         if reaction:
             try:
                 try:
@@ -91,11 +80,7 @@ class WelcomeMessages(EventsBase):
             except (KeyError, IndexError):
                 self.bot.counting_channels[payload.guild_id]['last_message_id'] = None
                 self.bot.counting_channels[payload.guild_id]['last_counter'] = None
-            await self.bot.db.execute(
-                'UPDATE count_settings SET current_number = $2 WHERE guild_id = $1',
-                payload.guild_id,
-                self.bot.counting_channels[payload.guild_id]['number'],
-            )
+            self.bot.count_writer.mark(payload.guild_id)
         else:
             try:
                 message = [
@@ -3,11 +3,12 @@ import re
 import discord
 from discord.ext import commands
 
+from helpers.message_router import message_route
 from ._base import EventsBase
 
 
 class PrivateEvents(EventsBase):
-    @commands.Cog.listener('on_message')
+    @message_route(authors=lambda bot: bot.owner_ids or (bot.owner_id,))
     async def emoji_sender(self, message: discord.Message):
         if not await self.bot.is_owner(message.author) or self.bot.user.id != 788278464474120202:
             return
@@ -54,7 +55,7 @@ class PrivateEvents(EventsBase):
         )
         await channel.send(embed=embed)
 
-    @commands.Cog.listener('on_message')
+    @message_route(channels={939677888809140294})
     async def nsfw_protector(self, message: discord.Message):
         if self.bot.user.id != 788278464474120202:
             return
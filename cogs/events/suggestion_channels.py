@@ -2,11 +2,12 @@ import discord
 from discord.ext import commands
 
 from helpers import constants
+from helpers.message_router import message_route
 from ._base import EventsBase
 
 
 class SuggestionChannels(EventsBase):
-    @commands.Cog.listener('on_message')
+    @message_route(channels=lambda bot: bot.suggestion_channels)
     async def on_suggestion_receive(self, message: discord.Message):
         if message.author.bot:
             return
@@ -22,26 +22,35 @@ https://github.com/cyrus01337/invites/
 
 import asyncio
 import contextlib
-import datetime
-import time
-from typing import Dict, Optional
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from bot import DuckBot
+from helpers.invite_expiry import InviteExpiryIndex, invite_expires_at
+from helpers.invite_snapshots import invite_from_record
 
 
-POLL_PERIOD = 25
+# how long a join waits for others before the invites are fetched, so a burst of joins shares one fetch.
+JOIN_COALESCE_WINDOW = 2.0
+# how many guilds' invites are fetched at once on startup.
+INVITE_REFRESH_CONCURRENCY = 5
 
 
 class ConfigBase(commands.Cog):
     def __init__(self, bot: DuckBot):
         self.bot = bot
         self._invites_ready = asyncio.Event()
-        self._dict_filled = asyncio.Event()
+        self.invite_expiry = InviteExpiryIndex()
+        self._expiry_wakeup = asyncio.Event()
+        self._expiry_task: Optional[asyncio.Task] = None
         self.bot.get_invite = self.get_invite  # type: ignore
         self.bot.wait_for_invites = self.wait_for_invites  # type: ignore
+        # guild ID to the members that joined and are waiting on an invite diff
+        self._pending_joins: Dict[int, List[discord.Member]] = {}
+        self._join_batches: Dict[int, asyncio.Task] = {}
 
         self.bot.loop.create_task(self.__ainit__())
 
@@ -49,97 +58,98 @@ class ConfigBase(commands.Cog):
         # wait until the bots internal cache is ready
         await self.bot.wait_until_ready()
 
-        for guild in self.bot.guilds:
-            fetched = await self.fetch_invites(guild)
-            invites = self.bot.invites[guild.id] = fetched or {}
+        # the last snapshot is used until the guild's invites are fetched again.
+        if await self.restore_invites():
+            self._invites_ready.set()
+        self._expiry_task = asyncio.create_task(self.delete_expired())
+
+        await self.refresh_all_invites()
+        self._invites_ready.set()
 
-            if "VANITY_URL" in guild.features:
-                with contextlib.suppress(discord.HTTPException):
-                    vanity = await guild.vanity_invite()
-                    if vanity:
-                        invites["VANITY"] = invites[vanity.code] = vanity
-        self.update_invite_expiry.start()
-        self.delete_expired.start()
+    async def restore_invites(self) -> int:
+        try:
+            snapshots = await self.bot.invite_snapshots.load()
+        except Exception as e:
+            self.bot.logger.error("Failed to load the invite snapshots", exc_info=e)
+            return 0
+        for guild_id, records in snapshots.items():
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                # left while we were offline.
+                self.bot.invite_snapshots.mark(guild_id)
+                continue
+            invites = {}
+            for record in records:
+                invite = invites[record["code"]] = invite_from_record(self.bot, guild, record)
+                if record["vanity"]:
+                    invites["VANITY"] = invite
+            self.set_invites(guild_id, invites, persist=False)
+        return len(snapshots)
+
+    async def refresh_all_invites(self) -> None:
+        """Fetches every guild's invites, a few at a time, starting with the guilds that log joins."""
+        queue: asyncio.Queue[discord.Guild] = asyncio.Queue()
+        for guild in sorted(self.bot.guilds, key=lambda g: g.id not in self.bot.log_channels):
+            queue.put_nowait(guild)
+
+        async def worker() -> None:
+            while not queue.empty():
+                guild = queue.get_nowait()
+                try:
+                    await self.refresh_invites(guild)
+                except Exception as e:
+                    self.bot.logger.error("Failed to refresh the invites of %s", guild.id, exc_info=e)
+
+        await asyncio.gather(*(worker() for _ in range(INVITE_REFRESH_CONCURRENCY)))
+
+    async def refresh_invites(self, guild: discord.Guild) -> None:
+        fetched = await self.fetch_invites(guild)
+        invites = fetched or {}
+
+        if "VANITY_URL" in guild.features:
+            with contextlib.suppress(discord.HTTPException):
+                vanity = await guild.vanity_invite()
+                if vanity:
+                    invites["VANITY"] = invites[vanity.code] = vanity
+        self.set_invites(guild.id, invites)
 
     def cog_unload(self):
-        self.update_invite_expiry.cancel()
-        self.delete_expired.cancel()
-
-    @tasks.loop()
-    async def delete_expired(self):
-        if not self.bot.expiring_invites:
-            await self._dict_filled.wait()
-        invites = self.bot.expiring_invites
-        expiry_time = min(invites.keys())
-        inv = invites[expiry_time]
-        sleep_time = expiry_time - (int(time.time()) - self.bot.last_update)
-        self.bot.shortest_invite = expiry_time
-        await asyncio.sleep(sleep_time)
-        # delete invite from cache
-        self.delete_invite(inv)
-        # delete invite from expiring invite list
-        # bot.shortest_invite is updated in update_invite_expiry
-        # and since the expiring_invites dict is also updated
-        # so the time goes down we use this instead
-        self.bot.expiring_invites.pop(self.bot.shortest_invite, None)
-
-    @delete_expired.before_loop
-    async def wait_for_list(self):
-        await self.wait_for_invites()
-
-    @tasks.loop(minutes=POLL_PERIOD)
-    async def update_invite_expiry(self):
-        # flatten all the invites in the cache into one single list
-        flattened = [invite for inner in self.bot.invites.values() for invite in inner.values()]
-        # get current posix time
-        current = time.time()
-        self.bot.expiring_invites = {
-            inv.max_age
-            or 0
-            - int(
-                current - (inv.created_at or discord.utils.utcnow()).replace(tzinfo=datetime.timezone.utc).timestamp()
-            ): inv
-            for inv in flattened
-            if inv.max_age != 0
-        }
-
-        exists = True
-
-        # update self.bot.shortest_invite
-        # so we can compare it with invites
-        # that were just created
-        try:  # self.bot.shortest_invite might not exist
-            self.bot.shortest_invite = self.bot.shortest_invite - int(time.time() - self.bot.last_update)
-        except AttributeError:
-            exists = False
-
-        if self.update_invite_expiry.current_loop == 0:
-            # this needs to be updated before
-            # setting self._invites_ready
-            self.bot.last_update = int(current)
-            self._invites_ready.set()
-        # we need to check that expiring_invites
-        # is truthy otherwise this conditional will
-        # raise an error because we passed an
-        # empty sequence to min()
-        elif exists and self.bot.expiring_invites and self.bot.shortest_invite > min(self.bot.expiring_invites.keys()):
-            # this conditional needs to run before we
-            # update self._last_update
-            self.delete_expired.restart()
-            self.bot.last_update = int(current)
-        else:
-            # the last update needs to be updated regardless or
-            # it will cause updates getting deleted from the cache
-            # too early because the expiring_invites list will be
-            # updated with new times but delete_expired will think
-            # that the last update was ages ago and will deduct a huge
-            # amount of seconds from the expiry time to form the sleep_time
-            self.bot.last_update = int(current)
-        # set the event so if the delete_expired
-        # task is cancelled it will start again
-        if self.bot.expiring_invites:
-            self._dict_filled.set()
-            self._dict_filled.clear()
+        if self._expiry_task is not None:
+            self._expiry_task.cancel()
+
+    async def delete_expired(self) -> None:
+        while True:
+            self._expiry_wakeup.clear()
+            expires_at = self.invite_expiry.next_expiry()
+            if expires_at is None:
+                await self._expiry_wakeup.wait()
+                continue
+            delay = (expires_at - discord.utils.utcnow()).total_seconds()
+            if delay > 0:
+                # woken up early if an invite that expires sooner is created.
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._expiry_wakeup.wait(), timeout=delay)
+                continue
+            for guild_id, code in self.invite_expiry.pop_due(discord.utils.utcnow()):
+                invites = self.bot.invites.get(guild_id)
+                if invites is not None:
+                    invites.pop(code, None)
+
+    def set_invites(
+        self, guild_id: int, invites: Dict[str, discord.Invite], *, persist: bool = True
+    ) -> Dict[str, discord.Invite]:
+        """Replaces a guild's cached invites, and their expiries."""
+        self.bot.invites[guild_id] = invites
+        if persist:
+            self.bot.invite_snapshots.mark(guild_id)
+        self.invite_expiry.replace_guild(guild_id, ((code, invite_expires_at(invite)) for code, invite in invites.items()))
+        self._expiry_wakeup.set()
+        return invites
+
+    def forget_invites(self, guild_id: int) -> None:
+        self.bot.invites.pop(guild_id, None)
+        self.bot.invite_snapshots.mark(guild_id)
+        self.invite_expiry.remove_guild(guild_id)
 
     def delete_invite(self, invite: discord.Invite) -> None:
         if not invite.guild:
@@ -147,6 +157,8 @@ class ConfigBase(commands.Cog):
         entry_found = self.get_invites(invite.guild.id)
         if entry_found:
             entry_found.pop(invite.code, None)
+            self.bot.invite_snapshots.mark(invite.guild.id)
+        self.invite_expiry.remove(invite.guild.id, invite.code)
 
     def get_invite(self, code: str) -> Optional[discord.Invite]:
         for invites in self.bot.invites.values():
@@ -182,7 +194,7 @@ class ConfigBase(commands.Cog):
             await asyncio.sleep(1)
 
         if guild not in self.bot.guilds:
-            self.bot.invites.pop(guild.id, None)
+            self.forget_invites(guild.id)
 
     @commands.Cog.listener()
     async def on_invite_create(self, invite: discord.Invite) -> None:
@@ -191,6 +203,9 @@ class ConfigBase(commands.Cog):
         cached = self.bot.invites.get(invite.guild.id, None)
         if cached:
             cached[invite.code] = invite
+            self.bot.invite_snapshots.mark(invite.guild.id)
+            if self.invite_expiry.add(invite.guild.id, invite.code, invite_expires_at(invite)):
+                self._expiry_wakeup.set()
 
     @commands.Cog.listener()
     async def on_invite_delete(self, invite: discord.Invite) -> None:
@@ -205,26 +220,27 @@ class ConfigBase(commands.Cog):
                 # changed to use id because of doc warning
                 if invite.channel and invite.channel.id == channel.id:
                     invites.pop(invite.code)
+                    self.invite_expiry.remove(channel.guild.id, invite.code)
+                    self.bot.invite_snapshots.mark(channel.guild.id)
 
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild) -> None:
-        invites = await self.fetch_invites(guild) or {}
-        self.bot.invites[guild.id] = invites
+        self.set_invites(guild.id, await self.fetch_invites(guild) or {})
 
     @commands.Cog.listener()
     async def on_guild_available(self, guild: discord.Guild) -> None:
         # reload all invites in case they changed during
         # the time that the guilds were unavailable
-        self.bot.invites[guild.id] = await self.fetch_invites(guild) or {}
+        self.set_invites(guild.id, await self.fetch_invites(guild) or {})
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
         if before.id != self.bot.user.id:
             return
         if not before.guild_permissions.manage_channels and after.guild_permissions.manage_channels:
-            self.bot.invites[before.guild.id] = await self.fetch_invites(before.guild) or {}
+            self.set_invites(before.guild.id, await self.fetch_invites(before.guild) or {})
         if before.guild_permissions.manage_guild and not after.guild_permissions.manage_guild:
-            self.bot.invites.pop(before.guild.id, None)
+            self.forget_invites(before.guild.id)
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild) -> None:
@@ -232,22 +248,63 @@ class ConfigBase(commands.Cog):
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
-        invites = await self.fetch_invites(member.guild)
-        dispatched: bool = False
-        if invites:
-            # we sort the invites to ensure we are comparing
-            # A.uses == A.uses
-            invites = sorted(invites.values(), key=lambda i: i.code)
-            cached = sorted(self.bot.invites[member.guild.id].values(), key=lambda i: i.code)
-
-            # zipping is the easiest way to compare each in order, and
-            # they should be the same size? if we do it properly
-            for old, new in zip(cached, invites):
-                if old.uses and new.uses and old.uses < new.uses:
-                    self.bot.invites[member.guild.id][old.code] = new
-                    self.bot.dispatch("invite_update", member, new)
-                    dispatched = True
-                    break
-
-        if dispatched is False:
-            self.bot.dispatch("invite_update", member, None)
+        self._pending_joins.setdefault(member.guild.id, []).append(member)
+        # single-flight: one task per guild diffs the invites for every member that joins meanwhile.
+        if member.guild.id not in self._join_batches:
+            task = asyncio.create_task(self._process_joins(member.guild))
+            self._join_batches[member.guild.id] = task
+
+    async def _process_joins(self, guild: discord.Guild) -> None:
+        try:
+            while self._pending_joins.get(guild.id):
+                await asyncio.sleep(JOIN_COALESCE_WINDOW)
+                members = self._pending_joins.pop(guild.id)
+                fetched = await self.fetch_invites(guild)
+                if fetched is None:
+                    for member in members:
+                        self.bot.dispatch("invite_update", member, None)
+                    continue
+
+                gained = self.diff_invites(guild.id, fetched)
+                self.replace_invites(guild.id, fetched)
+                for member, invite in self.attribute_joins(members, gained, fetched):
+                    self.bot.dispatch("invite_update", member, invite)
+        finally:
+            del self._join_batches[guild.id]
+            # a member may have joined just as the last batch finished.
+            if self._pending_joins.get(guild.id):
+                self._join_batches[guild.id] = asyncio.create_task(self._process_joins(guild))
+
+    def diff_invites(self, guild_id: int, fetched: Dict[str, discord.Invite]) -> Counter[str]:
+        """Returns how many uses each invite gained since it was cached."""
+        cached = self.bot.invites.get(guild_id) or {}
+        gained: Counter[str] = Counter()
+        for code, invite in fetched.items():
+            old = cached.get(code)
+            # an invite we never saw was created and used between two fetches.
+            delta = (invite.uses or 0) - ((old.uses or 0) if old else 0)
+            if delta > 0:
+                gained[code] = delta
+        return gained
+
+    @staticmethod
+    def attribute_joins(
+        members: List[discord.Member], gained: Counter[str], fetched: Dict[str, discord.Invite]
+    ) -> List[Tuple[discord.Member, Optional[discord.Invite]]]:
+        """Credits the invite when it's unambiguous: a single invite gained exactly one use per member that joined.
+
+        Uses split across several invites, or that don't add up to the number
+        of joins, can't be told apart, so the inviter is logged as unknown.
+        """
+        if len(gained) == 1 and sum(gained.values()) == len(members):
+            invite = fetched.get(next(iter(gained)))
+            return [(member, invite) for member in members]
+        return [(member, None) for member in members]
+
+    def replace_invites(self, guild_id: int, fetched: Dict[str, discord.Invite]) -> None:
+        cached = self.bot.invites.get(guild_id) or {}
+        # the vanity invite is not part of guild.invites()
+        if "VANITY" in cached:
+            vanity = cached["VANITY"]
+            fetched = {**fetched, "VANITY": vanity, vanity.code: vanity}
+        self.set_invites(guild_id, fetched)
@@ -7,6 +7,7 @@ from discord.ext import commands
 
 from bot import CustomContext
 from cogs.management import UnicodeEmoji
+from helpers.counting import CountingReward
 from ._base import ConfigBase
 
 
@@ -24,10 +25,7 @@ class Counting(ConfigBase):
             await self.bot.db.execute(
                 "DELETE FROM counting WHERE (guild_id, reward_number) = ($1, $2)", guild.id, reward_number
             )
-            try:
-                self.bot.counting_rewards[guild.id].remove(reward_number)
-            except KeyError:
-                pass
+            self.bot.counting_rewards.get(guild.id, {}).pop(reward_number, None)
             return reward_number
         await self.bot.db.execute(
             'INSERT INTO counting (guild_id, reward_number, reward_message, '
@@ -40,10 +38,8 @@ class Counting(ConfigBase):
             getattr(role, 'id', None),
             reaction,
         )
-        try:
-            self.bot.counting_rewards[guild.id].add(reward_number)
-        except KeyError:
-            self.bot.counting_rewards[guild.id] = {reward_number}
+        reward = CountingReward(message, getattr(role, 'id', None), reaction)
+        self.bot.counting_rewards.setdefault(guild.id, {})[reward_number] = reward
         return reward_number
 
     @commands.group(aliases=['ct'])
@@ -255,10 +251,7 @@ class Counting(ConfigBase):
             if confirm[0] is False:
                 return await confirm[1].edit(content='❌ **|** Cancelled!', view=None)
 
-            try:
-                self.bot.counting_rewards[ctx.guild.id].remove(number)
-            except KeyError:
-                pass
+            self.bot.counting_rewards[ctx.guild.id].pop(number, None)
             await self.bot.db.execute(
                 'DELETE FROM counting WHERE (guild_id, reward_number) = ($1, $2)', ctx.guild.id, number
             )
@@ -293,9 +286,7 @@ class Counting(ConfigBase):
             )
             if confirm[0] is True:
                 self.bot.counting_channels[ctx.guild.id]['number'] = number
-                await self.bot.db.execute(
-                    'UPDATE count_settings SET current_number = $2 WHERE guild_id = $1', ctx.guild.id, number
-                )
+                self.bot.count_writer.mark(ctx.guild.id)
                 await confirm[1].edit(
                     content=f'✅ **|** Updated the **counting number** to **{number}**. '
                     f'\nℹ **|** The next number will be **{number + 1}**',
@@ -1,12 +1,12 @@
 import contextlib
 
-import asyncpg
 import discord
 from discord.ext import commands
 
 from ._base import ConfigBase
 from ..logs import LoggingBackend
 from helpers.context import CustomContext
+from helpers.guild_config import SELECT_COLUMNS
 
 
 class ModLogs(ConfigBase):
@@ -16,7 +16,7 @@ class ModLogs(ConfigBase):
     async def modlogs(self, ctx: CustomContext, channel: discord.TextChannel = None):  # type: ignore
         """Enables mod-logs"""
         if channel:
-            confirm = bool(await ctx.bot.db.fetchval('SELECT modlog FROM prefixes WHERE guild_id = $1', ctx.guild.id))
+            confirm = bool((await ctx.bot.guild_config.get(ctx.guild.id)).modlog)
             if confirm:
                 r = await ctx.confirm(
                     f'Mod-logs are already enabled in {channel.mention}. Do you want to overwrite it?\n'
@@ -24,16 +24,11 @@ class ModLogs(ConfigBase):
                 )
                 if not r:
                     return
-            await self.bot.db.execute(f"DROP TABLE IF EXISTS modlogs.modlogs_{ctx.guild.id};")
-            await self.bot.db.execute(
-                "INSERT INTO prefixes (guild_id, modlog) VALUES ($1, $2) "
-                "ON CONFLICT (guild_id) DO UPDATE SET modlog = $2;",
-                ctx.guild.id,
-                channel.id,
-            )
+            await self.bot.modlogs.clear(ctx.guild.id)
+            await self.bot.guild_config.update(ctx.guild.id, modlog=channel.id)
             await ctx.send(f'✅ | **ModLogs** will now be delivered in #{channel.mention}')
         else:
-            modlog: int = await self.bot.db.fetchval("SELECT modlog FROM prefixes WHERE guild_id = $1", ctx.guild.id)  # type: ignore
+            modlog: int = (await self.bot.guild_config.get(ctx.guild.id)).modlog  # type: ignore
             if modlog:
                 await ctx.send(f"ℹ | **ModLogs** are currently enabled in #{self.bot.get_channel(modlog) or modlog}")
             else:
@@ -43,12 +38,12 @@ class ModLogs(ConfigBase):
     @commands.guild_only()
     @commands.has_permissions(administrator=True)
     async def modlogs_disable(self, ctx: CustomContext):
-        modlog = await self.bot.db.fetchval("SELECT modlog FROM prefixes WHERE guild_id = $1", ctx.guild.id)
+        modlog = (await self.bot.guild_config.get(ctx.guild.id)).modlog
         if not modlog:
             await ctx.send('ℹ | **ModLogs** are already disabled')
         else:
-            await self.bot.db.execute("UPDATE prefixes SET modlog = null WHERE guild_id = $1", ctx.guild.id)
-            await self.bot.db.execute("DROP TABLE IF EXISTS modlogs.modlogs_{}".format(ctx.guild.id))
+            await self.bot.guild_config.update(ctx.guild.id, modlog=None)
+            await self.bot.modlogs.clear(ctx.guild.id)
             await ctx.send('✅ | **ModLogs** have been disabled')
 
     @commands.has_guild_permissions(ban_members=True, manage_messages=True)
@@ -66,17 +61,8 @@ class ModLogs(ConfigBase):
         else:
             with contextlib.suppress(discord.HTTPException):
                 await ctx.message.add_reaction('🔃')
-        try:
-            case = await self.bot.db.fetchval(
-                "SELECT case_id FROM modlogs.modlogs_{} WHERE case_id = $1".format(ctx.guild.id), case_id
-            )
-            if not case:
-                raise commands.BadArgument(f'I could not find the case number {case_id}!')
-        except asyncpg.UndefinedTableError:
+        if not await self.bot.modlogs.update(ctx.guild.id, case_id, reason=reason):
             raise commands.BadArgument(f'I could not find the case number {case_id}!')
-        await self.bot.db.execute(
-            "UPDATE modlogs.modlogs_{} SET reason = $2 WHERE case_id = $1".format(ctx.guild.id), case_id, reason
-        )
         await cog.update_message(ctx.guild, case_id)
         if mod_log != ctx.channel:
             with contextlib.suppress(discord.HTTPException):
@@ -99,17 +85,8 @@ class ModLogs(ConfigBase):
         else:
             with contextlib.suppress(discord.HTTPException):
                 await ctx.message.add_reaction('🔃')
-        try:
-            case = await self.bot.db.fetchval(
-                "SELECT case_id FROM modlogs.modlogs_{} WHERE case_id = $1".format(ctx.guild.id), case_id
-            )
-            if not case:
-                raise commands.BadArgument(f'I could not find the case number {case_id}!')
-        except asyncpg.UndefinedTableError:
+        if not await self.bot.modlogs.update(ctx.guild.id, case_id, moderator=user.id):
             raise commands.BadArgument(f'I could not find the case number {case_id}!')
-        await self.bot.db.execute(
-            "UPDATE modlogs.modlogs_{} SET moderator = $2 WHERE case_id = $1".format(ctx.guild.id), case_id, user.id
-        )
         await cog.update_message(ctx.guild, case_id)
         if mod_log != ctx.channel:
             with contextlib.suppress(discord.HTTPException):
@@ -120,14 +97,16 @@ class ModLogs(ConfigBase):
     @modlogs.command(name='addrole')
     async def addrole(self, ctx: CustomContext, role: discord.Role):
         """Adds a role to the mod-log entry"""
-        if not await ctx.bot.db.fetchval("SELECT modlog FROM prefixes WHERE guild_id = $1", ctx.guild.id):
+        if not (await ctx.bot.guild_config.get(ctx.guild.id)).modlog:
             raise commands.BadArgument('This guild does not have a mod-log enabled!')
-        await ctx.bot.db.execute(
-            """
+        await ctx.bot.guild_config.execute(
+            ctx.guild.id,
+            f"""
                 INSERT INTO prefixes (guild_id, special_roles) VALUES ($1::BIGINT, $3::BIGINT[])
-                ON CONFLICT (guild_id) DO UPDATE SET special_roles = ARRAY( 
+                ON CONFLICT (guild_id) DO UPDATE SET special_roles = ARRAY(
                 SELECT DISTINCT * FROM UNNEST( ARRAY_APPEND(
                 prefixes.special_roles::BIGINT[], $2::BIGINT)))
+                RETURNING {SELECT_COLUMNS}
             """,
             ctx.guild.id,
             role.id,
@@ -139,10 +118,12 @@ class ModLogs(ConfigBase):
     @modlogs.command(name='removerole')
     async def removerole(self, ctx: CustomContext, role: discord.Role):
         """Removes a role from the mod-log entry"""
-        if not await ctx.bot.db.fetchval("SELECT modlog FROM prefixes WHERE guild_id = $1", ctx.guild.id):
+        if not (await ctx.bot.guild_config.get(ctx.guild.id)).modlog:
             raise commands.BadArgument('This guild does not have a mod-log enabled!')
-        await ctx.bot.db.fetchrow(
-            "UPDATE prefixes SET special_roles = ARRAY_REMOVE(special_roles, $1) WHERE guild_id = $2 RETURNING *",
+        await ctx.bot.guild_config.execute(
+            ctx.guild.id,
+            "UPDATE prefixes SET special_roles = ARRAY_REMOVE(special_roles, $1) WHERE guild_id = $2 "
+            f"RETURNING {SELECT_COLUMNS}",
             role.id,
             ctx.guild.id,
         )
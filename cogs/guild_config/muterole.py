@@ -19,18 +19,13 @@ class MuteRole(ConfigBase):
         """
         if ctx.invoked_subcommand is None:
             if new_role:
-                await self.bot.db.execute(
-                    "INSERT INTO prefixes(guild_id, muted_id) VALUES ($1, $2) "
-                    "ON CONFLICT (guild_id) DO UPDATE SET muted_id = $2",
-                    ctx.guild.id,
-                    new_role.id,
-                )
+                await self.bot.guild_config.update(ctx.guild.id, muted_id=new_role.id)
 
                 return await ctx.send(
                     f"Updated the muted role to {new_role.mention}!", allowed_mentions=discord.AllowedMentions().none()
                 )
 
-            mute_role = await self.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', ctx.guild.id)
+            mute_role = (await self.bot.guild_config.get(ctx.guild.id)).muted_id
 
             if not mute_role:
                 raise errors.MuteRoleNotFound
@@ -53,11 +48,7 @@ class MuteRole(ConfigBase):
         note that this will NOT delete the role, but only remove it from the bot's database!
         If you want to delete it, do "%PRE%muterole delete" instead
         """
-        await self.bot.db.execute(
-            "INSERT INTO prefixes(guild_id, muted_id) VALUES ($1, $2) " "ON CONFLICT (guild_id) DO UPDATE SET muted_id = $2",
-            ctx.guild.id,
-            None,
-        )
+        await self.bot.guild_config.update(ctx.guild.id, muted_id=None)
 
         return await ctx.send(f"Removed this server's mute role!", allowed_mentions=discord.AllowedMentions().none())
 
@@ -67,7 +58,7 @@ class MuteRole(ConfigBase):
     async def muterole_create(self, ctx: CustomContext):
         starting_time = time.monotonic()
 
-        mute_role = await self.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', ctx.guild.id)
+        mute_role = (await self.bot.guild_config.get(ctx.guild.id)).muted_id
 
         if mute_role:
             mute_role = ctx.guild.get_role(mute_role)
@@ -87,12 +78,7 @@ class MuteRole(ConfigBase):
                 permissions=permissions,
                 reason=f"DuckBot mute-role creation. Requested " f"by {ctx.author} ({ctx.author.id})",
             )
-            await self.bot.db.execute(
-                "INSERT INTO prefixes(guild_id, muted_id) VALUES ($1, $2) "
-                "ON CONFLICT (guild_id) DO UPDATE SET muted_id = $2",
-                ctx.guild.id,
-                role.id,
-            )
+            await self.bot.guild_config.update(ctx.guild.id, muted_id=role.id)
 
             modified = 0
             for channel in ctx.guild.channels:
@@ -125,18 +111,13 @@ class MuteRole(ConfigBase):
         Deletes the server's mute role if it exists.
         # If you want to keep the role but not
         """
-        mute_role = await self.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', ctx.guild.id)
+        mute_role = (await self.bot.guild_config.get(ctx.guild.id)).muted_id
         if not mute_role:
             raise errors.MuteRoleNotFound
 
         role = ctx.guild.get_role(int(mute_role))
         if not isinstance(role, discord.Role):
-            await self.bot.db.execute(
-                "INSERT INTO prefixes(guild_id, muted_id) VALUES ($1, $2) "
-                "ON CONFLICT (guild_id) DO UPDATE SET muted_id = $2",
-                ctx.guild.id,
-                None,
-            )
+            await self.bot.guild_config.update(ctx.guild.id, muted_id=None)
 
             return await ctx.send(
                 "It seems like the muted role was already deleted, or I can't find it right now!"
@@ -155,11 +136,7 @@ class MuteRole(ConfigBase):
             return await ctx.send("I can't delete that role! But I deleted it from my database")
         except discord.HTTPException:
             return await ctx.send("Something went wrong while deleting the muted role!")
-        await self.bot.db.execute(
-            "INSERT INTO prefixes(guild_id, muted_id) VALUES ($1, $2) " "ON CONFLICT (guild_id) DO UPDATE SET muted_id = $2",
-            ctx.guild.id,
-            None,
-        )
+        await self.bot.guild_config.update(ctx.guild.id, muted_id=None)
         await ctx.send("🚮")
 
     @muterole.command(name="fix")
@@ -168,7 +145,7 @@ class MuteRole(ConfigBase):
     async def muterole_fix(self, ctx: CustomContext):
         async with ctx.typing():
             starting_time = time.monotonic()
-            mute_role = await self.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', ctx.guild.id)
+            mute_role = (await self.bot.guild_config.get(ctx.guild.id)).muted_id
 
             if not mute_role:
                 raise errors.MuteRoleNotFound
@@ -134,21 +134,17 @@ class Welcome(ConfigBase):
         Send it without the channel
         """
         channel = new_channel
-        query = """ INSERT INTO prefixes(guild_id, welcome_channel) VALUES ($1, $2)
-                    ON CONFLICT (guild_id) DO UPDATE SET welcome_channel = $2 """
         if channel:
             if not channel.permissions_for(ctx.author).send_messages:
                 raise commands.BadArgument("You can't send messages in that channel!")
-            await self.bot.db.execute(query, ctx.guild.id, channel.id)
-            self.bot.welcome_channels[ctx.guild.id] = channel.id
-            message = await self.bot.db.fetchval("SELECT welcome_message FROM prefixes WHERE guild_id = $1", ctx.guild.id)
+            config = await self.bot.guild_config.update(ctx.guild.id, welcome_channel=channel.id)
+            message = config.welcome_message
             await ctx.send(
                 f"Done! Welcome channel updated to {channel.mention} \n"
                 f"{'also, you can customize the welcome message with the `welcome message` command.' if not message else ''}"
             )
         else:
-            await self.bot.db.execute(query, ctx.guild.id, None)
-            self.bot.welcome_channels[ctx.guild.id] = None
+            await self.bot.guild_config.update(ctx.guild.id, welcome_channel=None)
             await ctx.send("Done! cleared the welcome channel.")
 
     @commands.has_permissions(manage_guild=True)
@@ -183,10 +179,6 @@ class Welcome(ConfigBase):
         > Welcome to **Duck Hideout**, **LeoCx1000#9999**!
         """
         message: str
-        query = """
-                INSERT INTO prefixes(guild_id, welcome_message) VALUES ($1, $2)
-                ON CONFLICT (guild_id) DO UPDATE SET welcome_message = $2
-                """
 
         member = ctx.author
         inviter = random.choice(ctx.guild.members)
@@ -214,7 +206,7 @@ class Welcome(ConfigBase):
         except KeyError as e:
             return await ctx.send(f'Unrecognised argument: `{e}`')
 
-        await self.bot.db.execute(query, ctx.guild.id, message)
+        await self.bot.guild_config.update(ctx.guild.id, welcome_message=message)
 
         return await ctx.send(f"**Welcome message updated to:**\n{message}")
 
@@ -224,7 +216,7 @@ class Welcome(ConfigBase):
     async def welcome_message_test(self, ctx: CustomContext):
         """Sends a fake welcome message to test the one set using the `welcome message` command."""
         member = ctx.author
-        message = await self.bot.db.fetchval("SELECT welcome_message FROM prefixes WHERE guild_id = $1", member.guild.id)
+        message = (await self.bot.guild_config.get(member.guild.id)).welcome_message
         message = message or default_message
         invite = SimpleNamespace(
             url='https://discord.gg/TdRfGKg8Wh', code='discord-api', inviter=random.choice(ctx.guild.members)
@@ -257,7 +249,7 @@ class Welcome(ConfigBase):
             channel = await self.bot.get_welcome_channel(member)
         except errors.NoWelcomeChannel:
             return
-        message = await self.bot.db.fetchval("SELECT welcome_message FROM prefixes WHERE guild_id = $1", member.guild.id)
+        message = (await self.bot.guild_config.get(member.guild.id)).welcome_message
         message = message or default_message
 
         to_format = {
@@ -1116,74 +1116,45 @@ class About(commands.Cog):
             "\N{SPORTS MEDAL}",
         )
         embed = discord.Embed(title="Server Command Stats", colour=discord.Colour.blurple())
+        rollups = ctx.bot.command_rollups
+        (uses, first_used), top_commands, top_commands_today, top_users, top_users_today = await asyncio.gather(
+            rollups.totals(ctx.guild.id),
+            rollups.top_commands(ctx.guild.id),
+            rollups.top_commands(ctx.guild.id, today=True),
+            rollups.top_users(ctx.guild.id),
+            rollups.top_users(ctx.guild.id, today=True),
+        )
         # total command uses
-        query = "SELECT COUNT(*), MIN(timestamp) FROM commands WHERE guild_id=$1;"
-        count = await ctx.bot.db.fetchrow(query, ctx.guild.id)
-        embed.description = f"{count[0]} commands used."
-        if count[1]:
-            timestamp = count[1].replace(tzinfo=datetime.timezone.utc)
+        embed.description = f"{uses} commands used."
+        if first_used:
+            timestamp = first_used.replace(tzinfo=datetime.timezone.utc)
         else:
             timestamp = discord.utils.utcnow()
         embed.set_footer(text="Tracking command usage since").timestamp = timestamp
-        query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
-                   WHERE guild_id=$1
-                   GROUP BY command
-                   ORDER BY "uses" DESC
-                   LIMIT 5;
-                """
-        records = await ctx.bot.db.fetch(query, ctx.guild.id)
         value = (
-            "\n".join(f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(records))
+            "\n".join(f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(top_commands))
             or "No Commands"
         )
         embed.add_field(name="Top Commands", value=value, inline=True)
-        query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
-                   WHERE guild_id=$1
-                   AND timestamp > (CURRENT_TIMESTAMP - INTERVAL '1 day')
-                   GROUP BY command
-                   ORDER BY "uses" DESC
-                   LIMIT 5;
-                """
-        records = await ctx.bot.db.fetch(query, ctx.guild.id)
         value = (
-            "\n".join(f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(records))
+            "\n".join(
+                f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(top_commands_today)
+            )
             or "No Commands."
         )
         embed.add_field(name="Top Commands Today", value=value, inline=True)
         embed.add_field(name="\u200b", value="\u200b", inline=True)
-        query = """SELECT user_id,
-                          COUNT(*) AS "uses"
-                   FROM commands
-                   WHERE guild_id=$1
-                   GROUP BY user_id
-                   ORDER BY "uses" DESC
-                   LIMIT 5;
-                """
-        records = await ctx.bot.db.fetch(query, ctx.guild.id)
         value = (
             "\n".join(
-                f"{lookup[index]}: <@!{author_id}> ({uses} bot uses)" for (index, (author_id, uses)) in enumerate(records)
+                f"{lookup[index]}: <@!{author_id}> ({uses} bot uses)" for (index, (author_id, uses)) in enumerate(top_users)
             )
             or "No bot users."
         )
         embed.add_field(name="Top Command Users", value=value, inline=True)
-        query = """SELECT user_id,
-                          COUNT(*) AS "uses"
-                   FROM commands
-                   WHERE guild_id=$1
-                   AND timestamp > (CURRENT_TIMESTAMP - INTERVAL '1 day')
-                   GROUP BY user_id
-                   ORDER BY "uses" DESC
-                   LIMIT 5;
-                """
-        records = await ctx.bot.db.fetch(query, ctx.guild.id)
         value = (
             "\n".join(
-                f"{lookup[index]}: <@!{author_id}> ({uses} bot uses)" for (index, (author_id, uses)) in enumerate(records)
+                f"{lookup[index]}: <@!{author_id}> ({uses} bot uses)"
+                for (index, (author_id, uses)) in enumerate(top_users_today)
             )
             or "No command users."
         )
@@ -1203,51 +1174,33 @@ class About(commands.Cog):
         embed = discord.Embed(title="Command Stats", colour=member.colour)
         embed.set_author(name=str(member), icon_url=member.display_avatar.url)
 
-        # total command uses
-        query = "SELECT COUNT(*), MIN(timestamp) FROM commands WHERE guild_id=$1 AND user_id=$2;"
-        count = await ctx.bot.db.fetchrow(query, ctx.guild.id, member.id)
+        rollups = ctx.bot.command_rollups
+        (uses, first_used), top_commands, top_commands_today = await asyncio.gather(
+            rollups.totals(ctx.guild.id, member.id),
+            rollups.top_commands(ctx.guild.id, member.id),
+            rollups.top_commands(ctx.guild.id, member.id, today=True),
+        )
 
-        embed.description = f"{count[0]} commands used."
-        if count[1]:
-            timestamp = count[1].replace(tzinfo=datetime.timezone.utc)
+        # total command uses
+        embed.description = f"{uses} commands used."
+        if first_used:
+            timestamp = first_used.replace(tzinfo=datetime.timezone.utc)
         else:
             timestamp = discord.utils.utcnow()
 
         embed.set_footer(text="First command used").timestamp = timestamp
 
-        query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
-                   WHERE guild_id=$1 AND user_id=$2
-                   GROUP BY command
-                   ORDER BY "uses" DESC
-                   LIMIT 5;
-                """
-
-        records = await ctx.bot.db.fetch(query, ctx.guild.id, member.id)
-
         value = (
-            "\n".join(f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(records))
+            "\n".join(f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(top_commands))
             or "No Commands"
         )
 
         embed.add_field(name="Most Used Commands", value=value, inline=False)
 
-        query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
-                   WHERE guild_id=$1
-                   AND user_id=$2
-                   AND timestamp > (CURRENT_TIMESTAMP - INTERVAL '1 day')
-                   GROUP BY command
-                   ORDER BY "uses" DESC
-                   LIMIT 5;
-                """
-
-        records = await ctx.bot.db.fetch(query, ctx.guild.id, member.id)
-
         value = (
-            "\n".join(f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(records))
+            "\n".join(
+                f"{lookup[index]}: {command} ({uses} uses)" for (index, (command, uses)) in enumerate(top_commands_today)
+            )
             or "No Commands"
         )
 
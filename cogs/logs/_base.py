@@ -1,10 +1,11 @@
 import asyncio
 import logging
-from collections import namedtuple
+import time
+from collections import defaultdict, namedtuple
 
 import discord
 import typing
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from bot import DuckBot
 
@@ -17,10 +18,29 @@ guild_channels = typing.Union[
 invalidated_webhook = "https://canary.discord.com/api/webhooks/000000000000000000/_LQ1qItzrwhNj47TZEagmEgnjBJhCeLIIAE48M61S3XojN5bQuq8JM_kjv4cwCglYJlp"
 
 
+class DeliveryStats:
+    __slots__ = ("batches", "embeds", "failures", "total_latency", "max_latency")
+
+    def __init__(self):
+        self.batches = 0
+        self.embeds = 0
+        self.failures = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def average_latency(self) -> float:
+        return self.total_latency / self.embeds if self.embeds else 0.0
+
+
 class LoggingBase(commands.Cog):
+    MAX_CONCURRENT_DELIVERIES = 8
+    MAX_EMBEDS_PER_MESSAGE = 10
+    # how long to wait before retrying a queue whose embeds are on disk while the memory tier is full.
+    STALLED_RETRY_DELAY = 1.0
+
     def __init__(self, bot):
         self.bot: DuckBot = bot
-        self.deliver_logs.start()
         _nt_send_to = namedtuple("send_to", ["default", "message", "member", "join_leave", "voice", "server"])
         self.send_to = _nt_send_to(
             default="default",
@@ -30,9 +50,24 @@ class LoggingBase(commands.Cog):
             server="server",
             voice="voice",
         )
+        # (guild_id, deliver_type) pairs that have embeds waiting and are not yet being delivered.
+        self._ready: asyncio.Queue[typing.Tuple[int, str]] = asyncio.Queue()
+        self._scheduled: typing.Set[typing.Tuple[int, str]] = set()
+        self._drains: typing.Set[asyncio.Task] = set()
+        # one batch in flight per webhook, and at most MAX_CONCURRENT_DELIVERIES overall. Only the send
+        # holds a slot, so queues waiting on a busy webhook don't keep the others from being delivered.
+        self._deliveries = asyncio.Semaphore(self.MAX_CONCURRENT_DELIVERIES)
+        self._webhook_locks: typing.DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._webhooks: typing.Dict[str, discord.Webhook] = {}
+        self.delivery_stats: typing.DefaultDict[int, DeliveryStats] = defaultdict(DeliveryStats)
+        self._scheduler: typing.Optional[asyncio.Task] = None
+
+    async def cog_load(self) -> None:
+        self._scheduler = asyncio.create_task(self.deliver_logs())
 
-    def cog_unload(self) -> None:
-        self.deliver_logs.cancel()
+    async def cog_unload(self) -> None:
+        if self._scheduler:
+            self._scheduler.cancel()
 
     def log(
         self,
@@ -43,71 +78,101 @@ class LoggingBase(commands.Cog):
     ):
         guild_id = getattr(guild, "id", guild)
         if guild_id in self.bot.log_channels:
-            self.bot.log_cache[guild_id][send_to].append(embed)
+            self.bot.log_cache.append(guild_id, send_to, embed)
+            self._wake(guild_id, send_to)
+
+    def _wake(self, guild_id: int, deliver_type: str):
+        key = (guild_id, deliver_type)
+        if key in self._scheduled:
+            return
+        self._scheduled.add(key)
+        self._ready.put_nowait(key)
+
+    def get_webhook(self, url: str) -> discord.Webhook:
+        try:
+            return self._webhooks[url]
+        except KeyError:
+            webhook = self._webhooks[url] = discord.Webhook.from_url(
+                url, bot_token=self.bot.http.token, session=self.bot.session
+            )
+            return webhook
+
+    def queue_depths(self) -> typing.Dict[int, int]:
+        """Returns the amount of embeds waiting to be delivered, per guild."""
+        return self.bot.log_cache.depths()
 
-    @tasks.loop(seconds=3)
     async def deliver_logs(self):
+        await self.bot.wait_until_ready()
+
+        # pick up whatever was queued while the cog was not loaded, or spooled before a restart.
+        for guild_id, deliver_type in list(self.bot.log_cache.keys()):
+            self._wake(guild_id, deliver_type)
+
+        while True:
+            guild_id, deliver_type = await self._ready.get()
+            task = asyncio.create_task(self._drain(guild_id, deliver_type))
+            self._drains.add(task)
+            task.add_done_callback(self._drains.discard)
+
+    async def _drain(self, guild_id: int, deliver_type: str):
+        log_cache = self.bot.log_cache
+        stalled = False
         try:
-            for guild_id, webhooks in self.bot.log_channels.items():
-                for deliver_type, cache in self.bot.log_cache[guild_id].items():
-
-                    embeds = self.bot.log_cache[guild_id][deliver_type][:10]
-                    self.bot.log_cache[guild_id][deliver_type] = self.bot.log_cache[guild_id][deliver_type][10:]
-                    webhook_url = getattr(webhooks, deliver_type, None)
-                    if embeds:
-                        if webhook_url:
-                            webhook = discord.Webhook.from_url(
-                                webhook_url or invalidated_webhook,
-                                bot_token=self.bot.http.token,
-                                session=self.bot.session,
-                            )
-                            try:
-                                await webhook.send(embeds=embeds)
-                            except discord.NotFound:
-                                self.bot.loop.create_task(
-                                    self.create_and_deliver(
-                                        embeds=embeds,
-                                        deliver_type=deliver_type,
-                                        guild_id=guild_id,
-                                    )
-                                )
-                                await asyncio.sleep(1)
-                            except Exception as e:
-                                print("Error during task!")
-                                print(e)
-                        else:
-                            deliver_type = self.send_to.default
-                            webhook_url = webhooks.default
-                            webhook = discord.Webhook.from_url(
-                                webhook_url or invalidated_webhook,
-                                bot_token=self.bot.http.token,
-                                session=self.bot.session,
-                            )
-                            try:
-                                await webhook.send(embeds=embeds)
-                            except discord.NotFound:
-                                self.bot.loop.create_task(
-                                    self.create_and_deliver(
-                                        embeds=embeds,
-                                        deliver_type=deliver_type,
-                                        guild_id=guild_id,
-                                    )
-                                )
-                                await asyncio.sleep(1)
-                            except Exception as e:
-                                print("Error during task!")
-                                print(e)
-        except Exception as e:  # noqa
-            if isinstance(e, RuntimeError) and str(e) == str(RuntimeError('dictionary changed size during iteration')):
-                return
+            while log_cache.pending(guild_id, deliver_type):
+                webhooks = self.bot.log_channels.get(guild_id)
+                if webhooks is None:
+                    log_cache.clear(guild_id)
+                    break
+
+                target = deliver_type if getattr(webhooks, deliver_type, None) else self.send_to.default
+                webhook_url = getattr(webhooks, target, None) or invalidated_webhook
+
+                batch = log_cache.popleft(guild_id, deliver_type, self.MAX_EMBEDS_PER_MESSAGE)
+                if not batch:
+                    stalled = True
+                    break
+                async with self._webhook_locks[webhook_url]:
+                    async with self._deliveries:
+                        await self._send(guild_id, target, webhook_url, batch)
+        except Exception:  # noqa
             try:
                 await self.bot.on_error("channel_logs")
             except Exception as e:
-                logging.error("something happened while task was running", exc_info=e)
+                logging.error("something happened while delivering logs", exc_info=e)
+        finally:
+            self._scheduled.discard((guild_id, deliver_type))
+            if stalled:
+                self.bot.loop.call_later(self.STALLED_RETRY_DELAY, self._wake, guild_id, deliver_type)
+            elif log_cache.pending(guild_id, deliver_type):
+                self._wake(guild_id, deliver_type)
 
-    @deliver_logs.before_loop
-    async def wait(self):
-        await self.bot.wait_until_ready()
+    async def _send(
+        self,
+        guild_id: int,
+        deliver_type: str,
+        webhook_url: str,
+        batch: typing.List[typing.Tuple[float, discord.Embed]],
+    ) -> None:
+        """Sends one batch of embeds."""
+        stats = self.delivery_stats[guild_id]
+        embeds = [embed for _, embed in batch]
+        try:
+            await self.get_webhook(webhook_url).send(embeds=embeds)
+        except discord.NotFound:
+            self._webhooks.pop(webhook_url, None)
+            await self.create_and_deliver(embeds=embeds, deliver_type=deliver_type, guild_id=guild_id)
+        except discord.HTTPException as e:
+            stats.failures += 1
+            logging.error("Failed to deliver %s log embeds for guild %s", len(embeds), guild_id, exc_info=e)
+            return
+
+        now = time.monotonic()
+        stats.batches += 1
+        stats.embeds += len(batch)
+        for enqueued_at, _ in batch:
+            latency = now - enqueued_at
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
 
     # noinspection PyProtectedMember
     async def create_and_deliver(self, embeds: typing.List[discord.Embed], deliver_type: str, guild_id: int):
@@ -149,7 +214,9 @@ class LoggingBase(commands.Cog):
                     reason="DuckBot Logging channel",
                 )
             # noinspection SqlResolve
-            await self.bot.db.execute(f"UPDATE log_channels SET {deliver_type}_channel = $1", webhook.url)
+            await self.bot.db.execute(
+                f"UPDATE log_channels SET {deliver_type}_channel = $1 WHERE guild_id = $2", webhook.url, guild_id
+            )
             if deliver_type == "default":
                 self.bot.log_channels[channel.guild.id]._replace(default=webhook.url)
             elif deliver_type == "message":
@@ -1,10 +1,8 @@
 import datetime
 import logging
 import typing
-import asyncio
-from typing import List, Optional
+from typing import Optional
 
-import asyncpg
 import discord
 from discord import Colour as Col
 from discord.ext import commands
@@ -36,30 +34,17 @@ def strip(obj: typing.Any) -> str:
 
 
 class ModLogs(LoggingBase):
-    base_query = """
-    CREATE TABLE IF NOT EXISTS modlogs.modlogs_{} (
-        case_id    serial                   primary key,
-        action     text                     not null,
-        reason     text,
-        offender   bigint                   not null,
-        role_id    bigint,
-        moderator  bigint,
-        message_id bigint,
-        log_date   timestamp with time zone not null,
-        until      timestamp with time zone
-    )"""
-
     async def is_guild_logged(self, guild: discord.Guild) -> bool:
         """
         Checks if a guild is logged
         """
-        return await self.bot.db.fetchval("SELECT modlog FROM prefixes WHERE guild_id = $1", guild.id) is not None
+        return (await self.bot.guild_config.get(guild.id)).modlog is not None
 
     async def get_modlog(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
         """
         Gets the modlog channel for a guild
         """
-        ch_id = await self.bot.db.fetchval("SELECT modlog FROM prefixes WHERE guild_id = $1", guild.id)
+        ch_id = (await self.bot.guild_config.get(guild.id)).modlog
         if ch_id is None:
             return None
         return guild.get_channel(ch_id)  # type: ignore
@@ -123,22 +108,16 @@ class ModLogs(LoggingBase):
         if not (modlog := await self.get_modlog(guild)):
             return
         now_date = discord.utils.utcnow()
-        args = [
-            "INSERT INTO modlogs.modlogs_{} (action, reason, offender, role_id, moderator, log_date, until) "
-            "VALUES ($1, $2, $3, $4, $5, $6, $7) RETURNING case_id".format(guild.id),
+        case_id = await self.bot.modlogs.create(
+            guild.id,
             action,
-            reason,
             offender.id,
-            getattr(role, "id", None),
-            getattr(moderator, "id", None),
             now_date,
-            until,
-        ]
-        try:
-            case_id = await self.bot.db.fetchval(*args)
-        except asyncpg.UndefinedTableError:
-            await self.bot.db.execute(self.base_query.format(guild.id))
-            case_id = await self.bot.db.fetchval(*args)
+            reason=reason,
+            role_id=getattr(role, "id", None),
+            moderator=getattr(moderator, "id", None),
+            until=until,
+        )
 
         embed = self.build_embed(
             action=action,
@@ -151,9 +130,7 @@ class ModLogs(LoggingBase):
             until=until,
         )
         message = await modlog.send(embed=embed)
-        await self.bot.db.execute(
-            "UPDATE modlogs.modlogs_{} SET message_id = $1 WHERE case_id = $2".format(guild.id), message.id, case_id
-        )
+        await self.bot.modlogs.update(guild.id, case_id, message_id=message.id)
 
     async def try_user(self, u_id):
         try:
@@ -167,12 +144,7 @@ class ModLogs(LoggingBase):
         """
         if not (modlog := await self.get_modlog(guild)):
             return
-        case = await self.bot.db.fetchrow(
-            "SELECT action, reason, offender, role_id, moderator, message_id, log_date, until FROM modlogs.modlogs_{} WHERE case_id = $1".format(
-                guild.id
-            ),
-            case_id,
-        )
+        case = await self.bot.modlogs.get(guild.id, case_id)
         if not case:
             return
         action, reason, offender, role_id, moderator, message_id, log_date, until = case
@@ -201,9 +173,10 @@ class ModLogs(LoggingBase):
             - Timeout remove
             - Timeout update
         """
-        await asyncio.sleep(1.5)
         if not await self.is_guild_logged(before.guild):
             return
+        # taken once, the waits below run one after another.
+        since = discord.utils.utcnow() - self.bot.audit_log.event_delay
 
         if before.timed_out_until != after.timed_out_until:
 
@@ -214,15 +187,14 @@ class ModLogs(LoggingBase):
             else:
                 action = 'timeout_update'
 
-            moderator = reason = None
-            async for entry in before.guild.audit_logs(limit=3, action=discord.AuditLogAction.member_update):
-                if (
-                    hasattr(entry.before, 'timed_out_until')
-                    and hasattr(entry.after, 'timed_out_until')
-                    and entry.target == after
-                ):
-                    moderator = entry.user
-                    reason = entry.reason
+            entry = await self.bot.audit_log.wait_for(
+                before.guild,
+                discord.AuditLogAction.member_update,
+                after,
+                check=lambda e: hasattr(e.before, 'timed_out_until') and hasattr(e.after, 'timed_out_until'),
+                since=since,
+            )
+            moderator, reason = (entry.user, entry.reason) if entry else (None, None)
 
             await self.log_action(
                 action=action,
@@ -234,9 +206,7 @@ class ModLogs(LoggingBase):
             )
 
         if before.roles != after.roles:
-            special_roles: List[int] = await self.bot.db.fetchval(
-                "SELECT special_roles FROM prefixes WHERE guild_id = $1", before.guild.id
-            )
+            special_roles = (await self.bot.guild_config.get(before.guild.id)).special_roles
 
             if special_roles:
                 added_roles = set(after.roles) - set(before.roles)
@@ -244,30 +214,28 @@ class ModLogs(LoggingBase):
                 for role in added_roles:
                     if role.id in special_roles:
                         action = 'role_add'
-                        moderator = reason = None
-                        async for entry in before.guild.audit_logs(
-                            limit=4, action=discord.AuditLogAction.member_role_update
-                        ):
-                            if hasattr(entry.before, 'roles') and hasattr(entry.after, 'roles') and entry.target == after:
-                                if role in entry.before.roles:
-                                    moderator = entry.user
-                                    reason = entry.reason
-                                    break
+                        entry = await self.bot.audit_log.wait_for(
+                            before.guild,
+                            discord.AuditLogAction.member_role_update,
+                            after,
+                            check=lambda e, r=role: hasattr(e.after, 'roles') and r in getattr(e.before, 'roles', ()),
+                            since=since,
+                        )
+                        moderator, reason = (entry.user, entry.reason) if entry else (None, None)
                         await self.log_action(
                             action=action, guild=before.guild, offender=after, role=role, moderator=moderator, reason=reason
                         )
                 for role in removed_roles:
                     if role.id in special_roles:
                         action = 'role_remove'
-                        moderator = reason = None
-                        async for entry in before.guild.audit_logs(
-                            limit=4, action=discord.AuditLogAction.member_role_update
-                        ):
-                            if hasattr(entry.before, 'roles') and hasattr(entry.after, 'roles') and entry.target == after:
-                                if role in entry.after.roles:
-                                    moderator = entry.user
-                                    reason = entry.reason
-                                    break
+                        entry = await self.bot.audit_log.wait_for(
+                            before.guild,
+                            discord.AuditLogAction.member_role_update,
+                            after,
+                            check=lambda e, r=role: hasattr(e.before, 'roles') and r in getattr(e.after, 'roles', ()),
+                            since=since,
+                        )
+                        moderator, reason = (entry.user, entry.reason) if entry else (None, None)
                         await self.log_action(
                             action=action, guild=before.guild, offender=after, role=role, moderator=moderator, reason=reason
                         )
@@ -278,16 +246,11 @@ class ModLogs(LoggingBase):
         Logged actions:
             - Ban
         """
-        await asyncio.sleep(1.5)
         if not await self.is_guild_logged(guild):
             return
 
-        moderator = reason = None
-        async for entry in guild.audit_logs(limit=3, action=discord.AuditLogAction.ban):
-            if entry.target == user:
-                moderator = entry.user
-                reason = entry.reason
-                break
+        entry = await self.bot.audit_log.wait_for(guild, discord.AuditLogAction.ban, user)
+        moderator, reason = (entry.user, entry.reason) if entry else (None, None)
 
         await self.log_action(action='ban', guild=guild, offender=user, moderator=moderator, reason=reason)
 
@@ -297,16 +260,11 @@ class ModLogs(LoggingBase):
         Logged actions:
             - Unban
         """
-        await asyncio.sleep(1.5)
         if not await self.is_guild_logged(guild):
             return
 
-        moderator = reason = None
-        async for entry in guild.audit_logs(limit=3, action=discord.AuditLogAction.unban):
-            if entry.target == user:
-                moderator = entry.user
-                reason = entry.reason
-                break
+        entry = await self.bot.audit_log.wait_for(guild, discord.AuditLogAction.unban, user)
+        moderator, reason = (entry.user, entry.reason) if entry else (None, None)
 
         await self.log_action(action='unban', guild=guild, offender=user, moderator=moderator, reason=reason)
 
@@ -316,18 +274,12 @@ class ModLogs(LoggingBase):
         Logged actions:
             - Kick
         """
-        await asyncio.sleep(1.5)
         if not await self.is_guild_logged(member.guild):
             return
 
-        moderator = reason = None
-        async for entry in member.guild.audit_logs(limit=3, action=discord.AuditLogAction.kick):
-            if entry.target == member:
-                moderator = entry.user
-                reason = entry.reason
-                break
-
-        if not moderator:
+        entry = await self.bot.audit_log.wait_for(member.guild, discord.AuditLogAction.kick, member)
+        if entry is None or not entry.user:
             return
+        moderator, reason = entry.user, entry.reason
 
         await self.log_action(action='kick', guild=member.guild, offender=member, moderator=moderator, reason=reason)
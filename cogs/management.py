@@ -26,7 +26,7 @@ from jishaku.paginators import WrappedPaginator
 from jishaku.shim.paginator_200 import PaginatorInterface
 
 from bot import DuckBot, CustomContext
-from helpers import paginator, constants
+from helpers import paginator, constants, helper
 
 RebootArg = typing.Optional[typing.Union[bool, typing.Literal["reboot", "restart", "r"]]]
 
@@ -646,9 +646,147 @@ class Management(commands.Cog, name="Bot Management"):
         @dev_all_history.command(name="clear")
         async def dev_all_history_clear(self, ctx: CustomContext):
             """Clears all command history"""
-            await self.bot.db.execute("DELETE FROM commands")
+            async with self.bot.db.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("DELETE FROM commands")
+                    await conn.execute("TRUNCATE command_rollups")
             await ctx.message.add_reaction("✅")
 
+        @dev_all_history.command(name="backfill", aliases=["rollup", "recount"])
+        async def dev_all_history_backfill(self, ctx: CustomContext):
+            """Recounts the hourly command stats from the full command history"""
+            async with ctx.typing():
+                await self.bot.command_recorder.flush()
+                hours = await self.bot.command_rollups.backfill()
+            await ctx.send(f"Recounted {hours} hourly command stats")
+
+        @dev_all_history.command(name="recorder", aliases=["buffer", "flush"])
+        async def dev_all_history_recorder(self, ctx: CustomContext, flush: bool = False):
+            """Shows the command usage buffer, optionally flushing it"""
+            recorder = self.bot.command_recorder
+            if flush:
+                await recorder.flush()
+            table = tabulate.tabulate(recorder.metrics().items(), headers=["Metric", "Value"], tablefmt="presto")
+            await ctx.send(f"```\n{table}\n```")
+
+        @dev.command(name="log-queues", aliases=["lq", "log-backlog"])
+        async def dev_log_queues(self, ctx: CustomContext):
+            """Shows the logging backlog and delivery latency per guild"""
+            cog = self.bot.get_cog("LoggingBackend")
+            if not cog:
+                return await ctx.send("The logging cog is not loaded")
+            depths = cog.queue_depths()  # type: ignore
+            stats = cog.delivery_stats  # type: ignore
+            log_cache = self.bot.log_cache
+            table = [
+                (
+                    guild_id,
+                    depths.get(guild_id, 0),
+                    log_cache.spilled[guild_id],
+                    log_cache.dropped[guild_id],
+                    stats[guild_id].embeds,
+                    stats[guild_id].failures,
+                    f"{stats[guild_id].average_latency:.2f}s",
+                    f"{stats[guild_id].max_latency:.2f}s",
+                )
+                for guild_id in sorted(
+                    set(depths) | set(stats) | set(log_cache.dropped), key=lambda g: depths.get(g, 0), reverse=True
+                )
+            ]
+            if not table:
+                return await ctx.send("Nothing has been logged yet")
+            table = tabulate.tabulate(
+                table,
+                headers=["Guild ID", "Queued", "Spilled", "Dropped", "Sent", "Failed", "Avg latency", "Max latency"],
+                tablefmt="presto",
+            )
+            header = f"{log_cache.memory_usage()} embeds in memory, {log_cache.replayed} replayed from disk"
+            await ctx.send(f"```\n{header}\n{table}\n```", maybe_attachment=True, extension="txt")
+
+        @dev.command(name="snipe-footprint", aliases=["snipes", "sf"])
+        async def dev_snipe_footprint(self, ctx: CustomContext):
+            """Shows how much memory the snipe store is using"""
+            footprint = self.bot.snipes.footprint()
+            footprint["bytes"] = helper.convert_bytes(footprint["bytes"])  # type: ignore
+            footprint["max_bytes"] = helper.convert_bytes(footprint["max_bytes"])  # type: ignore
+            table = tabulate.tabulate(footprint.items(), headers=["Metric", "Value"], tablefmt="presto")
+            await ctx.send(f"```\n{table}\n```")
+
+        @dev.command(name="cache-coherency", aliases=["coherency", "cc"])
+        async def dev_cache_coherency(self, ctx: CustomContext):
+            """Shows the cache invalidation listener's state and lag"""
+            metrics = self.bot.coherency.metrics()
+            table = tabulate.tabulate(metrics.items(), headers=["Metric", "Value"], tablefmt="presto")
+            await ctx.send(f"```\n{table}\n```")
+
+        @dev.command(name="audit-log", aliases=["audit", "al"])
+        async def dev_audit_log(self, ctx: CustomContext):
+            """Shows how many audit log requests the modlog lookups cost"""
+            metrics = self.bot.audit_log.metrics()
+            table = tabulate.tabulate(metrics.items(), headers=["Metric", "Value"], tablefmt="presto")
+            await ctx.send(f"```\n{table}\n```")
+
+        @dev.command(name="count-writer", aliases=["counting-writes", "cw"])
+        async def dev_count_writer(self, ctx: CustomContext, flush: bool = False):
+            """Shows the counting game's pending writes, optionally flushing them"""
+            writer = self.bot.count_writer
+            if flush:
+                await writer.flush()
+            table = tabulate.tabulate(writer.metrics().items(), headers=["Metric", "Value"], tablefmt="presto")
+            await ctx.send(f"```\n{table}\n```")
+
+        @dev.command(name="migrate-modlogs")
+        async def dev_migrate_modlogs(self, ctx: CustomContext):
+            """Moves the old per guild mod-log tables into the partitioned modlog_cases table"""
+            async with ctx.typing():
+                moved = await self.bot.modlogs.migrate_legacy()
+            await ctx.send(f"Moved {sum(moved.values())} cases of {len(moved)} guilds")
+
+        @dev.command(name="ledger")
+        async def dev_ledger(self, ctx: CustomContext, user: discord.User = None):
+            """Shows a user's latest economy ledger entries, or the ledger's state"""
+            if user is None:
+                metrics = self.bot.ledger.metrics()
+                table = tabulate.tabulate(metrics.items(), headers=["Metric", "Value"], tablefmt="presto")
+                return await ctx.send(f"```\n{table}\n```")
+            entries = await self.bot.ledger.history(user.id)
+            table = tabulate.tabulate(
+                [
+                    (e["id"], e["created_at"].strftime("%Y-%m-%d %H:%M:%S"), e["reason"], e["delta"], e["balance"])
+                    for e in entries
+                ],
+                headers=["ID", "Date", "Reason", "Change", "Balance"],
+                tablefmt="presto",
+            )
+            await ctx.send(f"```\n{table}\n```", maybe_attachment=True, extension="txt")
+
+        @dev.command(name="ledger-verify")
+        async def dev_ledger_verify(self, ctx: CustomContext):
+            """Checks every balance against its ledger checkpoint and entries"""
+            async with ctx.typing():
+                mismatches = await self.bot.ledger.verify()
+            if not mismatches:
+                return await ctx.send("Every balance matches the ledger")
+            table = tabulate.tabulate(
+                [(r["user_id"], r["balance"], r["derived"]) for r in mismatches],
+                headers=["User", "Balance", "Ledger"],
+                tablefmt="presto",
+            )
+            await ctx.send(f"```\n{table}\n```", maybe_attachment=True, extension="txt")
+
+        @dev.command(name="message-routes", aliases=["routes", "mr"])
+        async def dev_message_routes(self, ctx: CustomContext):
+            """Shows how often each routed message handler ran"""
+            router = self.bot.message_router
+            table = tabulate.tabulate(
+                sorted(router.metrics(), key=lambda r: r[1], reverse=True),
+                headers=["Handler", "Invocations", "Failures"],
+                tablefmt="presto",
+            )
+            per_message = router.tasks / (router.messages or 1)
+            header = f"{router.messages} messages routed, {router.tasks} handler tasks ({per_message:.3f} per message)"
+            await ctx.send(f"```\n{header}\n{table}\n```", maybe_attachment=True, extension="txt")
+
         @dev.group(
             name="sql",
             aliases=["db", "database", "psql", "postgre"],
@@ -1,5 +1,4 @@
 import argparse
-import contextlib
 from datetime import timedelta
 import re
 import shlex
@@ -320,11 +319,8 @@ class RemovalCommands(ModerationBase):
                 return
 
         if ctx.channel.permissions_for(ctx.me).manage_messages:
-            prefix = await self.bot.get_pre(self.bot, ctx.message)
-            if self.bot.noprefix and await self.bot.is_owner(ctx.author):
-                with contextlib.suppress(ValueError):
-                    prefix.remove('')
-            prefix = tuple(prefix)
+            # all of the prefixes, not just the one this command was invoked with. Never includes the empty one.
+            prefix = self.bot.get_prefix_matcher(ctx.guild.id if ctx.guild else None).prefixes
             bulk = True
 
             def check(msg):
@@ -5,9 +5,9 @@ import typing
 
 from ._base import ModerationBase
 from discord.ext import commands
-from discord.ext.tasks import loop
 
 from helpers.context import CustomContext
+from helpers.timers import Timer
 from helpers.time_inputs import ShortTime, human_timedelta
 import discord
 
@@ -18,7 +18,7 @@ def ensure_muterole(*, required: bool = True):
             raise commands.BadArgument('Only servers can have mute roles')
         if not required:
             return True
-        if not (role := await ctx.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', ctx.guild.id)):
+        if not (role := (await ctx.bot.guild_config.get(ctx.guild.id)).muted_id):
             raise commands.BadArgument('This server has no mute role set')
         if not (role := ctx.guild.get_role(role)):
             raise commands.BadArgument("It seems like I could not find this server's mute role. Was it deleted?")
@@ -32,7 +32,7 @@ def ensure_muterole(*, required: bool = True):
 async def muterole(ctx) -> discord.Role:
     if not ctx.guild:
         raise commands.BadArgument('Only servers can have mute roles')
-    if not (role := await ctx.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', ctx.guild.id)):
+    if not (role := (await ctx.bot.guild_config.get(ctx.guild.id)).muted_id):
         raise commands.BadArgument('This server has no mute role set')
     if not (role := ctx.guild.get_role(role)):
         raise commands.BadArgument("It seems like I could not find this server's mute role. Was it deleted?")
@@ -41,57 +41,55 @@ async def muterole(ctx) -> discord.Role:
     return role
 
 
-class MuteCommands(ModerationBase):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.temporary_mutes.start()
-
-    def cog_unload(self):
-        self.temporary_mutes.cancel()
-
-    @loop()
-    async def temporary_mutes(self):
-        next_task = await self.bot.db.fetchrow('SELECT * FROM temporary_mutes ORDER BY end_time LIMIT 1')
-        if next_task is None:
-            self.temporary_mutes.cancel()
-            return
+def mute_key(guild_id: int, member_id: int) -> str:
+    return f"{guild_id}:{member_id}"
 
-        await discord.utils.sleep_until(next_task['end_time'])
 
-        guild: discord.Guild = self.bot.get_guild(next_task['guild_id'])
+class MuteCommands(ModerationBase):
+    async def cog_load(self) -> None:
+        await discord.utils.maybe_coroutine(super().cog_load)
+        await self.migrate_temporary_mutes()
 
-        if guild:
-            mute_role = await self.bot.db.fetchval(
-                'SELECT muted_id FROM prefixes WHERE guild_id = $1', next_task['guild_id']
+    async def migrate_temporary_mutes(self) -> None:
+        """Moves any rows left in the old temporary_mutes table over to the timers table."""
+        if not await self.bot.db.fetchval("SELECT to_regclass('temporary_mutes') IS NOT NULL"):
+            return
+        moved = await self.bot.db.fetchval(
+            """
+            WITH moved AS (DELETE FROM temporary_mutes RETURNING *), inserted AS (
+                INSERT INTO timers (event, key, expires, data)
+                SELECT 'mute', guild_id || ':' || member_id, end_time,
+                       jsonb_build_object('guild_id', guild_id, 'member_id', member_id, 'reason', reason)
+                FROM moved
+                ON CONFLICT (event, key) DO NOTHING
+                RETURNING 1
             )
-            if mute_role:
-                role = guild.get_role(int(mute_role))
-                if isinstance(role, discord.Role):
-                    if not role > guild.me.top_role:
-                        try:
-                            member = guild.get_member(next_task['member_id']) or await guild.fetch_member(
-                                next_task['member_id']
-                            )
-                            if member:
-                                await member.remove_roles(role)
-                        except discord.HTTPException:
-                            pass
-
-        await self.bot.db.execute(
-            'DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)',
-            next_task['guild_id'],
-            next_task['member_id'],
+            SELECT COUNT(*) FROM inserted
+            """
         )
-
-    @temporary_mutes.before_loop
-    async def wait_for_bot_ready(self):
-        await self.bot.wait_until_ready()
-
-    def mute_task(self):
-        if self.temporary_mutes.is_running():
-            self.temporary_mutes.restart()
-        else:
-            self.temporary_mutes.start()
+        if moved:
+            await self.bot.timers.load('mute')
+
+    @commands.Cog.listener()
+    async def on_mute_timers_complete(self, timers: typing.List[Timer]):
+        by_guild: typing.Dict[int, typing.List[Timer]] = {}
+        for timer in timers:
+            by_guild.setdefault(timer.data['guild_id'], []).append(timer)
+
+        for guild_id, guild_timers in by_guild.items():
+            guild = self.bot.get_guild(guild_id)
+            if not guild:
+                continue
+            role = (await self.bot.guild_config.get(guild_id)).get_mute_role(guild)
+            if not role or role > guild.me.top_role:
+                continue
+            for timer in guild_timers:
+                try:
+                    member = guild.get_member(timer.data['member_id']) or await guild.fetch_member(timer.data['member_id'])
+                    if member:
+                        await member.remove_roles(role)
+                except discord.HTTPException:
+                    pass
 
     # Indefinitely mute member
 
@@ -115,11 +113,7 @@ class MuteCommands(ModerationBase):
         except discord.Forbidden:
             raise commands.BadArgument(f"I don't seem to have permissions to add the `{role.name}` role")
 
-        await self.bot.db.execute(
-            'DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)', ctx.guild.id, member.id
-        )
-
-        self.mute_task()
+        await self.bot.timers.cancel('mute', mute_key(ctx.guild.id, member.id))
 
         if ctx.channel.permissions_for(role).send_messages_in_threads:
             embed = discord.Embed(
@@ -171,11 +165,6 @@ class MuteCommands(ModerationBase):
                 successful.append(member)
             except (discord.Forbidden, discord.HTTPException):
                 failed_internal.append(member)
-                continue
-
-            await self.bot.db.execute(
-                'DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)', ctx.guild.id, member.id
-            )
 
         failed = ""
 
@@ -186,13 +175,13 @@ class MuteCommands(ModerationBase):
         if failed_internal:
             failed += f"\n**{len(failed_internal)}** failed due to a discord error."
 
+        await self.bot.timers.cancel_many('mute', [mute_key(ctx.guild.id, m.id) for m in successful])
+
         await ctx.send(
             f"**Successfully muted {len(successful)}/{len(members)}**:"
             f"\n**Successful:** {', '.join([m.display_name for m in successful])}{failed}"
         )
 
-        self.mute_task()
-
     @commands.command(aliases=['hardmute'], name='hard-mute')
     @ensure_muterole()
     @commands.has_permissions(manage_roles=True)
@@ -215,11 +204,7 @@ class MuteCommands(ModerationBase):
         except discord.Forbidden:
             return await ctx.send(f"I don't seem to have permissions to add the `{role.name}` role")
 
-        await self.bot.db.execute(
-            'DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)', ctx.guild.id, member.id
-        )
-
-        self.mute_task()
+        await self.bot.timers.cancel('mute', mute_key(ctx.guild.id, member.id))
 
         not_removed = [r for r in member.roles if not r.is_assignable() and not r.is_default()]
         nl = '\n'
@@ -256,11 +241,7 @@ class MuteCommands(ModerationBase):
         except discord.Forbidden:
             return await ctx.send(f"I don't seem to have permissions to remove the `{role.name}` role")
 
-        await self.bot.db.execute(
-            'DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)', ctx.guild.id, member.id
-        )
-
-        self.mute_task()
+        await self.bot.timers.cancel('mute', mute_key(ctx.guild.id, member.id))
 
         reason = f"\nReason: {reason}" if reason else ""
         await ctx.send(f"**{ctx.author}** unmuted **{member}**{reason}", allowed_mentions=discord.AllowedMentions().none())
@@ -302,11 +283,8 @@ class MuteCommands(ModerationBase):
                 successful.append(member)
             except (discord.Forbidden, discord.HTTPException):
                 failed_internal.append(member)
-                continue
 
-            await self.bot.db.execute(
-                'DELETE FROM temporary_mutes WHERE (guild_id, member_id) = ($1, $2)', ctx.guild.id, member.id
-            )
+        await self.bot.timers.cancel_many('mute', [mute_key(ctx.guild.id, m.id) for m in successful])
 
         await ctx.send(
             f"**Successfully unmuted {len(successful)}/{len(members)}**:"
@@ -314,8 +292,6 @@ class MuteCommands(ModerationBase):
             f"\n**Failed:** {', '.join([m.display_name for m in failed_perms + failed_internal])}"
         )
 
-        self.mute_task()
-
     @commands.command()
     @ensure_muterole()
     @commands.bot_has_permissions(manage_roles=True)
@@ -351,18 +327,15 @@ class MuteCommands(ModerationBase):
         except discord.Forbidden:
             return await ctx.send(f"I don't seem to have permissions to add the `{role.name}` role")
 
-        await self.bot.db.execute(
-            "INSERT INTO temporary_mutes(guild_id, member_id, reason, end_time) "
-            "VALUES ($1, $2, $3, $4) ON CONFLICT (guild_id, member_id) DO "
-            "UPDATE SET reason = $3, end_time = $4",
-            ctx.guild.id,
-            ctx.author.id,
-            reason,
+        await self.bot.timers.create(
+            'mute',
+            mute_key(ctx.guild.id, ctx.author.id),
             duration.dt,
+            guild_id=ctx.guild.id,
+            member_id=ctx.author.id,
+            reason=reason,
         )
 
-        self.mute_task()
-
         await ctx.send(f"{self.bot.constants.SHUT_SEAGULL} 👍")
 
     # Temp-mute
@@ -395,18 +368,15 @@ class MuteCommands(ModerationBase):
         except discord.Forbidden:
             return await ctx.send(f"I don't seem to have permissions to add the `{role.name}` role")
 
-        await self.bot.db.execute(
-            "INSERT INTO temporary_mutes(guild_id, member_id, reason, end_time) "
-            "VALUES ($1, $2, $3, $4) ON CONFLICT (guild_id, member_id) DO "
-            "UPDATE SET reason = $3, end_time = $4",
-            ctx.guild.id,
-            member.id,
-            reason,
+        await self.bot.timers.create(
+            'mute',
+            mute_key(ctx.guild.id, member.id),
             duration.dt,
+            guild_id=ctx.guild.id,
+            member_id=member.id,
+            reason=reason,
         )
 
-        self.mute_task()
-
         await ctx.send(f"**{ctx.author}** muted **{member}** for **{delta}**")
 
     @commands.Cog.listener('on_guild_channel_create')
@@ -416,7 +386,7 @@ class MuteCommands(ModerationBase):
         """
         if not channel.permissions_for(channel.guild.me).manage_channels:
             return
-        mute_role = await self.bot.db.fetchval('SELECT muted_id FROM prefixes WHERE guild_id = $1', channel.guild.id)
+        mute_role = (await self.bot.guild_config.get(channel.guild.id)).muted_id
         if not mute_role:
             return
         role = channel.guild.get_role(int(mute_role))
@@ -1,4 +1,5 @@
-import asyncio
+import json
+import typing
 
 import discord
 from discord.ext import commands
@@ -11,7 +12,7 @@ from helpers.time_inputs import human_timedelta
 
 def require_snipe(should_be: bool = True):
     async def predicate(ctx: CustomContext) -> bool:
-        snipe = await ctx.bot.db.fetchval('SELECT snipe_enabled FROM prefixes WHERE guild_id = $1', ctx.guild.id)
+        snipe = (await ctx.bot.guild_config.get(ctx.guild.id)).snipe_enabled
         if bool(snipe) is should_be:
             return True
         else:
@@ -37,10 +38,11 @@ class SimpleAuthor:
 
 
 class SimpleMessage:
-    """A more memory efficient and non-slotted class to store
-    only the information I need for the snipe command."""
+    """A more memory efficient slotted class to store only the
+    information I need for the snipe command. Embeds and components
+    are kept as their raw dicts instead of live objects."""
 
-    __slots__ = ('content', 'author', 'embeds', 'timestamp', 'components')
+    __slots__ = ('content', 'author', 'embeds', 'timestamp', 'components', 'size')
 
     def __init__(self, message: discord.Message):
         if message.content:
@@ -52,9 +54,45 @@ class SimpleMessage:
         else:
             self.content = None
         self.author = SimpleAuthor(message.author)
-        self.embeds = message.embeds
+        self.embeds: typing.List[dict] = [e.to_dict() for e in message.embeds]
         self.timestamp = message.created_at
-        self.components = message.components
+        self.components: typing.List[dict] = [c.to_dict() for c in message.components]  # type: ignore
+        # rough estimate of how much memory this message holds on to, used by the snipe store's budget.
+        self.size = (
+            200
+            + len(self.content or '')
+            + len(self.author.name)
+            + len(self.author.avatar_url)
+            + (len(json.dumps(self.embeds)) if self.embeds else 0)
+            + (len(json.dumps(self.components)) if self.components else 0)
+        )
+
+    def build_view(self) -> typing.Optional[discord.ui.View]:
+        """Rebuilds the message's buttons and select menus, disabled."""
+        if not self.components:
+            return None
+        view = discord.ui.View(timeout=0)
+        for row, action_row in enumerate(self.components):
+            for component in action_row.get('components', []):
+                if component['type'] == discord.ComponentType.button.value:
+                    item = discord.ui.Button(
+                        style=discord.ButtonStyle(component.get('style', 1)),
+                        label=component.get('label'),
+                        url=component.get('url'),
+                        emoji=discord.PartialEmoji.from_dict(component['emoji']) if component.get('emoji') else None,
+                        disabled=True,
+                        row=row,
+                    )
+                elif component['type'] == discord.ComponentType.select.value:
+                    item = discord.ui.Select(placeholder=component.get('placeholder'), disabled=True, row=row)
+                    for option in component.get('options', []):
+                        item.add_option(
+                            label=option['label'], value=option['value'], description=option.get('description')
+                        )
+                else:
+                    continue
+                view.add_item(item)
+        return view
 
 
 class Snipe(ModerationBase):
@@ -64,7 +102,8 @@ class Snipe(ModerationBase):
     @commands.group(name='snipe', invoke_without_command=True)
     async def snipe(self, ctx: CustomContext, index: int = 1):
         try:
-            message = self.bot.snipes[ctx.guild.id][ctx.channel.id][-index]
+            messages = self.bot.snipes.get(ctx.guild.id, ctx.channel.id)
+            message = messages[-index]
             embed = discord.Embed(
                 description=message.content or '_No content in message_', timestamp=message.timestamp, colour=ctx.color
             )
@@ -72,15 +111,11 @@ class Snipe(ModerationBase):
                 name=f'{message.author} ({message.author.id}) said in #{ctx.channel}', icon_url=message.author.avatar_url
             )
             embed.set_footer(
-                text=f'Index {index-1}/{len(self.bot.snipes[ctx.channel.id][ctx.channel.id])} - '
+                text=f'Index {index}/{len(messages)} - '
                 f'Message sent {human_timedelta(message.timestamp)}, at'
             )
-            view = None
-            if message.components:
-                view = discord.ui.View.from_message(message, timeout=0)
-                for child in view.children:
-                    child.disabled = True
-            await ctx.send(embeds=[embed] + message.embeds[:9], view=view)
+            embeds = [embed] + [discord.Embed.from_dict(e) for e in message.embeds[:9]]
+            await ctx.send(embeds=embeds, view=message.build_view())  # type: ignore
         except (KeyError, IndexError):
             raise commands.BadArgument(f'No message found at index {index}')
 
@@ -88,17 +123,14 @@ class Snipe(ModerationBase):
     @commands.check_any(*snipe_checks)
     @snipe.command(name='enable')
     async def snipe_enable(self, ctx):
-        await self.bot.db.execute(
-            'INSERT INTO prefixes (guild_id, snipe_enabled) VALUES ($1, TRUE) ON CONFLICT (guild_id) DO UPDATE SET snipe_enabled = TRUE',
-            ctx.guild.id,
-        )
+        await self.bot.guild_config.update(ctx.guild.id, snipe_enabled=True)
         await ctx.send('✅ **snipe** has been enabled!')
 
     @require_snipe()
     @commands.check_any(*snipe_checks)
     @snipe.command(name='disable')
     async def snipe_disable(self, ctx):
-        await self.bot.db.execute("UPDATE prefixes SET snipe_enabled = FALSE WHERE guild_id = $1", ctx.guild.id)
+        await self.bot.guild_config.update(ctx.guild.id, snipe_enabled=False)
         await ctx.send('❌ **snipe** has been disabled!')
         await self.snipe_guild_remove(ctx.guild)
 
@@ -106,19 +138,16 @@ class Snipe(ModerationBase):
     async def snipe_hook(self, message: discord.Message):
         if not message.guild:
             return
-        if await self.bot.db.fetchval('SELECT snipe_enabled FROM prefixes WHERE guild_id = $1', message.guild.id):
-            self.bot.snipes[message.guild.id][message.channel.id].append(SimpleMessage(message))
+        if (await self.bot.guild_config.get(message.guild.id)).snipe_enabled:
+            self.bot.snipes.add(message.guild.id, message.channel.id, SimpleMessage(message))
 
     @commands.Cog.listener('on_guild_channel_delete')
     async def snipe_channel_delete(self, channel: discord.TextChannel):
-        if channel.guild.id in self.bot.snipes:
-            if channel.id in self.bot.snipes[channel.guild.id]:
-                del self.bot.snipes[channel.guild.id][channel.id]
+        self.bot.snipes.remove_channel(channel.guild.id, channel.id)
 
     @commands.Cog.listener('on_guild_remove')
     async def snipe_guild_remove_listener(self, guild: discord.Guild):
         await self.snipe_guild_remove(guild)
 
     async def snipe_guild_remove(self, guild: discord.Guild):
-        if guild.id in self.bot.snipes:
-            del self.bot.snipes[guild.id]
+        self.bot.snipes.remove_guild(guild.id)
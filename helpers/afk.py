@@ -0,0 +1,191 @@
+import asyncio
+import datetime
+import logging
+import typing
+
+import asyncpg
+
+log = logging.getLogger("afk")
+
+
+class AfkRecord:
+    """A user's row of the `afk` table."""
+
+    __slots__ = ("start_time", "reason", "auto_un_afk")
+
+    def __init__(
+        self,
+        start_time: typing.Optional[datetime.datetime] = None,
+        reason: typing.Optional[str] = None,
+        auto_un_afk: typing.Optional[bool] = None,
+    ) -> None:
+        self.start_time = start_time
+        self.reason = reason
+        self.auto_un_afk = auto_un_afk
+
+    @property
+    def is_afk(self) -> bool:
+        return self.start_time is not None
+
+
+class AfkCache:
+    """Every user's AFK record, loaded with one query at startup.
+
+    Going AFK and toggling automatic removal are written through right away.
+    Coming back is applied to the cache immediately, and written in batches every
+    `flush_interval` seconds, so messages from returning users and pings to AFK
+    users never wait on the database.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, *, flush_interval: float = 5.0) -> None:
+        self.pool = pool
+        self.flush_interval = flush_interval
+
+        self._records: typing.Dict[int, AfkRecord] = {}
+        # the IDs of users that are AFK right now, kept apart so mentions can be intersected with it.
+        self.away: typing.Set[int] = set()
+        # user ID to the start time of the AFK session that ended, waiting to be cleared in the database.
+        self._returned: typing.Dict[int, datetime.datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task] = None
+
+        # metrics
+        self.returns = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.away
+
+    def __len__(self) -> int:
+        return len(self.away)
+
+    def get(self, user_id: int) -> typing.Optional[AfkRecord]:
+        return self._records.get(user_id)
+
+    def auto_un_afk(self, user_id: int) -> typing.Optional[bool]:
+        record = self._records.get(user_id)
+        return record.auto_un_afk if record else None
+
+    async def load(self) -> None:
+        records = await self.pool.fetch(
+            "SELECT user_id, start_time, reason, auto_un_afk FROM afk "
+            "WHERE start_time IS NOT NULL OR auto_un_afk IS NOT NULL"
+        )
+        self._records = {r["user_id"]: AfkRecord(r["start_time"], r["reason"], r["auto_un_afk"]) for r in records}
+        self.away = {user_id for user_id, record in self._records.items() if record.is_afk}
+
+    async def refresh(self, user_id: int) -> None:
+        """Reloads one user's record, called when their row changes elsewhere."""
+        record = await self.pool.fetchrow("SELECT start_time, reason, auto_un_afk FROM afk WHERE user_id = $1", user_id)
+        if record is None:
+            self._records.pop(user_id, None)
+            self.away.discard(user_id)
+            return
+        new = AfkRecord(record["start_time"], record["reason"], record["auto_un_afk"])
+        returned = self._returned.get(user_id)
+        if returned is not None and new.start_time == returned:
+            # the database doesn't know they came back yet.
+            new.start_time = new.reason = None
+        self._set(user_id, new)
+
+    async def set_afk(self, user_id: int, start_time: datetime.datetime, reason: str) -> None:
+        await self.pool.execute(
+            "INSERT INTO afk (user_id, start_time, reason) VALUES ($1, $2, $3) "
+            "ON CONFLICT (user_id) DO UPDATE SET start_time = $2, reason = $3",
+            user_id,
+            start_time,
+            reason,
+        )
+        record = self._records.get(user_id) or AfkRecord()
+        record.start_time, record.reason = start_time, reason
+        self._set(user_id, record)
+
+    async def set_auto_un_afk(self, user_id: int, mode: bool) -> None:
+        await self.pool.execute(
+            "INSERT INTO afk (user_id, auto_un_afk) VALUES ($1, $2) ON CONFLICT (user_id) DO UPDATE SET auto_un_afk = $2",
+            user_id,
+            mode,
+        )
+        record = self._records.get(user_id) or AfkRecord()
+        record.auto_un_afk = mode
+        self._set(user_id, record)
+
+    def un_afk(self, user_id: int) -> typing.Optional[AfkRecord]:
+        """Ends the user's AFK session, returning it. The database is updated on the next flush."""
+        record = self._records.get(user_id)
+        if record is None or not record.is_afk:
+            return None
+        ended = AfkRecord(record.start_time, record.reason, record.auto_un_afk)
+        self._returned[user_id] = record.start_time  # type: ignore
+        record.start_time = record.reason = None
+        self._set(user_id, record)
+        self.returns += 1
+        self._wakeup.set()
+        return ended
+
+    def _set(self, user_id: int, record: AfkRecord) -> None:
+        if record.is_afk:
+            self.away.add(user_id)
+        else:
+            self.away.discard(user_id)
+        if record.is_afk or record.auto_un_afk is not None:
+            self._records[user_id] = record
+        else:
+            self._records.pop(user_id, None)
+
+    # Batched un-AFK writes
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="afk-writer")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._returned:
+                return 0
+            returned, self._returned = self._returned, {}
+            try:
+                # only clear the session that ended, in case they went AFK again before this ran.
+                await self.pool.executemany(
+                    "UPDATE afk SET start_time = NULL, reason = NULL WHERE user_id = $1 AND start_time = $2",
+                    list(returned.items()),
+                )
+            except Exception:
+                self.failed_flushes += 1
+                self._returned = {**returned, **self._returned}
+                raise
+            self.flushes += 1
+            return len(returned)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to write %s AFK returns", len(self._returned), exc_info=e)
+                self._wakeup.set()
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "records": len(self._records),
+            "away": len(self.away),
+            "pending_returns": len(self._returned),
+            "returns": self.returns,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import collections
+import datetime
+import logging
+import typing
+
+import discord
+
+log = logging.getLogger("audit_log")
+
+EntryCheck = typing.Callable[[discord.AuditLogEntry], bool]
+
+
+class AuditLogWaiter:
+    """Someone waiting for the audit log entry of an action they saw happen."""
+
+    __slots__ = ("actions", "target_id", "check", "since", "future")
+
+    def __init__(
+        self,
+        actions: typing.Collection[discord.AuditLogAction],
+        target_id: typing.Optional[int],
+        check: typing.Optional[EntryCheck],
+        since: datetime.datetime,
+    ) -> None:
+        self.actions = actions
+        self.target_id = target_id
+        self.check = check
+        self.since = since
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def matches(self, entry: discord.AuditLogEntry) -> bool:
+        # an older entry is of an earlier, identical action, like the first of ban, unban, ban.
+        if entry.action not in self.actions or entry.created_at < self.since:
+            return False
+        if self.target_id is not None and getattr(entry.target, 'id', None) != self.target_id:
+            return False
+        return self.check is None or self.check(entry)
+
+
+class GuildAuditLogPoller:
+    """Fetches a guild's new audit log entries, for as long as anyone is waiting on one."""
+
+    def __init__(self, service: 'AuditLogService', guild: discord.Guild) -> None:
+        self.service = service
+        self.guild = guild
+        self.waiters: typing.List[AuditLogWaiter] = []
+        # the entries seen lately, newest first, for waiters that show up after their entry was fetched.
+        self.recent: typing.Deque[discord.AuditLogEntry] = collections.deque(maxlen=service.recent_size)
+        self.last_id: typing.Optional[int] = None
+        self.last_fetch: typing.Optional[datetime.datetime] = None
+        self.task: typing.Optional[asyncio.Task] = None
+
+    def add(self, waiter: AuditLogWaiter) -> None:
+        cutoff = discord.utils.utcnow() - self.service.max_age
+        for entry in self.recent:
+            if entry.created_at >= cutoff and waiter.matches(entry):
+                waiter.future.set_result(entry)
+                self.service.matched += 1
+                return
+        self.waiters.append(waiter)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run(), name=f"audit-log-poller:{self.guild.id}")
+
+    async def _run(self) -> None:
+        while True:
+            # entries show up in the audit log a moment after the gateway event.
+            await asyncio.sleep(self.service.interval)
+            self.waiters = [waiter for waiter in self.waiters if not waiter.future.done()]
+            if not self.waiters:
+                return
+            try:
+                entries = await self.fetch()
+            except discord.HTTPException as e:
+                # most likely missing permissions, nobody gets an entry this time.
+                log.debug("Failed to fetch the audit log of %s", self.guild.id, exc_info=e)
+                for waiter in self.waiters:
+                    if not waiter.future.done():
+                        waiter.future.set_result(None)
+                self.waiters = []
+                return
+            self.dispatch(entries)
+
+    async def fetch(self) -> typing.List[discord.AuditLogEntry]:
+        self.service.requests += 1
+        now = discord.utils.utcnow()
+        # after a long pause, whatever happened in between is too old to match anyway.
+        stale = self.last_fetch is None or now - self.last_fetch > self.service.max_age
+        self.last_fetch = now
+        if self.last_id is None or stale:
+            entries = [entry async for entry in self.guild.audit_logs(limit=100)]
+        else:
+            # `after` pages through everything new, oldest first.
+            entries = [entry async for entry in self.guild.audit_logs(limit=None, after=discord.Object(self.last_id))]
+            entries.reverse()
+        if entries:
+            self.last_id = max(self.last_id or 0, entries[0].id)
+        return entries
+
+    def dispatch(self, entries: typing.List[discord.AuditLogEntry]) -> None:
+        """Hands the newest matching entry to each waiter."""
+        cutoff = discord.utils.utcnow() - self.service.max_age
+        entries = [entry for entry in entries if entry.created_at >= cutoff]
+        for entry in reversed(entries):
+            self.recent.appendleft(entry)
+        remaining = []
+        for waiter in self.waiters:
+            if waiter.future.done():
+                continue
+            entry = next((entry for entry in entries if waiter.matches(entry)), None)
+            if entry is None:
+                remaining.append(waiter)
+            else:
+                waiter.future.set_result(entry)
+                self.service.matched += 1
+        self.waiters = remaining
+
+
+class AuditLogService:
+    """Finds the audit log entries for the actions listeners see happen.
+
+    Every waiter of a guild shares one poller, which fetches the entries after
+    the newest one it saw every `interval` seconds, and only while someone is
+    waiting. A mass ban costs a few audit log requests, not one per member.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 1.5,
+        max_age: datetime.timedelta = datetime.timedelta(minutes=2),
+        event_delay: datetime.timedelta = datetime.timedelta(seconds=2),
+        recent_size: int = 100,
+    ) -> None:
+        self.interval = interval
+        self.max_age = max_age
+        self.event_delay = event_delay
+        self.recent_size = recent_size
+        self._pollers: typing.Dict[int, GuildAuditLogPoller] = {}
+
+        # metrics
+        self.waits = 0
+        self.requests = 0
+        self.matched = 0
+        self.timeouts = 0
+
+    async def wait_for(
+        self,
+        guild: discord.Guild,
+        action: typing.Union[discord.AuditLogAction, typing.Collection[discord.AuditLogAction]],
+        target: typing.Optional[discord.abc.Snowflake] = None,
+        *,
+        check: typing.Optional[EntryCheck] = None,
+        since: typing.Optional[datetime.datetime] = None,
+        timeout: float = 6.0,
+    ) -> typing.Optional[discord.AuditLogEntry]:
+        """Waits for the newest entry of the action(s) on the target that passes `check`, or None on timeout.
+
+        Only entries created at or after `since`, the time of the gateway event, are accepted.
+        It defaults to now, less `event_delay` for the event to have reached us after the entry was made.
+        """
+        actions = (action,) if isinstance(action, discord.AuditLogAction) else tuple(action)
+        if since is None:
+            since = discord.utils.utcnow() - self.event_delay
+        waiter = AuditLogWaiter(actions, target.id if target else None, check, since)
+        self.waits += 1
+
+        poller = self._pollers.get(guild.id)
+        if poller is None or poller.guild is not guild:
+            poller = self._pollers[guild.id] = GuildAuditLogPoller(self, guild)
+        poller.add(waiter)
+        try:
+            return await asyncio.wait_for(waiter.future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+
+    def close(self) -> None:
+        for poller in self._pollers.values():
+            if poller.task is not None:
+                poller.task.cancel()
+        self._pollers.clear()
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "guilds": len(self._pollers),
+            "waiting": sum(len(poller.waiters) for poller in self._pollers.values()),
+            "waits": self.waits,
+            "requests": self.requests,
+            "matched": self.matched,
+            "timeouts": self.timeouts,
+        }
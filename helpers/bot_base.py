@@ -1,3 +1,4 @@
+import asyncio
 import contextlib
 import datetime
 import io
@@ -5,10 +6,11 @@ import logging
 import os
 import re
 import sys
+import time
 import traceback
 import typing
 from collections import defaultdict, deque
-from typing import Dict, Iterable, List, Optional, Any, TYPE_CHECKING, Type
+from typing import Dict, Iterable, List, Optional, Any, Type
 
 import aiohttp
 import aiohttp.web
@@ -21,16 +23,28 @@ from discord.ext import commands
 from dotenv import load_dotenv
 from discord.ext import commands
 
-from cogs.economy.helper_classes import Wallet
 from helpers import constants
+from helpers.afk import AfkCache
+from helpers.audit_log import AuditLogService
+from helpers.coherency import CacheCoherency
+from helpers.command_recorder import CommandRecorder
+from helpers.command_rollups import CommandRollups
+from helpers.counting import CountingReward, CountWriter
 from helpers.context import CustomContext
+from helpers.economy_ledger import EconomyLedger
+from helpers.guild_config import GuildConfigCache
+from helpers.invite_snapshots import InviteSnapshots
+from helpers.item_catalog import ItemCatalog
+from helpers.leaderboard import Leaderboard
+from helpers.log_spool import LogCache
+from helpers.message_router import MessageRouter
+from helpers.modlog_store import ModlogStore
+from helpers.prefix_matcher import PrefixMatcher
+from helpers.snipe_store import SnipeStore
+from helpers.timers import TimerService
+from helpers.wallet_cache import WalletCache
 from helpers.helper import LoggingEventsFlags
 
-if TYPE_CHECKING:
-    from cogs.moderation.snipe import SimpleMessage
-else:
-    SimpleMessage = None
-
 initial_extensions = ("jishaku",)
 
 extensions = (
@@ -67,6 +81,10 @@ def col(color=None, /, *, fmt=0, bg=False):
     return base.format(fmt=fmt, color=color)
 
 
+def format_timings(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name}: {seconds * 1000:.0f}ms" for name, seconds in timings.items())
+
+
 def get_or_fail(var: str) -> str:
     v = os.getenv(var)
     if v is None:
@@ -74,6 +92,40 @@ def get_or_fail(var: str) -> str:
     return v
 
 
+LOGGING_EVENTS = (
+    "message_delete",
+    "message_purge",
+    "message_edit",
+    "member_join",
+    "member_leave",
+    "member_update",
+    "user_ban",
+    "user_unban",
+    "user_update",
+    "invite_create",
+    "invite_delete",
+    "voice_join",
+    "voice_leave",
+    "voice_move",
+    "voice_mod",
+    "emoji_create",
+    "emoji_delete",
+    "emoji_update",
+    "sticker_create",
+    "sticker_delete",
+    "sticker_update",
+    "server_update",
+    "stage_open",
+    "stage_close",
+    "channel_create",
+    "channel_delete",
+    "channel_edit",
+    "role_create",
+    "role_delete",
+    "role_edit",
+)
+
+
 class LoggingConfig:
     __slots__ = ("default", "message", "member", "join_leave", "voice", "server")
 
@@ -143,40 +195,67 @@ class BaseDuck(commands.AutoShardedBot):
         self.uptime = self.last_rall = datetime.datetime.utcnow()
         self.top_gg = topgg.client.DBLClient(get_or_fail("TOPGG_TOKEN"))
         self.dev_mode = True if os.getenv("DEV_MODE") == "yes" else False
+        self.lazy_cache = True if os.getenv("LAZY_CACHE") == "yes" else False
+        self.hydrated_shards: typing.Set[int] = set()
+        self._hydrating_shards: typing.Set[int] = set()
         self.dagpi_cooldown = commands.CooldownMapping.from_cooldown(60, 60, commands.BucketType.default)
         self.dagpi_client = DagpiClient(get_or_fail("DAGPI_TOKEN"))
         self.constants = constants
 
         # Cache stuff
         self.prefixes: Dict[int, Iterable[str]] = {}
+        # guild ID to the prefixes a matcher was compiled from, and the matcher.
+        self._prefix_matchers: Dict[Optional[int], typing.Tuple[Iterable[str], PrefixMatcher]] = {}
+        self._mention_pattern: Optional[re.Pattern] = None
+        self.prefix_rejects = 0
         self.blacklist = {}
-        self.afk_users = {}
-        self.auto_un_afk = {}
-        self.welcome_channels = {}
+        self.afk = AfkCache(pool)
         self.suggestion_channels = {}
         self.dm_webhooks = defaultdict(str)
-        self.wallets: typing.Dict[str, Wallet] = {}
+        self.wallets = WalletCache()
+        self.ledger = EconomyLedger(pool)
+        self.leaderboard = Leaderboard(pool)
+        self.item_catalog = ItemCatalog(pool)
         self.counting_channels = {}
-        self.counting_rewards = {}
+        self.counting_rewards: typing.Dict[int, typing.Dict[int, CountingReward]] = {}
+        self.count_writer = CountWriter(pool, self.counting_channels)
         self.saved_messages = {}
         self.common_discrims = []
         self.log_channels: typing.Dict[int, LoggingConfig] = {}
-        self.log_cache = defaultdict(lambda: defaultdict(list))
+        self.log_cache = LogCache(os.getenv("LOG_SPOOL_PATH") or "log_spool")
         self.guild_loggings: typing.Dict[int, LoggingEventsFlags] = {}
-        self.snipes: typing.Dict[int, typing.Dict[int, typing.Deque[SimpleMessage]]] = defaultdict(
-            lambda: defaultdict(lambda: deque(maxlen=50))
-        )
+        self.cache_timings: typing.Dict[str, float] = {}
+        self.guild_config = GuildConfigCache(pool)
+        self.modlogs = ModlogStore(pool)
+        self.snipes = SnipeStore()
+
+        self.command_recorder = CommandRecorder(pool)
+        self.command_rollups = CommandRollups(pool)
+        self.command_recorder.on_flush = self.command_rollups.apply
+        self.coherency = CacheCoherency(pool)
+        self._register_coherency()
+
+        self.message_router = MessageRouter(self)
+        self.audit_log = AuditLogService()
+        self.timers = TimerService(self)
 
         self.global_mapping = commands.CooldownMapping.from_cooldown(10, 12, commands.BucketType.user)
 
         self.invites: Dict[int, Dict[str, discord.Invite]] = {}
-        if TYPE_CHECKING:
-            self.expiring_invites = {}
-            self.shortest_invite: int = 0
-            self.last_update: int = 0
+        self.invite_snapshots = InviteSnapshots(pool, self.invites)
 
     async def setup_hook(self) -> None:
         await self.populate_cache()
+        await self.coherency.start()
+        await self.timers.start()
+        await self.modlogs.setup()
+        await self.ledger.start()
+        await self.leaderboard.load()
+        await self.command_rollups.setup()
+        self.command_recorder.start()
+        self.count_writer.start()
+        self.afk.start()
+        await self.invite_snapshots.start()
 
         for ext in initial_extensions:
             await self.load_extension(ext, _raise=False)
@@ -188,7 +267,11 @@ class BaseDuck(commands.AutoShardedBot):
         if not message:
             return commands.when_mentioned_or(*self.PRE)(bot, message) if not raw_prefix else self.PRE
         if not message.guild:
-            return commands.when_mentioned_or(*self.PRE)(bot, message) if not raw_prefix else self.PRE
+            if raw_prefix:
+                return self.PRE
+            matcher = self.get_prefix_matcher(None)
+            matched = matcher.match(message.content)
+            return [matched] if matched is not None else matcher.prefixes
         try:
             prefix = self.prefixes[message.guild.id]
         except KeyError:
@@ -196,18 +279,47 @@ class BaseDuck(commands.AutoShardedBot):
                 x["prefix"] for x in await bot.db.fetch("SELECT prefix FROM pre WHERE guild_id = $1", message.guild.id)
             ] or self.PRE
             self.prefixes[message.guild.id] = prefix
+        if raw_prefix:
+            return prefix
 
-        should_noprefix = False
+        matcher = self.get_prefix_matcher(message.guild.id)
+        matched = matcher.match(message.content)
+        if matched is None and self.is_owner_id(message.author.id) and (self.noprefix or self._should_noprefix(message)):
+            return [*matcher.prefixes, ""]
+        # commands resolve with the one matching prefix, but callers always get an iterable of prefixes.
+        return [matched] if matched is not None else matcher.prefixes
+
+    def _should_noprefix(self, message: discord.Message) -> bool:
         if not message.content.startswith(("jishaku", "eval", "jsk", "ev", "rall", "dev", "rmsg")):
-            pass
-        elif not message.guild:
-            should_noprefix = True
-        elif not message.guild.get_member(788278464474120202):
-            should_noprefix = True
+            return False
+        return not message.guild or not message.guild.get_member(788278464474120202)
 
-        if await bot.is_owner(message.author) and (bot.noprefix is True or should_noprefix):
-            return commands.when_mentioned_or(*prefix, "")(bot, message) if not raw_prefix else prefix
-        return commands.when_mentioned_or(*prefix)(bot, message) if not raw_prefix else prefix
+    def is_owner_id(self, user_id: int) -> bool:
+        """A synchronous is_owner, for the per message paths."""
+        return user_id == self.owner_id or user_id in (self.owner_ids or ())
+
+    def get_prefix_matcher(self, guild_id: Optional[int]) -> PrefixMatcher:
+        """Returns the guild's compiled prefixes, compiling them again only if they changed."""
+        prefixes = self.prefixes.get(guild_id, self.PRE) if guild_id is not None else self.PRE
+        try:
+            compiled_from, matcher = self._prefix_matchers[guild_id]
+            if compiled_from is prefixes:
+                return matcher
+        except KeyError:
+            pass
+        mentions = (f"<@{self.user.id}> ", f"<@!{self.user.id}> ") if self.user else ()
+        matcher = PrefixMatcher(prefixes, mentions)
+        self._prefix_matchers[guild_id] = (prefixes, matcher)
+        return matcher
+
+    def could_be_command(self, message: discord.Message) -> bool:
+        """Whether the message might invoke a command. Most messages are turned down by their first character."""
+        if message.author.bot:
+            return False
+        if self.is_owner_id(message.author.id) or (message.guild and message.guild.id not in self.prefixes):
+            # owners may use no prefix, and uncached prefixes are fetched in get_pre.
+            return True
+        return self.get_prefix_matcher(message.guild and message.guild.id).match(message.content) is not None
 
     async def fetch_prefixes(self, message):
         prefixes = [x["prefix"] for x in await self.db.fetch("SELECT prefix FROM pre WHERE guild_id = $1", message.guild.id)]
@@ -227,10 +339,23 @@ class BaseDuck(commands.AutoShardedBot):
         self.logger.info(f"{col(2)}======[ BOT ONLINE! ]======={col()}")
         self.logger.info(f"{col(2, bg=True)}Logged in as {self.user} {col()}")
 
+    async def add_cog(self, cog: commands.Cog, /, **kwargs: Any) -> None:
+        await super().add_cog(cog, **kwargs)
+        self.message_router.add_cog(cog)
+
+    async def remove_cog(self, name: str, /, **kwargs: Any) -> Optional[commands.Cog]:
+        cog = await super().remove_cog(name, **kwargs)
+        if cog is not None:
+            self.message_router.remove_cog(cog)
+        return cog
+
     async def on_message(self, message: discord.Message) -> None:
+        self.message_router.dispatch(message)
         await self.wait_until_ready()
         if self.user:
-            if re.fullmatch(rf"<@!?{self.user.id}>", message.content):
+            if self._mention_pattern is None:
+                self._mention_pattern = re.compile(rf"<@!?{self.user.id}>")
+            if self._mention_pattern.fullmatch(message.content):
                 prefix = await self.get_pre(self, message, raw_prefix=True)
                 if isinstance(prefix, str):
                     await message.reply(f"For a list of commands do `{prefix}help` 💞")
@@ -239,6 +364,9 @@ class BaseDuck(commands.AutoShardedBot):
                         f"My prefixes here are `{'`, `'.join(prefix[0:10])}`\n"
                         f"For a list of commands do`{prefix[0]}help` 💞"[0:2000]
                     )
+        if not self.could_be_command(message):
+            self.prefix_rejects += 1
+            return
         await self.process_commands(message)
 
     async def on_error(self, event_method: str, *args: Any, **kwargs: Any) -> None:
@@ -272,10 +400,20 @@ class BaseDuck(commands.AutoShardedBot):
             )
 
     async def populate_cache(self):
-        _temp_prefixes = defaultdict(list)
-        for x in await self.db.fetch("SELECT * FROM pre"):
-            _temp_prefixes[x["guild_id"]].append(x["prefix"] or self.PRE)
-        self.prefixes = dict(_temp_prefixes)
+        if self.lazy_cache:
+            # guild scoped caches are filled in per shard, as each one becomes ready. See on_shard_ready.
+            timings, total = await self._run_loaders(self._global_loaders())
+            self.cache_timings.update(timings)
+            self.logger.info(f"{col(2)}Global cache populated in {total * 1000:.0f}ms {col()}({format_timings(timings)})")
+            self.dispatch("cache_ready")
+            return
+
+        timings, total = await self._run_loaders({**self._global_loaders(), **self._guild_loaders()})
+        self.cache_timings.update(timings)
+        self.logger.info(
+            f"{col(2)}All cache populated successfully in {total * 1000:.0f}ms {col()}({format_timings(timings)})"
+        )
+        self.dispatch("cache_ready")
 
         async def _populate_guild_cache():
             await self.wait_until_ready()
@@ -287,31 +425,79 @@ class BaseDuck(commands.AutoShardedBot):
 
         self.loop.create_task(_populate_guild_cache())
 
+    async def on_shard_ready(self, shard_id: int) -> None:
+        if not self.lazy_cache or shard_id in self.hydrated_shards or shard_id in self._hydrating_shards:
+            return
+        # only marked hydrated once every loader succeeded, so a failed load is retried on the next READY.
+        self._hydrating_shards.add(shard_id)
+        try:
+            guild_ids = [guild.id for guild in self.guilds if guild.shard_id == shard_id]
+            timings, total = await self._run_loaders(self._guild_loaders(), guild_ids)
+        finally:
+            self._hydrating_shards.discard(shard_id)
+        self.hydrated_shards.add(shard_id)
+        for guild_id in guild_ids:
+            self.prefixes.setdefault(guild_id, self.PRE)
+
+        self.logger.info(
+            f"{col(2)}Shard {shard_id} cache populated for {len(guild_ids)} guilds in {total * 1000:.0f}ms "
+            f"{col()}({format_timings(timings)})"
+        )
+        self.dispatch("shard_cache_ready", shard_id)
+
+    def _global_loaders(self):
+        return {
+            "blacklist": self._load_blacklist,
+            "afk": self.afk.load,
+            "suggestion_channels": self._load_suggestion_channels,
+            "item_catalog": self.item_catalog.load,
+        }
+
+    def _guild_loaders(self):
+        return {
+            "prefixes": self._load_prefixes,
+            "guild_config": self.guild_config.load,
+            "counting_channels": self._load_counting_channels,
+            "counting_rewards": self._load_counting_rewards,
+            "logging": self._load_logging,
+        }
+
+    @staticmethod
+    async def _run_loaders(loaders, *args) -> typing.Tuple[typing.Dict[str, float], float]:
+        timings = {}
+
+        async def timed(name, loader):
+            start = time.perf_counter()
+            await loader(*args)
+            timings[name] = time.perf_counter() - start
+
+        # every loader is a single set-based query, so they can all run at once on their own connections.
+        start = time.perf_counter()
+        await asyncio.gather(*(timed(name, loader) for name, loader in loaders.items()))
+        return timings, time.perf_counter() - start
+
+    # The guild scoped loaders take an optional list of guild IDs to load, or load every guild when it is None.
+
+    async def _load_prefixes(self, guild_ids: Optional[List[int]] = None):
+        _temp_prefixes = defaultdict(list)
+        query = "SELECT guild_id, prefix FROM pre WHERE $1::BIGINT[] IS NULL OR guild_id = ANY($1::BIGINT[])"
+        for x in await self.db.fetch(query, guild_ids):
+            _temp_prefixes[x["guild_id"]].append(x["prefix"] or self.PRE)
+        self.prefixes.update(_temp_prefixes)
+
+    async def _load_blacklist(self):
         values = await self.db.fetch("SELECT user_id, is_blacklisted FROM blacklist")
         for value in values:
             self.blacklist[value["user_id"]] = value["is_blacklisted"] or False
 
-        values = await self.db.fetch("SELECT guild_id, welcome_channel FROM prefixes")
-        for value in values:
-            self.welcome_channels[value["guild_id"]] = value["welcome_channel"] or None
+    async def _load_suggestion_channels(self):
+        # suggestion channels are not stored with a guild ID, so these are always loaded globally.
+        records = await self.db.fetch("SELECT channel_id, image_only FROM suggestions")
+        self.suggestion_channels = {r["channel_id"]: r["image_only"] for r in records}
 
-        self.afk_users = dict(
-            [(r["user_id"], True) for r in (await self.db.fetch("SELECT user_id, start_time FROM afk")) if r["start_time"]]
-        )
-        self.auto_un_afk = dict(
-            [
-                (r["user_id"], r["auto_un_afk"])
-                for r in (await self.db.fetch("SELECT user_id, auto_un_afk FROM afk"))
-                if r["auto_un_afk"] is not None
-            ]
-        )
-        self.suggestion_channels = dict(
-            [
-                (r["channel_id"], r["image_only"])
-                for r in (await self.db.fetch("SELECT channel_id, image_only FROM suggestions"))
-            ]
-        )
-        self.counting_channels = dict(
+    async def _load_counting_channels(self, guild_ids: Optional[List[int]] = None):
+        query = "SELECT * FROM count_settings WHERE $1::BIGINT[] IS NULL OR guild_id = ANY($1::BIGINT[])"
+        self.counting_channels.update(
             (
                 x["guild_id"],
                 {
@@ -324,22 +510,39 @@ class BaseDuck(commands.AutoShardedBot):
                     "messages": deque(maxlen=100),
                 },
             )
-            for x in await self.db.fetch("SELECT * FROM count_settings")
+            for x in await self.db.fetch(query, guild_ids)
         )
 
-        for x in await self.db.fetch("SELECT * FROM counting"):
-            try:
-                self.counting_rewards[x["guild_id"]].add(x["reward_number"])
-            except KeyError:
-                self.counting_rewards[x["guild_id"]] = {x["reward_number"]}
-
-        for entry in await self.db.fetch("SELECT * FROM log_channels"):
-            guild_id = entry["guild_id"]
-            await self.db.execute(
-                "INSERT INTO logging_events(guild_id) VALUES ($1) ON CONFLICT (guild_id) DO NOTHING",
-                entry["guild_id"],
+    async def _load_counting_rewards(self, guild_ids: Optional[List[int]] = None):
+        query = "SELECT * FROM counting WHERE $1::BIGINT[] IS NULL OR guild_id = ANY($1::BIGINT[])"
+        for x in await self.db.fetch(query, guild_ids):
+            reward = CountingReward(x["reward_message"], x["role_to_grant"], x["reaction_to_add"])
+            self.counting_rewards.setdefault(x["guild_id"], {})[x["reward_number"]] = reward
+
+    async def _load_logging(self, guild_ids: Optional[List[int]] = None):
+        async with self.db.acquire() as conn:
+            # make sure every logging guild has a row of event flags, in one go.
+            await conn.execute(
+                "INSERT INTO logging_events (guild_id) SELECT guild_id FROM log_channels "
+                "WHERE $1::BIGINT[] IS NULL OR guild_id = ANY($1::BIGINT[]) "
+                "ON CONFLICT (guild_id) DO NOTHING",
+                guild_ids,
             )
+            records = await self._fetch_logging(conn, guild_ids)
+        self._apply_logging(records)
+
+    @staticmethod
+    async def _fetch_logging(conn, guild_ids: Optional[List[int]]) -> List[asyncpg.Record]:
+        return await conn.fetch(
+            f"SELECT log_channels.*, {', '.join(f'logging_events.{flag}' for flag in LOGGING_EVENTS)} "
+            "FROM log_channels JOIN logging_events USING (guild_id) "
+            "WHERE $1::BIGINT[] IS NULL OR guild_id = ANY($1::BIGINT[])",
+            guild_ids,
+        )
 
+    def _apply_logging(self, records: List[asyncpg.Record]) -> None:
+        for entry in records:
+            guild_id = entry["guild_id"]
             self.log_channels[guild_id] = LoggingConfig(
                 default=entry["default_channel"],
                 message=entry["message_channel"],
@@ -348,24 +551,133 @@ class BaseDuck(commands.AutoShardedBot):
                 voice=entry["voice_channel"],
                 server=entry["server_channel"],
             )
+            self.guild_loggings[guild_id] = LoggingEventsFlags(**{flag: entry[flag] for flag in LOGGING_EVENTS})
+
+    # Cache coherency. Each refresh reloads a single entry after its row changed, be it
+    # in this process, another one, or by hand. The reloads run after a lost listener reconnects.
+
+    def _register_coherency(self):
+        register = self.coherency.register
+        register("blacklist", "user_id", self._refresh_blacklist, reload=self._load_blacklist)
+        register("pre", "guild_id", self._refresh_prefixes, reload=self._load_prefixes)
+        register("afk", "user_id", self.afk.refresh, reload=self.afk.load)
+        register("items", "item_id", self.item_catalog.refresh, reload=self.item_catalog.load)
+        register("suggestions", "channel_id", self._refresh_suggestion_channel, reload=self._load_suggestion_channels)
+        register("prefixes", "guild_id", self.guild_config.refresh, reload=self.guild_config.load)
+        # the current number is written on every count, and the counting cog keeps it up to date itself.
+        register(
+            "count_settings",
+            "guild_id",
+            self._refresh_counting_channel,
+            reload=self._reload_counting_channels,
+            columns=("channel_id", "delete_messages", "reset_on_fail"),
+        )
+        register("counting", "guild_id", self._refresh_counting_rewards, reload=self._load_counting_rewards)
+        register("log_channels", "guild_id", self._refresh_logging, reload=self._load_logging, group="logging")
+        register("logging_events", "guild_id", self._refresh_logging, group="logging")
+
+    async def _refresh_blacklist(self, user_id: int):
+        record = await self.db.fetchrow("SELECT is_blacklisted FROM blacklist WHERE user_id = $1", user_id)
+        if record is None:
+            self.blacklist.pop(user_id, None)
+        else:
+            self.blacklist[user_id] = record["is_blacklisted"] or False
 
-            flags = dict(
-                await self.db.fetchrow(
-                    "SELECT message_delete, message_purge, message_edit, member_join, member_leave, member_update, user_ban, user_unban, "
-                    "user_update, invite_create, invite_delete, voice_join, voice_leave, voice_move, voice_mod, emoji_create, emoji_delete, "
-                    "emoji_update, sticker_create, sticker_delete, sticker_update, server_update, stage_open, stage_close, channel_create, "
-                    "channel_delete, channel_edit, role_create, role_delete, role_edit FROM logging_events WHERE guild_id = $1",
-                    guild_id,
-                )
-            )
-            self.guild_loggings[guild_id] = LoggingEventsFlags(**flags)
+    async def _refresh_prefixes(self, guild_id: int):
+        records = await self.db.fetch("SELECT prefix FROM pre WHERE guild_id = $1", guild_id)
+        self.prefixes[guild_id] = [r["prefix"] for r in records] or self.PRE
 
-        self.logger.info(f"{col(2)}All cache populated successfully")
-        self.dispatch("cache_ready")
+    async def _refresh_suggestion_channel(self, channel_id: int):
+        record = await self.db.fetchrow("SELECT image_only FROM suggestions WHERE channel_id = $1", channel_id)
+        if record is None:
+            self.suggestion_channels.pop(channel_id, None)
+        else:
+            self.suggestion_channels[channel_id] = record["image_only"]
+
+    async def _refresh_counting_channel(self, guild_id: int):
+        record = await self.db.fetchrow(
+            "SELECT channel_id, delete_messages, reset_on_fail FROM count_settings WHERE guild_id = $1", guild_id
+        )
+        settings = self.counting_channels.get(guild_id)
+        if record is None:
+            self.counting_channels.pop(guild_id, None)
+        elif settings is None or settings["channel"] != record["channel_id"]:
+            # a new counting channel starts over, so load it from scratch.
+            await self._load_counting_channels([guild_id])
+        else:
+            settings["delete_messages"] = record["delete_messages"]
+            settings["reset"] = record["reset_on_fail"]
+
+    async def _reload_counting_channels(self):
+        # like _refresh_counting_channel for every guild, so numbers not written by the CountWriter yet are kept.
+        records = await self.db.fetch("SELECT guild_id, channel_id, delete_messages, reset_on_fail FROM count_settings")
+        new = []
+        for record in records:
+            settings = self.counting_channels.get(record["guild_id"])
+            if settings is None or settings["channel"] != record["channel_id"]:
+                new.append(record["guild_id"])
+            else:
+                settings["delete_messages"] = record["delete_messages"]
+                settings["reset"] = record["reset_on_fail"]
+        for guild_id in set(self.counting_channels) - {r["guild_id"] for r in records}:
+            del self.counting_channels[guild_id]
+        if new:
+            await self._load_counting_channels(new)
+
+    async def _refresh_counting_rewards(self, guild_id: int):
+        records = await self.db.fetch("SELECT * FROM counting WHERE guild_id = $1", guild_id)
+        if records:
+            self.counting_rewards[guild_id] = {
+                r["reward_number"]: CountingReward(r["reward_message"], r["role_to_grant"], r["reaction_to_add"])
+                for r in records
+            }
+        else:
+            self.counting_rewards.pop(guild_id, None)
+
+    async def _refresh_logging(self, guild_id: int):
+        records = await self._fetch_logging(self.db, [guild_id])
+        if records:
+            self._apply_logging(records)
+        else:
+            self.log_channels.pop(guild_id, None)
+            self.guild_loggings.pop(guild_id, None)
 
     async def start(self, *args, **kwargs):
         await super().start(*args, **kwargs)
 
+    async def close(self) -> None:
+        await self.timers.close()
+        self.audit_log.close()
+        try:
+            await self.command_recorder.close()
+        except Exception as e:
+            self.logger.error("Failed to flush command usage on shutdown", exc_info=e)
+        try:
+            await self.count_writer.close()
+        except Exception as e:
+            self.logger.error("Failed to write the counting numbers on shutdown", exc_info=e)
+        try:
+            await self.afk.close()
+        except Exception as e:
+            self.logger.error("Failed to write AFK returns on shutdown", exc_info=e)
+        try:
+            await self.ledger.close()
+        except Exception as e:
+            self.logger.error("Failed to write the economy ledger on shutdown", exc_info=e)
+        try:
+            await self.invite_snapshots.close()
+        except Exception as e:
+            self.logger.error("Failed to snapshot the invites on shutdown", exc_info=e)
+        try:
+            await self.coherency.close()
+        except Exception as e:
+            self.logger.error("Failed to release the cache invalidation listener", exc_info=e)
+        try:
+            self.log_cache.persist()
+        except Exception as e:
+            self.logger.error("Failed to persist queued log embeds on shutdown", exc_info=e)
+        await super().close()
+
     async def load_extension(self, name: str, *, package: Optional[str] = None, _raise: bool = True) -> None:
         self._ext_log.info(f"{col(7)}Attempting to load {col(7, fmt=4)}{name}{col()}")
         try:
@@ -0,0 +1,289 @@
+import asyncio
+import hashlib
+import json
+import logging
+import statistics
+import time
+import typing
+from collections import deque
+
+import asyncpg
+
+log = logging.getLogger("coherency")
+
+Refresh = typing.Callable[[typing.Any], typing.Awaitable[None]]
+Reload = typing.Callable[[], typing.Awaitable[None]]
+
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM pg_notify(TG_ARGV[0], json_build_object(
+            'table', TG_TABLE_NAME,
+            'key', to_jsonb(OLD) -> TG_ARGV[1],
+            'sent', extract(epoch FROM clock_timestamp())
+        )::text);
+    END IF;
+    IF TG_OP = 'INSERT'
+       OR TG_OP = 'UPDATE' AND to_jsonb(OLD) -> TG_ARGV[1] IS DISTINCT FROM to_jsonb(NEW) -> TG_ARGV[1] THEN
+        PERFORM pg_notify(TG_ARGV[0], json_build_object(
+            'table', TG_TABLE_NAME,
+            'key', to_jsonb(NEW) -> TG_ARGV[1],
+            'sent', extract(epoch FROM clock_timestamp())
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def _version(definition: str) -> str:
+    return hashlib.sha1(definition.encode()).hexdigest()[:16]
+
+
+class _Table:
+    __slots__ = ("name", "key", "refresh", "reload", "columns", "group")
+
+    def __init__(
+        self,
+        name: str,
+        key: str,
+        refresh: Refresh,
+        reload: typing.Optional[Reload],
+        columns: typing.Optional[typing.Sequence[str]],
+        group: typing.Optional[str],
+    ) -> None:
+        self.name = name
+        self.key = key
+        self.refresh = refresh
+        self.reload = reload
+        self.columns = columns
+        self.group = group or name
+
+
+class CacheCoherency:
+    """Keeps the process-local caches in sync with the database.
+
+    Every registered table gets a trigger that sends a NOTIFY with the table name
+    and the changed row's key, so writes made by other bot processes, or by hand
+    through `dev sql`, reach every process. A dedicated connection listens for
+    them and calls the table's `refresh` coroutine with the key, which reloads
+    that one entry from the database.
+
+    If the listener connection is lost, it is re-opened with a backoff, and every
+    table's `reload` is called, since notifications sent while disconnected are gone.
+
+    The function and triggers are only (re)created when their definition changed,
+    which is tracked in their comments, so booting doesn't lock the hot tables.
+    """
+
+    channel = "cache_invalidation"
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        *,
+        health_check_interval: float = 30.0,
+        max_backoff: float = 60.0,
+    ) -> None:
+        self.pool = pool
+        self.health_check_interval = health_check_interval
+        self.max_backoff = max_backoff
+
+        self._tables: typing.Dict[str, _Table] = {}
+        self._conn: typing.Optional[asyncpg.Connection] = None
+        self._lost = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+        # keys with a refresh in flight, mapped to whether they were notified again meanwhile.
+        self._refreshing: typing.Dict[typing.Tuple[str, typing.Any], bool] = {}
+
+        # metrics
+        self.received = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.reconnects = 0
+        self.lag: typing.Deque[float] = deque(maxlen=1000)
+        self.max_lag = 0.0
+
+    def register(
+        self,
+        table: str,
+        key: str,
+        refresh: Refresh,
+        *,
+        reload: typing.Optional[Reload] = None,
+        columns: typing.Optional[typing.Sequence[str]] = None,
+        group: typing.Optional[str] = None,
+    ) -> None:
+        """Registers a cached table.
+
+        `key` is the column identifying a cache entry, and `columns` limits which
+        UPDATEs notify, for tables that also hold state the cache owns itself.
+        Tables sharing a `group` feed one cache entry, so their refreshes are serialized together.
+        """
+        self._tables[table] = _Table(table, key, refresh, reload, columns, group)
+
+    async def start(self) -> None:
+        async with self.pool.acquire() as conn:
+            function = await conn.fetchval(
+                "SELECT obj_description(oid, 'pg_proc') FROM pg_proc WHERE proname = 'notify_cache_invalidation'"
+            )
+            triggers = {
+                r["tgname"]: r["comment"]
+                for r in await conn.fetch(
+                    "SELECT tgname, obj_description(oid, 'pg_trigger') AS comment FROM pg_trigger "
+                    "WHERE tgname LIKE '%\\_cache\\_invalidation' AND NOT tgisinternal"
+                )
+            }
+            if function != _version(TRIGGER_FUNCTION):
+                async with conn.transaction():
+                    await conn.execute(TRIGGER_FUNCTION)
+                    await conn.execute(
+                        f"COMMENT ON FUNCTION notify_cache_invalidation() IS '{_version(TRIGGER_FUNCTION)}'"
+                    )
+            for table in self._tables.values():
+                trigger, definition = self._trigger(table)
+                if triggers.get(trigger) != _version(definition):
+                    async with conn.transaction():
+                        await self._install_trigger(conn, table)
+        await self._connect()
+        self._task = asyncio.create_task(self._supervise())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self._disconnect()
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        lag = sorted(self.lag)
+        return {
+            "connected": self._conn is not None and not self._conn.is_closed(),
+            "tables": len(self._tables),
+            "received": self.received,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "reconnects": self.reconnects,
+            "lag_mean_ms": round(statistics.fmean(lag) * 1000, 2) if lag else None,
+            "lag_p95_ms": round(lag[min(len(lag) - 1, int(len(lag) * 0.95))] * 1000, 2) if lag else None,
+            "lag_max_ms": round(self.max_lag * 1000, 2),
+        }
+
+    def _trigger(self, table: _Table) -> typing.Tuple[str, str]:
+        trigger = f"{table.name}_cache_invalidation"
+        update = f"UPDATE OF {', '.join(table.columns)}" if table.columns else "UPDATE"
+        return trigger, (
+            f"CREATE TRIGGER {trigger} AFTER INSERT OR {update} OR DELETE ON {table.name} "
+            f"FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('{self.channel}', '{table.key}')"
+        )
+
+    async def _install_trigger(self, conn: asyncpg.Connection, table: _Table) -> None:
+        trigger, definition = self._trigger(table)
+        await conn.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table.name}")
+        await conn.execute(definition)
+        await conn.execute(f"COMMENT ON TRIGGER {trigger} ON {table.name} IS '{_version(definition)}'")
+
+    # Listener connection
+
+    async def _connect(self) -> None:
+        conn = await self.pool.acquire()
+        try:
+            await conn.add_listener(self.channel, self._on_notification)
+            conn.add_termination_listener(self._on_termination)
+        except Exception:
+            await self.pool.release(conn)
+            raise
+        self._conn = conn
+        self._lost.clear()
+
+    async def _disconnect(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if not conn.is_closed():
+                await conn.remove_listener(self.channel, self._on_notification)
+        except Exception as e:
+            log.debug("Failed to remove the cache invalidation listener", exc_info=e)
+        finally:
+            conn.remove_termination_listener(self._on_termination)
+            await self.pool.release(conn)
+
+    def _on_termination(self, _conn: asyncpg.Connection) -> None:
+        self._lost.set()
+
+    async def _supervise(self) -> None:
+        while True:
+            # a connection that silently went away won't call the termination listener, so poke it now and then.
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                try:
+                    await asyncio.wait_for(self._conn.execute("SELECT 1"), timeout=10)  # type: ignore
+                    continue
+                except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError, AttributeError) as e:
+                    log.warning("Cache invalidation listener failed its health check", exc_info=e)
+
+            await self._disconnect()
+            await self._reconnect()
+
+    async def _reconnect(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await self._connect()
+                break
+            except (asyncpg.PostgresError, asyncpg.InterfaceError, OSError, asyncio.TimeoutError) as e:
+                log.warning("Failed to reconnect the cache invalidation listener, retrying in %.0fs", backoff, exc_info=e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+
+        self.reconnects += 1
+        log.info("Cache invalidation listener reconnected, reloading caches")
+        for table in self._tables.values():
+            if table.reload is None:
+                continue
+            try:
+                await table.reload()
+            except Exception as e:
+                log.error("Failed to reload the %s cache after reconnecting", table.name, exc_info=e)
+
+    # Notifications
+
+    def _on_notification(self, _conn, _pid, _channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            table = self._tables[data["table"]]
+        except (ValueError, KeyError):
+            log.warning("Ignoring malformed cache invalidation %r", payload)
+            return
+        self.received += 1
+        key = (table.group, data["key"])
+        if key in self._refreshing:
+            self._refreshing[key] = True
+            return
+        self._refreshing[key] = False
+        asyncio.create_task(self._refresh(table, data["key"], data["sent"]))
+
+    async def _refresh(self, table: _Table, key: typing.Any, sent: float) -> None:
+        # refreshes of one key never overlap, else an older read could finish last and win.
+        pending = (table.group, key)
+        try:
+            while True:
+                self._refreshing[pending] = False
+                try:
+                    await table.refresh(key)
+                    self.refreshed += 1
+                except Exception as e:
+                    self.failed += 1
+                    log.error("Failed to refresh %s %r", table.name, key, exc_info=e)
+                if not self._refreshing[pending]:
+                    break
+        finally:
+            del self._refreshing[pending]
+
+        # `sent` is the database's clock, so clock skew between it and this host is part of the lag.
+        lag = max(time.time() - sent, 0.0)
+        self.lag.append(lag)
+        self.max_lag = max(self.max_lag, lag)
@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import logging
+import time
+import typing
+from collections import deque
+
+import asyncpg
+
+log = logging.getLogger("command_recorder")
+
+CommandRecord = typing.Tuple[typing.Optional[int], int, str, datetime.datetime]
+
+
+class CommandRecorder:
+    """Write-behind buffer for the `commands` usage table.
+
+    Rows are appended to a bounded ring buffer and written in bulk with
+    COPY, either every `flush_interval` seconds or as soon as `batch_size`
+    rows are waiting, whichever comes first. When the buffer is full the
+    oldest rows are dropped and counted in `dropped`.
+    """
+
+    columns = ("guild_id", "user_id", "command", "timestamp")
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        *,
+        max_rows: int = 10_000,
+        batch_size: int = 500,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.pool = pool
+        self.max_rows = max_rows
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._buffer: typing.Deque[CommandRecord] = deque(maxlen=max_rows)
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task] = None
+
+        # metrics
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.high_water = 0
+        self.last_flush_duration = 0.0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="command-recorder")
+
+    async def close(self) -> None:
+        """Stops the background flusher and writes any pending rows."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def record(
+        self,
+        guild_id: typing.Optional[int],
+        user_id: int,
+        command: str,
+        timestamp: datetime.datetime,
+    ) -> None:
+        if len(self._buffer) >= self.max_rows:
+            self.dropped += 1
+        self._buffer.append((guild_id, user_id, command, timestamp))
+        self.recorded += 1
+        self.high_water = max(self.high_water, len(self._buffer))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Writes every buffered row to the database, returning how many were written."""
+        async with self._lock:
+            if not self._buffer:
+                return 0
+            records = list(self._buffer)
+            self._buffer.clear()
+            start = time.perf_counter()
+            try:
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.copy_records_to_table("commands", records=records, columns=self.columns)
+                        await self.on_flush(conn, records)
+            except Exception:
+                self.failed_flushes += 1
+                self._requeue(records)
+                raise
+            self.last_flush_duration = time.perf_counter() - start
+            self.flushes += 1
+            self.flushed += len(records)
+            return len(records)
+
+    async def on_flush(self, conn: asyncpg.Connection, records: typing.List[CommandRecord]) -> None:
+        """Called with every batch in the transaction writing it, so both commit or neither does. Does nothing by default."""
+        pass
+
+    def _requeue(self, records: typing.List[CommandRecord]) -> None:
+        # failed rows go back in front of anything recorded meanwhile,
+        # keeping the newest rows if that overflows the buffer.
+        pending = records + list(self._buffer)
+        overflow = max(0, len(pending) - self.max_rows)
+        self.dropped += overflow
+        self._buffer.clear()
+        self._buffer.extend(pending[overflow:])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to flush %s command usage rows", len(self._buffer), exc_info=e)
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "pending": len(self._buffer),
+            "max_rows": self.max_rows,
+            "high_water": self.high_water,
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 2),
+        }
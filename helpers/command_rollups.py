@@ -0,0 +1,144 @@
+import datetime
+import typing
+from collections import defaultdict
+
+import asyncpg
+
+if typing.TYPE_CHECKING:
+    from helpers.command_recorder import CommandRecord
+
+RollupKey = typing.Tuple[int, int, str, datetime.datetime]
+
+
+def to_utc(timestamp: datetime.datetime) -> datetime.datetime:
+    """A timestamp in UTC without a timezone, like the `commands` table stores them."""
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def to_hour(timestamp: datetime.datetime) -> datetime.datetime:
+    return to_utc(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+class CommandRollups:
+    """Command uses counted per guild, user, command and hour, in `command_rollups`.
+
+    Every batch the command recorder writes is folded in with one upsert, in the
+    same transaction, so the stats commands read a few rows per hour of activity
+    instead of every use ever recorded. Uses outside of guilds are counted under
+    guild 0. "Today" means the last 24 hours, to the hour.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+
+    async def setup(self) -> None:
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS command_rollups (
+                guild_id   BIGINT    NOT NULL,
+                user_id    BIGINT    NOT NULL,
+                command    TEXT      NOT NULL,
+                hour       TIMESTAMP NOT NULL,
+                uses       INTEGER   NOT NULL,
+                first_used TIMESTAMP NOT NULL,
+                PRIMARY KEY (guild_id, user_id, command, hour)
+            );
+            CREATE INDEX IF NOT EXISTS command_rollups_guild_hour_idx ON command_rollups (guild_id, hour);
+            """
+        )
+
+    async def apply(self, conn: asyncpg.Connection, records: typing.List['CommandRecord']) -> None:
+        """Folds a batch of `commands` rows into their hours."""
+        uses: typing.DefaultDict[RollupKey, int] = defaultdict(int)
+        first_used: typing.Dict[RollupKey, datetime.datetime] = {}
+        for guild_id, user_id, command, timestamp in records:
+            timestamp = to_utc(timestamp)
+            key = (guild_id or 0, user_id, command, to_hour(timestamp))
+            uses[key] += 1
+            if key not in first_used or timestamp < first_used[key]:
+                first_used[key] = timestamp
+        if not uses:
+            return
+        guild_ids, user_ids, commands, hours = zip(*uses)
+        await conn.execute(
+            """
+            INSERT INTO command_rollups (guild_id, user_id, command, hour, uses, first_used)
+            SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::text[], $4::timestamp[], $5::int[], $6::timestamp[])
+            ON CONFLICT (guild_id, user_id, command, hour) DO UPDATE
+            SET uses = command_rollups.uses + EXCLUDED.uses,
+                first_used = LEAST(command_rollups.first_used, EXCLUDED.first_used)
+            """,
+            guild_ids,
+            user_ids,
+            commands,
+            hours,
+            list(uses.values()),
+            [first_used[key] for key in uses],
+        )
+
+    async def backfill(self) -> int:
+        """Recounts every hour from the raw `commands` table, returning how many hours were written.
+
+        The truncate locks the rollups until the recount commits, so batches being
+        written meanwhile wait, and are added on top of it once they can.
+        """
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("TRUNCATE command_rollups")
+                status = await conn.execute(
+                    """
+                    INSERT INTO command_rollups (guild_id, user_id, command, hour, uses, first_used)
+                    SELECT COALESCE(guild_id, 0), user_id, command, date_trunc('hour', timestamp), COUNT(*), MIN(timestamp)
+                    FROM commands
+                    GROUP BY 1, 2, 3, 4
+                    """
+                )
+        return int(status.split()[-1])
+
+    async def totals(
+        self, guild_id: int, user_id: typing.Optional[int] = None
+    ) -> typing.Tuple[int, typing.Optional[datetime.datetime]]:
+        """How many commands were used, and when the first one was."""
+        record = await self.pool.fetchrow(
+            "SELECT COALESCE(SUM(uses), 0), MIN(first_used) FROM command_rollups "
+            "WHERE guild_id = $1 AND ($2::bigint IS NULL OR user_id = $2)",
+            guild_id,
+            user_id,
+        )
+        return record[0], record[1]
+
+    async def top_commands(
+        self,
+        guild_id: int,
+        user_id: typing.Optional[int] = None,
+        *,
+        today: bool = False,
+        limit: int = 5,
+    ) -> typing.List[asyncpg.Record]:
+        return await self.pool.fetch(
+            "SELECT command, SUM(uses) AS uses FROM command_rollups "
+            "WHERE guild_id = $1 AND ($2::bigint IS NULL OR user_id = $2) AND ($3::timestamp IS NULL OR hour >= $3) "
+            "GROUP BY command ORDER BY uses DESC LIMIT $4",
+            guild_id,
+            user_id,
+            self._since(today),
+            limit,
+        )
+
+    async def top_users(self, guild_id: int, *, today: bool = False, limit: int = 5) -> typing.List[asyncpg.Record]:
+        return await self.pool.fetch(
+            "SELECT user_id, SUM(uses) AS uses FROM command_rollups "
+            "WHERE guild_id = $1 AND ($2::timestamp IS NULL OR hour >= $2) "
+            "GROUP BY user_id ORDER BY uses DESC LIMIT $3",
+            guild_id,
+            self._since(today),
+            limit,
+        )
+
+    @staticmethod
+    def _since(today: bool) -> typing.Optional[datetime.datetime]:
+        if not today:
+            return None
+        return to_hour(datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1))
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import time
+import typing
+
+import asyncpg
+
+log = logging.getLogger("counting")
+
+
+class CountingReward(typing.NamedTuple):
+    message: typing.Optional[str]
+    role_id: typing.Optional[int]
+    reaction: typing.Optional[str]
+
+
+class CountWriter:
+    """Debounced write-behind for the counting game's current numbers.
+
+    The in memory `counting_channels` state is the source of truth while the bot
+    runs; counting a number only marks the guild as dirty. Every `flush_interval`
+    seconds the current number of each dirty guild is written in one UPDATE,
+    so a busy channel costs one write per interval instead of one per message.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        counting_channels: typing.Dict[int, typing.Dict[str, typing.Any]],
+        *,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.pool = pool
+        self.counting_channels = counting_channels
+        self.flush_interval = flush_interval
+
+        self._dirty: typing.Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task] = None
+
+        # metrics
+        self.marked = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_duration = 0.0
+
+    def __len__(self) -> int:
+        return len(self._dirty)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="count-writer")
+
+    async def close(self) -> None:
+        """Stops the background flusher and writes any pending numbers."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def mark(self, guild_id: int) -> None:
+        """Schedules the guild's current number to be written on the next flush."""
+        if not self._dirty:
+            self._wakeup.set()
+        self._dirty.add(guild_id)
+        self.marked += 1
+
+    async def flush(self) -> int:
+        """Writes the current number of every dirty guild, returning how many were written."""
+        async with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, set()
+            # the number is read now, not when it was marked, so only the latest count is written.
+            guild_ids, numbers = [], []
+            for guild_id in dirty:
+                settings = self.counting_channels.get(guild_id)
+                if settings is not None:
+                    guild_ids.append(guild_id)
+                    numbers.append(settings["number"])
+            if not guild_ids:
+                return 0
+            start = time.perf_counter()
+            try:
+                await self.pool.execute(
+                    "UPDATE count_settings SET current_number = v.number "
+                    "FROM UNNEST($1::BIGINT[], $2::BIGINT[]) AS v(guild_id, number) "
+                    "WHERE count_settings.guild_id = v.guild_id",
+                    guild_ids,
+                    numbers,
+                )
+            except Exception:
+                self.failed_flushes += 1
+                self._dirty |= dirty
+                raise
+            self.last_flush_duration = time.perf_counter() - start
+            self.flushes += 1
+            self.written += len(guild_ids)
+            return len(guild_ids)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # debounce: wait out the interval so every count in it shares one write.
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to write the counting numbers of %s guilds", len(self._dirty), exc_info=e)
+                self._wakeup.set()
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "pending": len(self._dirty),
+            "marked": self.marked,
+            "written": self.written,
+            "writes_saved": self.marked - self.written - len(self._dirty),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 2),
+        }
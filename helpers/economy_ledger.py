@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+import logging
+import time
+import typing
+
+import asyncpg
+
+log = logging.getLogger("economy_ledger")
+
+LedgerEntry = typing.Tuple[int, int, str, datetime.datetime]
+
+
+class EconomyLedger:
+    """An append-only history of every balance change, next to `economy.balance`.
+
+    `economy.balance` stays the live balance, changed with atomic SQL deltas.
+    After each change commits, its delta is recorded here, and the pending
+    entries are written with one COPY every `flush_interval` seconds, so
+    gambling spam costs one write per interval.
+
+    Every `compact_interval` seconds the entries are folded into a checkpoint
+    per user, so a balance can be derived from its checkpoint plus the entries
+    after it. The entries themselves are kept, for replaying disputes. After
+    each compaction the derived balances are checked against `economy.balance`.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        *,
+        flush_interval: float = 2.0,
+        compact_interval: float = 60 * 60,
+    ) -> None:
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+
+        self._pending: typing.List[LedgerEntry] = []
+        self._wakeup = asyncio.Event()
+        # held while writing or compacting, so entry IDs are only assigned in order of commit.
+        self._lock = asyncio.Lock()
+        self._tasks: typing.List[asyncio.Task] = []
+
+        # metrics
+        self.recorded = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_duration = 0.0
+        self.compactions = 0
+        self.last_mismatches: typing.Optional[int] = None
+
+    async def start(self) -> None:
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS economy_ledger (
+                id         BIGSERIAL   PRIMARY KEY,
+                user_id    BIGINT      NOT NULL,
+                delta      BIGINT      NOT NULL,
+                reason     TEXT        NOT NULL,
+                created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            CREATE INDEX IF NOT EXISTS economy_ledger_user_id_idx ON economy_ledger (user_id, id);
+            CREATE TABLE IF NOT EXISTS economy_checkpoints (
+                user_id      BIGINT      PRIMARY KEY,
+                balance      BIGINT      NOT NULL,
+                ledger_id    BIGINT      NOT NULL,
+                compacted_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+            );
+            """
+        )
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM economy_checkpoints)"):
+                    # the balances from before there was a ledger become the first checkpoints.
+                    await conn.execute(
+                        "INSERT INTO economy_checkpoints (user_id, balance, ledger_id) "
+                        "SELECT user_id, balance, (SELECT COALESCE(MAX(id), 0) FROM economy_ledger) FROM economy"
+                    )
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._run(), name="economy-ledger"),
+                asyncio.create_task(self._compact_periodically(), name="economy-ledger-compaction"),
+            ]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        await self.flush()
+
+    def record(self, user_id: int, delta: int, reason: str) -> None:
+        """Queues a committed balance change."""
+        if not delta:
+            return
+        if not self._pending:
+            self._wakeup.set()
+        self._pending.append((user_id, delta, reason, datetime.datetime.now(datetime.timezone.utc)))
+        self.recorded += 1
+
+    async def flush(self) -> int:
+        async with self._lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        start = time.perf_counter()
+        try:
+            await self.pool.copy_records_to_table(
+                "economy_ledger", records=pending, columns=("user_id", "delta", "reason", "created_at")
+            )
+        except Exception:
+            self.failed_flushes += 1
+            self._pending = pending + self._pending
+            raise
+        self.last_flush_duration = time.perf_counter() - start
+        self.flushes += 1
+        self.written += len(pending)
+        return len(pending)
+
+    async def compact(self) -> int:
+        """Folds every entry into its user's checkpoint, returning how many checkpoints moved."""
+        async with self._lock:
+            await self._flush()
+            status = await self.pool.execute(
+                """
+                INSERT INTO economy_checkpoints (user_id, balance, ledger_id, compacted_at)
+                SELECT l.user_id, COALESCE(c.balance, 0) + SUM(l.delta), MAX(l.id), NOW()
+                FROM economy_ledger l LEFT JOIN economy_checkpoints c USING (user_id)
+                WHERE l.id > COALESCE(c.ledger_id, 0)
+                GROUP BY l.user_id, c.balance
+                ON CONFLICT (user_id) DO UPDATE
+                SET balance = EXCLUDED.balance, ledger_id = EXCLUDED.ledger_id, compacted_at = EXCLUDED.compacted_at
+                """
+            )
+            self.compactions += 1
+            return int(status.split()[-1])
+
+    async def verify(self) -> typing.List[asyncpg.Record]:
+        """Returns the users whose checkpoint plus entries doesn't add up to their `economy.balance`.
+
+        A change that commits while this runs but isn't recorded yet shows up as a
+        false positive, so a mismatch is only worth a look if it shows up twice.
+        """
+        async with self._lock:
+            await self._flush()
+            return await self.pool.fetch(
+                """
+                SELECT e.user_id, e.balance, COALESCE(c.balance, 0) + COALESCE(SUM(l.delta), 0) AS derived
+                FROM economy e
+                LEFT JOIN economy_checkpoints c USING (user_id)
+                LEFT JOIN economy_ledger l ON l.user_id = e.user_id AND l.id > COALESCE(c.ledger_id, 0)
+                GROUP BY e.user_id, e.balance, c.balance
+                HAVING e.balance <> COALESCE(c.balance, 0) + COALESCE(SUM(l.delta), 0)
+                """
+            )
+
+    async def history(self, user_id: int, *, limit: int = 20) -> typing.List[asyncpg.Record]:
+        """The user's latest entries, newest first, with the balance after each one."""
+        await self.flush()
+        return await self.pool.fetch(
+            """
+            WITH current AS (
+                SELECT COALESCE(c.balance, 0) + COALESCE(
+                    (SELECT SUM(delta) FROM economy_ledger WHERE user_id = $1 AND id > COALESCE(c.ledger_id, 0)), 0
+                ) AS balance
+                FROM (SELECT 1) one LEFT JOIN economy_checkpoints c ON c.user_id = $1
+            )
+            SELECT id, delta, reason, created_at,
+                   (SELECT balance FROM current)
+                   - COALESCE(SUM(delta) OVER (ORDER BY id DESC ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING), 0)
+                   AS balance
+            FROM economy_ledger WHERE user_id = $1
+            ORDER BY id DESC LIMIT $2
+            """,
+            user_id,
+            limit,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to write %s economy ledger entries", len(self._pending), exc_info=e)
+                self._wakeup.set()
+
+    async def _compact_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.compact_interval)
+            try:
+                await self.compact()
+                mismatches = await self.verify()
+            except Exception as e:
+                log.error("Failed to compact the economy ledger", exc_info=e)
+                continue
+            self.last_mismatches = len(mismatches)
+            if mismatches:
+                log.warning(
+                    "%s balances don't match the economy ledger: %s",
+                    len(mismatches),
+                    ", ".join(f"{r['user_id']} ({r['balance']} != {r['derived']})" for r in mismatches[:10]),
+                )
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 2),
+            "compactions": self.compactions,
+            "last_mismatches": self.last_mismatches,
+        }
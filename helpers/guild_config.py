@@ -0,0 +1,127 @@
+import typing
+
+import asyncpg
+import discord
+
+
+class GuildConfig:
+    """A guild's row of the `prefixes` table."""
+
+    __slots__ = ("guild_id", "welcome_channel", "welcome_message", "snipe_enabled", "muted_id", "modlog", "special_roles")
+
+    def __init__(
+        self,
+        guild_id: int,
+        *,
+        welcome_channel: typing.Optional[int] = None,
+        welcome_message: typing.Optional[str] = None,
+        snipe_enabled: typing.Optional[bool] = False,
+        muted_id: typing.Optional[int] = None,
+        modlog: typing.Optional[int] = None,
+        special_roles: typing.Optional[typing.List[int]] = None,
+    ) -> None:
+        self.guild_id: int = guild_id
+        self.welcome_channel: typing.Optional[int] = welcome_channel
+        self.welcome_message: typing.Optional[str] = welcome_message
+        self.snipe_enabled: bool = bool(snipe_enabled)
+        self.muted_id: typing.Optional[int] = muted_id
+        self.modlog: typing.Optional[int] = modlog
+        self.special_roles: typing.FrozenSet[int] = frozenset(special_roles or ())
+
+    @classmethod
+    def from_record(cls, record: asyncpg.Record) -> 'GuildConfig':
+        return cls(**{column: record[column] for column in cls.__slots__})
+
+    def __repr__(self) -> str:
+        attrs = " ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"<GuildConfig {attrs}>"
+
+    def get_mute_role(self, guild: discord.Guild) -> typing.Optional[discord.Role]:
+        return guild.get_role(self.muted_id) if self.muted_id else None
+
+    def get_modlog_channel(self, guild: discord.Guild) -> typing.Optional[discord.abc.GuildChannel]:
+        return guild.get_channel(self.modlog) if self.modlog else None
+
+    def get_welcome_channel(self, guild: discord.Guild) -> typing.Optional[discord.abc.GuildChannel]:
+        return guild.get_channel(self.welcome_channel) if self.welcome_channel else None
+
+
+COLUMNS = GuildConfig.__slots__
+SELECT_COLUMNS = ", ".join(COLUMNS)
+
+
+class GuildConfigCache:
+    """Process-local, write-through cache of every guild's GuildConfig.
+
+    Writes go through `update` or `execute`, which write to Postgres and cache the
+    returned row. Other processes pick the change up through the cache coherency
+    trigger on the `prefixes` table, which calls `refresh`.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        self._configs: typing.Dict[int, GuildConfig] = {}
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._configs
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    async def load(self, guild_ids: typing.Optional[typing.List[int]] = None) -> None:
+        """Loads every guild's config, or only the given guilds', in one query."""
+        records = await self.pool.fetch(
+            f"SELECT {SELECT_COLUMNS} FROM prefixes WHERE $1::BIGINT[] IS NULL OR guild_id = ANY($1::BIGINT[])",
+            guild_ids,
+        )
+        for record in records:
+            self._configs[record["guild_id"]] = GuildConfig.from_record(record)
+
+    def get_cached(self, guild_id: int) -> typing.Optional[GuildConfig]:
+        return self._configs.get(guild_id)
+
+    async def get(self, guild_id: int) -> GuildConfig:
+        """Returns the guild's config, only querying the database on a cache miss."""
+        try:
+            return self._configs[guild_id]
+        except KeyError:
+            pass
+        record = await self.pool.fetchrow(f"SELECT {SELECT_COLUMNS} FROM prefixes WHERE guild_id = $1", guild_id)
+        config = self._configs[guild_id] = GuildConfig.from_record(record) if record else GuildConfig(guild_id)
+        return config
+
+    async def update(self, guild_id: int, **values: typing.Any) -> GuildConfig:
+        """Upserts the given columns and caches the resulting row."""
+        for column in values:
+            if column not in COLUMNS or column == "guild_id":
+                raise TypeError(f"{column!r} is not a guild config column")
+        columns = list(values)
+        query = (
+            f"INSERT INTO prefixes (guild_id, {', '.join(columns)}) "
+            f"VALUES ($1, {', '.join(f'${i}' for i in range(2, len(columns) + 2))}) "
+            f"ON CONFLICT (guild_id) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in columns)} "
+            f"RETURNING {SELECT_COLUMNS}"
+        )
+        return await self.execute(guild_id, query, guild_id, *values.values())
+
+    async def execute(self, guild_id: int, query: str, *args: typing.Any) -> GuildConfig:
+        """Runs a write query that ends in `RETURNING` the config columns, and caches the result."""
+        record = await self.pool.fetchrow(query, *args)
+        config = self._configs[guild_id] = GuildConfig.from_record(record) if record else GuildConfig(guild_id)
+        return config
+
+    async def delete(self, guild_id: int) -> None:
+        await self.pool.execute("DELETE FROM prefixes WHERE guild_id = $1", guild_id)
+        self.invalidate(guild_id)
+
+    def invalidate(self, guild_id: int) -> None:
+        """Drops the cached config, so the next `get` loads it again."""
+        self._configs.pop(guild_id, None)
+
+    async def refresh(self, guild_id: int) -> None:
+        """Reloads one guild's config, called when its row changes elsewhere."""
+        record = await self.pool.fetchrow(f"SELECT {SELECT_COLUMNS} FROM prefixes WHERE guild_id = $1", guild_id)
+        if record:
+            self._configs[guild_id] = GuildConfig.from_record(record)
+        else:
+            self.invalidate(guild_id)
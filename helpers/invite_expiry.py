@@ -0,0 +1,97 @@
+import datetime
+import heapq
+import typing
+
+import discord
+
+InviteKey = typing.Tuple[int, str]
+
+
+def invite_expires_at(invite: discord.Invite) -> typing.Optional[datetime.datetime]:
+    """When the invite expires, if it does.
+
+    Invites from the gateway and some fetched ones don't carry `expires_at`,
+    so it is worked out from their creation and max age instead.
+    """
+    if invite.expires_at is not None:
+        return invite.expires_at
+    if invite.max_age and invite.created_at is not None:
+        return invite.created_at + datetime.timedelta(seconds=invite.max_age)
+    return None
+
+
+class InviteExpiryIndex:
+    """When each cached invite expires, as a min-heap of (expiry, guild ID, code).
+
+    Adding an invite is O(log n). Removing one only forgets its expiry, and the
+    stale heap entry is skipped when it reaches the top, so removals are O(1).
+    """
+
+    def __init__(self) -> None:
+        self._heap: typing.List[typing.Tuple[datetime.datetime, int, str]] = []
+        # guild ID to each of its expiring invites' expiry, the source of truth for the heap.
+        self._expiries: typing.Dict[int, typing.Dict[str, datetime.datetime]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(invites) for invites in self._expiries.values())
+
+    def add(self, guild_id: int, code: str, expires_at: typing.Optional[datetime.datetime]) -> bool:
+        """Indexes an invite. Returns whether it is now the first one to expire."""
+        if expires_at is None:
+            self.remove(guild_id, code)
+            return False
+        self._expiries.setdefault(guild_id, {})[code] = expires_at
+        heapq.heappush(self._heap, (expires_at, guild_id, code))
+        return self._heap[0] == (expires_at, guild_id, code)
+
+    def remove(self, guild_id: int, code: str) -> None:
+        invites = self._expiries.get(guild_id)
+        if invites is not None:
+            invites.pop(code, None)
+            if not invites:
+                del self._expiries[guild_id]
+
+    def replace_guild(
+        self, guild_id: int, invites: typing.Iterable[typing.Tuple[str, typing.Optional[datetime.datetime]]]
+    ) -> None:
+        """Re-indexes a guild whose invites were fetched again."""
+        self.remove_guild(guild_id)
+        for code, expires_at in invites:
+            self.add(guild_id, code, expires_at)
+        if len(self._heap) > 2 * len(self) + 64:
+            self._compact()
+
+    def remove_guild(self, guild_id: int) -> None:
+        self._expiries.pop(guild_id, None)
+
+    def next_expiry(self) -> typing.Optional[datetime.datetime]:
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime.datetime) -> typing.List[InviteKey]:
+        """Removes and returns every invite that expired by `now`."""
+        due = []
+        while self._drop_stale() and self._heap[0][0] <= now:
+            _, guild_id, code = heapq.heappop(self._heap)
+            self.remove(guild_id, code)
+            due.append((guild_id, code))
+        return due
+
+    def _compact(self) -> None:
+        # guilds that get re-indexed often leave stale entries behind that may not expire for days.
+        self._heap = [
+            (expires_at, guild_id, code)
+            for guild_id, invites in self._expiries.items()
+            for code, expires_at in invites.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def _drop_stale(self) -> bool:
+        # pops the entries of invites that were removed or got another expiry, returns whether any are left.
+        heap = self._heap
+        while heap:
+            expires_at, guild_id, code = heap[0]
+            if self._expiries.get(guild_id, {}).get(code) == expires_at:
+                return True
+            heapq.heappop(heap)
+        return False
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+import typing
+
+import asyncpg
+import discord
+
+from helpers.invite_expiry import invite_expires_at
+
+log = logging.getLogger("invite_snapshots")
+
+COLUMNS = (
+    "guild_id",
+    "code",
+    "vanity",
+    "uses",
+    "max_uses",
+    "max_age",
+    "temporary",
+    "inviter_id",
+    "channel_id",
+    "created_at",
+    "expires_at",
+)
+
+
+def invite_from_record(bot: discord.Client, guild: discord.Guild, record: asyncpg.Record) -> discord.Invite:
+    """Rebuilds a snapshotted invite, resolving its channel and inviter from the cache."""
+    data = {
+        "code": record["code"],
+        "uses": record["uses"],
+        "max_uses": record["max_uses"],
+        "max_age": record["max_age"],
+        "temporary": record["temporary"],
+        "created_at": record["created_at"] and record["created_at"].isoformat(),
+        "expires_at": record["expires_at"] and record["expires_at"].isoformat(),
+    }
+    invite = discord.Invite(
+        state=bot._connection, data=data, guild=guild, channel=guild.get_channel(record["channel_id"])  # type: ignore
+    )
+    if record["inviter_id"] is not None:
+        invite.inviter = guild.get_member(record["inviter_id"]) or bot.get_user(record["inviter_id"])
+    return invite
+
+
+class InviteSnapshots:
+    """Write-behind snapshots of the invite cache, so it can be restored instantly on boot.
+
+    Changing a guild's cached invites only marks it as dirty. Every `flush_interval`
+    seconds every dirty guild's invites are replaced in `invite_snapshots` in one
+    transaction, and whatever is left is written on shutdown.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        invites: typing.Dict[int, typing.Dict[str, discord.Invite]],
+        *,
+        flush_interval: float = 300.0,
+    ) -> None:
+        self.pool = pool
+        self.invites = invites
+        self.flush_interval = flush_interval
+
+        self._dirty: typing.Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task] = None
+
+        # metrics
+        self.restored = 0
+        self.written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_duration = 0.0
+
+    async def start(self) -> None:
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS invite_snapshots (
+                guild_id BIGINT NOT NULL,
+                code TEXT NOT NULL,
+                vanity BOOLEAN NOT NULL DEFAULT FALSE,
+                uses INTEGER,
+                max_uses INTEGER,
+                max_age INTEGER,
+                temporary BOOLEAN,
+                inviter_id BIGINT,
+                channel_id BIGINT,
+                created_at TIMESTAMPTZ,
+                expires_at TIMESTAMPTZ,
+                snapshot_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (guild_id, code)
+            )
+            """
+        )
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="invite-snapshots")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def load(self) -> typing.Dict[int, typing.List[asyncpg.Record]]:
+        """Returns the snapshotted invites by guild ID, leaving out the ones that already expired."""
+        records = await self.pool.fetch(
+            f"SELECT {', '.join(COLUMNS)} FROM invite_snapshots WHERE expires_at IS NULL OR expires_at > NOW()"
+        )
+        by_guild: typing.Dict[int, typing.List[asyncpg.Record]] = {}
+        for record in records:
+            by_guild.setdefault(record["guild_id"], []).append(record)
+        self.restored = len(records)
+        return by_guild
+
+    def mark(self, guild_id: int) -> None:
+        """Schedules the guild's cached invites to be snapshotted on the next flush."""
+        if not self._dirty:
+            self._wakeup.set()
+        self._dirty.add(guild_id)
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, set()
+            rows = []
+            for guild_id in dirty:
+                invites = self.invites.get(guild_id) or {}
+                vanity = invites.get("VANITY")
+                for key, invite in invites.items():
+                    # the vanity invite is cached twice, under its code and under "VANITY".
+                    if key != invite.code:
+                        continue
+                    rows.append(
+                        (
+                            guild_id,
+                            invite.code,
+                            invite is vanity,
+                            invite.uses,
+                            invite.max_uses,
+                            invite.max_age,
+                            invite.temporary,
+                            invite.inviter and invite.inviter.id,
+                            invite.channel and invite.channel.id,
+                            invite.created_at,
+                            invite_expires_at(invite),
+                        )
+                    )
+            start = time.perf_counter()
+            try:
+                async with self.pool.acquire() as conn:
+                    async with conn.transaction():
+                        await conn.execute("DELETE FROM invite_snapshots WHERE guild_id = ANY($1::BIGINT[])", list(dirty))
+                        if rows:
+                            await conn.copy_records_to_table("invite_snapshots", records=rows, columns=COLUMNS)
+            except Exception:
+                self.failed_flushes += 1
+                self._dirty |= dirty
+                raise
+            self.last_flush_duration = time.perf_counter() - start
+            self.flushes += 1
+            self.written += len(rows)
+            return len(rows)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                log.error("Failed to snapshot the invites of %s guilds", len(self._dirty), exc_info=e)
+                self._wakeup.set()
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "pending": len(self._dirty),
+            "restored": self.restored,
+            "written": self.written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_duration * 1000, 2),
+        }
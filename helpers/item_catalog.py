@@ -0,0 +1,139 @@
+import re
+import typing
+from collections import Counter
+
+import asyncpg
+
+WORD = re.compile(r"\w+")
+
+
+def trigrams(text: str) -> typing.FrozenSet[str]:
+    """The trigrams of `text` the way pg_trgm makes them, per word, lowercased, padded by two spaces before and one after."""
+    grams = set()
+    for word in WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class CatalogItem:
+    """An `items` row."""
+
+    __slots__ = ("item_id", "item_name", "price", "stock", "noises", "messages")
+
+    def __init__(self, record: typing.Mapping[str, typing.Any]) -> None:
+        self.item_id: int = record["item_id"]
+        self.item_name: str = record["item_name"]
+        self.price: int = record["price"]
+        self.stock: int = record["stock"]
+        self.noises: typing.Optional[typing.List[str]] = record.get("noises")
+        self.messages: typing.Optional[typing.List[str]] = record.get("messages")
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        # so it can be passed to `ShopItem.from_db` like a record.
+        return getattr(self, key, default)
+
+
+class ItemCatalog:
+    """The market's items, loaded with one query at startup.
+
+    Items are found by ID, by case-insensitive name, or fuzzily through a trigram
+    index that scores like pg_trgm's `similarity()`. Stock stays authoritative in
+    the database: buying and selling change it there, and write the new stock
+    back here once committed. Changes made elsewhere arrive through cache coherency.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        self._items: typing.Dict[int, CatalogItem] = {}
+        self._names: typing.Dict[str, int] = {}
+        self._grams: typing.Dict[int, typing.FrozenSet[str]] = {}
+        self._index: typing.Dict[str, typing.Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self._items
+
+    def __iter__(self) -> typing.Iterator[CatalogItem]:
+        return iter(self._items.values())
+
+    async def load(self) -> None:
+        records = await self.pool.fetch("SELECT * FROM items")
+        self._items, self._names, self._grams, self._index = {}, {}, {}, {}
+        for record in records:
+            self._add(CatalogItem(record))
+
+    async def refresh(self, item_id: int) -> None:
+        """Reloads one item, called when its row changes elsewhere."""
+        record = await self.pool.fetchrow("SELECT * FROM items WHERE item_id = $1", item_id)
+        self._remove(item_id)
+        if record is not None:
+            self._add(CatalogItem(record))
+
+    def set_stock(self, item_id: int, stock: int) -> None:
+        item = self._items.get(item_id)
+        if item is not None:
+            item.stock = stock
+
+    def _add(self, item: CatalogItem) -> None:
+        self._items[item.item_id] = item
+        self._names.setdefault(item.item_name.casefold(), item.item_id)
+        grams = self._grams[item.item_id] = trigrams(item.item_name)
+        for gram in grams:
+            self._index.setdefault(gram, set()).add(item.item_id)
+
+    def _remove(self, item_id: int) -> None:
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        name = item.item_name.casefold()
+        if self._names.get(name) == item_id:
+            del self._names[name]
+            # another item may share the name.
+            for other in self._items.values():
+                if other.item_name.casefold() == name:
+                    self._names[name] = other.item_id
+                    break
+        for gram in self._grams.pop(item_id):
+            ids = self._index[gram]
+            ids.discard(item_id)
+            if not ids:
+                del self._index[gram]
+
+    def get(self, item_id: int) -> typing.Optional[CatalogItem]:
+        return self._items.get(item_id)
+
+    def find(self, argument: str) -> typing.Optional[CatalogItem]:
+        """An item by ID or by case-insensitive name."""
+        if argument.isdigit():
+            return self._items.get(int(argument))
+        item_id = self._names.get(argument.casefold())
+        return self._items.get(item_id) if item_id is not None else None
+
+    def search(
+        self,
+        query: str,
+        *,
+        threshold: float = 0.5,
+        among: typing.Optional[typing.Container[int]] = None,
+    ) -> typing.List[CatalogItem]:
+        """The items whose names are more than `threshold` similar to `query`, most similar first.
+
+        Only the items sharing a trigram with the query are scored. `among`
+        limits the results to those item IDs, like a user's inventory.
+        """
+        grams = trigrams(query)
+        shared: typing.Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self._index.get(gram, ()))
+        scored = []
+        for item_id, count in shared.items():
+            if among is not None and item_id not in among:
+                continue
+            score = count / (len(grams) + len(self._grams[item_id]) - count)
+            if score > threshold:
+                scored.append((score, item_id))
+        scored.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [self._items[item_id] for _, item_id in scored]
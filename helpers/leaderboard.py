@@ -0,0 +1,76 @@
+import bisect
+import typing
+
+import asyncpg
+
+Key = typing.Tuple[int, int]
+
+
+class Leaderboard:
+    """Every wallet's balance, kept sorted richest first.
+
+    Entries are stored as (-balance, user_id) keys in a sorted list, so a rank
+    is one bisect and a page is one slice. It's built from `economy` once, and
+    kept up to date by the wallets whenever they see a new balance.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        self._keys: typing.List[Key] = []
+        self._balances: typing.Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._balances
+
+    def __getitem__(self, index: typing.Union[int, slice]) -> typing.Any:
+        """(user ID, balance) by rank, 0 being the richest."""
+        if isinstance(index, slice):
+            return [(user_id, -balance) for balance, user_id in self._keys[index]]
+        balance, user_id = self._keys[index]
+        return user_id, -balance
+
+    async def load(self) -> None:
+        records = await self.pool.fetch("SELECT user_id, balance FROM economy WHERE NOT deleted")
+        self._balances = {r["user_id"]: r["balance"] for r in records}
+        self._keys = sorted((-balance, user_id) for user_id, balance in self._balances.items())
+
+    def update(self, user_id: int, balance: int) -> None:
+        old = self._balances.get(user_id)
+        if old == balance:
+            return
+        if old is not None:
+            self._discard((-old, user_id))
+        self._balances[user_id] = balance
+        bisect.insort(self._keys, (-balance, user_id))
+
+    def remove(self, user_id: int) -> None:
+        old = self._balances.pop(user_id, None)
+        if old is not None:
+            self._discard((-old, user_id))
+
+    def _discard(self, key: Key) -> None:
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+
+    def get(self, user_id: int) -> typing.Optional[int]:
+        return self._balances.get(user_id)
+
+    def rank(self, user_id: int) -> typing.Optional[int]:
+        """The user's 1-based global rank, if they have a wallet."""
+        balance = self._balances.get(user_id)
+        if balance is None:
+            return None
+        return bisect.bisect_left(self._keys, (-balance, user_id)) + 1
+
+    def top(self, amount: int = 10) -> typing.List[typing.Tuple[int, int]]:
+        return self[:amount]
+
+    def among(self, user_ids: typing.Iterable[int]) -> typing.List[typing.Tuple[int, int]]:
+        """The ranking of only these users, like a guild's members. O(m log m) for m users."""
+        balances = self._balances
+        keys = sorted((-balances[user_id], user_id) for user_id in user_ids if user_id in balances)
+        return [(user_id, -balance) for balance, user_id in keys]
@@ -0,0 +1,264 @@
+import contextlib
+import json
+import logging
+import os
+import pathlib
+import time
+import typing
+from collections import Counter, defaultdict, deque
+
+import discord
+
+log = logging.getLogger("log_spool")
+
+Entry = typing.Tuple[float, discord.Embed]
+
+
+class LogCache:
+    """Bounded queue of log embeds waiting to be delivered, per guild and delivery type.
+
+    Each guild keeps up to `memory_per_guild` embeds in memory. Anything past
+    that (or past `max_memory` for the whole process) is appended to an
+    on-disk segment, `<path>/<guild_id>.jsonl`, and read back in order as the
+    in-memory queue drains. A guild never has more than `max_per_guild`
+    embeds pending; past that the oldest ones are dropped and counted.
+
+    Spilled embeds are buffered and appended to the segment `write_batch` at a
+    time, or right before the segment is read, so a busy guild doesn't open the
+    file for every embed on the event loop.
+
+    Segments that are left over when the bot stops are replayed on the next start.
+    """
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike] = "log_spool",
+        *,
+        memory_per_guild: int = 250,
+        max_memory: int = 25_000,
+        max_per_guild: int = 5_000,
+        write_batch: int = 100,
+    ) -> None:
+        self.path = pathlib.Path(path)
+        self.memory_per_guild = memory_per_guild
+        self.max_memory = max_memory
+        self.max_per_guild = max_per_guild
+        self.write_batch = write_batch
+
+        self._memory: typing.DefaultDict[int, typing.DefaultDict[str, typing.Deque[Entry]]] = defaultdict(
+            lambda: defaultdict(deque)
+        )
+        self._memory_sizes: typing.Counter[int] = Counter()
+        self._memory_total = 0
+        self._disk: typing.DefaultDict[int, typing.Counter[str]] = defaultdict(Counter)
+        self._offsets: typing.Dict[int, int] = {}
+        # spilled lines not appended to their segment yet, as (deliver type, line).
+        self._unwritten: typing.DefaultDict[int, typing.List[typing.Tuple[str, str]]] = defaultdict(list)
+
+        # metrics
+        self.dropped: typing.Counter[int] = Counter()
+        self.spilled: typing.Counter[int] = Counter()
+        self.replayed = 0
+
+        self._load()
+
+    # Queue interface
+
+    def pending(self, guild_id: int, deliver_type: typing.Optional[str] = None) -> int:
+        if deliver_type is None:
+            return self._memory_sizes[guild_id] + self._on_disk(guild_id)
+        memory = self._memory.get(guild_id, {}).get(deliver_type, ())
+        return len(memory) + self._disk.get(guild_id, {}).get(deliver_type, 0)
+
+    def keys(self) -> typing.Iterator[typing.Tuple[int, str]]:
+        """Yields every (guild_id, deliver_type) pair that has embeds pending."""
+        for guild_id in set(self._memory) | set(self._disk):
+            for deliver_type in set(self._memory.get(guild_id, ())) | set(self._disk.get(guild_id, ())):
+                if self.pending(guild_id, deliver_type):
+                    yield guild_id, deliver_type
+
+    def depths(self) -> typing.Dict[int, int]:
+        guild_ids = set(self._memory) | set(self._disk)
+        return {guild_id: depth for guild_id in guild_ids if (depth := self.pending(guild_id))}
+
+    def memory_usage(self) -> int:
+        return self._memory_total
+
+    def append(self, guild_id: int, deliver_type: str, embed: discord.Embed) -> None:
+        if self.pending(guild_id) >= self.max_per_guild:
+            self._drop_oldest(guild_id)
+
+        entry = (time.monotonic(), embed)
+        # once a guild has spilled, everything newer has to go to disk as well to keep the order.
+        if (
+            self._on_disk(guild_id)
+            or self._memory_sizes[guild_id] >= self.memory_per_guild
+            or self._memory_total >= self.max_memory
+        ):
+            self._spill(guild_id, [(deliver_type, entry)])
+        else:
+            self._push(guild_id, deliver_type, entry)
+
+    def popleft(self, guild_id: int, deliver_type: str, amount: int) -> typing.List[Entry]:
+        """Takes up to `amount` of the oldest embeds, refilling from disk when there is room.
+
+        Returns nothing while this type's embeds are on disk behind a full memory
+        tier; try again once the guild's other types have been delivered.
+        """
+        queue = self._memory[guild_id][deliver_type]
+        if len(queue) < amount and self._disk.get(guild_id, {}).get(deliver_type):
+            self._refill(guild_id)
+        batch = [queue.popleft() for _ in range(min(amount, len(queue)))]
+        self._memory_sizes[guild_id] -= len(batch)
+        self._memory_total -= len(batch)
+        return batch
+
+    def extendleft(self, guild_id: int, deliver_type: str, batch: typing.List[Entry]) -> None:
+        """Puts a batch that could not be delivered back at the front of its queue."""
+        self._memory[guild_id][deliver_type].extendleft(reversed(batch))
+        self._memory_sizes[guild_id] += len(batch)
+        self._memory_total += len(batch)
+
+    def clear(self, guild_id: int) -> None:
+        self._memory_total -= self._memory_sizes.pop(guild_id, 0)
+        self._memory.pop(guild_id, None)
+        self._disk.pop(guild_id, None)
+        self._offsets.pop(guild_id, None)
+        self._unwritten.pop(guild_id, None)
+        self._segment(guild_id).unlink(missing_ok=True)
+
+    # Memory tier
+
+    def _push(self, guild_id: int, deliver_type: str, entry: Entry) -> None:
+        self._memory[guild_id][deliver_type].append(entry)
+        self._memory_sizes[guild_id] += 1
+        self._memory_total += 1
+
+    def _drop_oldest(self, guild_id: int) -> None:
+        self.dropped[guild_id] += 1
+        queues = [q for q in self._memory[guild_id].values() if q]
+        if queues:
+            min(queues, key=lambda q: q[0][0]).popleft()
+            self._memory_sizes[guild_id] -= 1
+            self._memory_total -= 1
+            return
+        # everything is on disk, skip the first record of the segment.
+        for deliver_type, _ in self._read(guild_id, 1):
+            self._disk[guild_id][deliver_type] -= 1
+        self._maybe_remove_segment(guild_id)
+
+    # Disk tier
+
+    def _segment(self, guild_id: int) -> pathlib.Path:
+        return self.path / f"{guild_id}.jsonl"
+
+    def _on_disk(self, guild_id: int) -> int:
+        return sum(self._disk.get(guild_id, {}).values())
+
+    def _spill(self, guild_id: int, entries: typing.List[typing.Tuple[str, Entry]]) -> None:
+        now, wall = time.monotonic(), time.time()
+        unwritten = self._unwritten[guild_id]
+        unwritten.extend(
+            (deliver_type, json.dumps({"type": deliver_type, "ts": wall - (now - enqueued_at), "embed": embed.to_dict()}))
+            for deliver_type, (enqueued_at, embed) in entries
+        )
+        self._disk[guild_id].update(deliver_type for deliver_type, _ in entries)
+        self._offsets.setdefault(guild_id, 0)
+        self.spilled[guild_id] += len(entries)
+        if len(unwritten) >= self.write_batch:
+            self._write(guild_id)
+
+    def _write(self, guild_id: int) -> None:
+        """Appends the guild's buffered lines to its segment."""
+        unwritten = self._unwritten.pop(guild_id, None)
+        if not unwritten:
+            return
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with self._segment(guild_id).open("a", encoding="utf-8") as f:
+                f.writelines(line + "\n" for _, line in unwritten)
+        except OSError as e:
+            self.dropped[guild_id] += len(unwritten)
+            self._disk[guild_id].subtract(deliver_type for deliver_type, _ in unwritten)
+            self._maybe_remove_segment(guild_id)
+            log.error("Could not spill %s log embeds for guild %s", len(unwritten), guild_id, exc_info=e)
+
+    def _read(self, guild_id: int, amount: int) -> typing.Iterator[typing.Tuple[str, Entry]]:
+        self._write(guild_id)
+        offset = self._offsets.get(guild_id, 0)
+        now, wall = time.monotonic(), time.time()
+        try:
+            with self._segment(guild_id).open("rb") as f:
+                f.seek(offset)
+                for _ in range(amount):
+                    line = f.readline()
+                    if not line:
+                        # the segment is exhausted, whatever the counters say.
+                        self._disk[guild_id].clear()
+                        break
+                    self._offsets[guild_id] = offset = offset + len(line)
+                    try:
+                        record = json.loads(line)
+                        embed = discord.Embed.from_dict(record["embed"])
+                    except (ValueError, KeyError, TypeError):
+                        log.warning("Skipping corrupt log spool record for guild %s", guild_id)
+                        continue
+                    yield record["type"], (now - (wall - record["ts"]), embed)
+        except FileNotFoundError:
+            self._disk.pop(guild_id, None)
+
+    def _refill(self, guild_id: int) -> None:
+        # the segment can only be read in order, so with no room the other types have to drain first.
+        room = min(self.memory_per_guild - self._memory_sizes[guild_id], self.max_memory - self._memory_total)
+        if room <= 0:
+            return
+        for deliver_type, entry in self._read(guild_id, room):
+            self._disk[guild_id][deliver_type] -= 1
+            self._push(guild_id, deliver_type, entry)
+            self.replayed += 1
+        self._maybe_remove_segment(guild_id)
+
+    def _maybe_remove_segment(self, guild_id: int) -> None:
+        if guild_id in self._disk and not any(self._disk[guild_id].values()):
+            del self._disk[guild_id]
+            self._offsets.pop(guild_id, None)
+            self._segment(guild_id).unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        if not self.path.is_dir():
+            return
+        for segment in self.path.glob("*.jsonl"):
+            counts = Counter()
+            try:
+                guild_id = int(segment.stem)
+                with segment.open("rb") as f:
+                    for line in f:
+                        with contextlib.suppress(ValueError, KeyError, TypeError):
+                            counts[json.loads(line)["type"]] += 1
+            except (ValueError, OSError) as e:
+                log.error("Ignoring unreadable log spool segment %s", segment, exc_info=e)
+                continue
+            if counts:
+                self._disk[guild_id] = counts
+                self._offsets[guild_id] = 0
+            else:
+                segment.unlink(missing_ok=True)
+
+    def persist(self) -> None:
+        """Writes everything still held in memory to disk, so it is replayed on the next start.
+
+        Segments that were partly read are rewritten without the read lines too,
+        since the offsets aren't kept and they would be delivered twice.
+        """
+        guild_ids = {g for g, size in self._memory_sizes.items() if size}
+        guild_ids.update(g for g, offset in self._offsets.items() if offset)
+        for guild_id in guild_ids:
+            entries = sorted(
+                ((deliver_type, entry) for deliver_type, queue in self._memory[guild_id].items() for entry in queue),
+                key=lambda e: e[1][0],
+            )
+            entries.extend(self._read(guild_id, self._on_disk(guild_id)))
+            self.clear(guild_id)
+            self._spill(guild_id, entries)
+        for guild_id in list(self._unwritten):
+            self._write(guild_id)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import typing
+
+import discord
+from discord.ext import commands
+
+log = logging.getLogger("message_router")
+
+IdIndex = typing.Union[typing.Container[int], typing.Callable[[commands.Bot], typing.Container[int]]]
+Handler = typing.Callable[[typing.Any, discord.Message], typing.Awaitable[typing.Any]]
+
+FILTERS = ("guilds", "channels", "categories", "authors", "mentions")
+
+
+class MessageRoute:
+    """Which messages a routed handler wants.
+
+    Every given index must match: `guilds`, `channels`, `categories` and `authors` are
+    checked against the message's guild, channel, channel category and author IDs,
+    and `mentions` against every mentioned user. An index is either a container of
+    IDs or a callable taking the bot and returning one, for caches that get replaced.
+    `check` is an optional cheap predicate taking the bot and the message, run last.
+    """
+
+    __slots__ = ("name", "callback", "dms", "bots", *FILTERS, "check", "cog", "invocations", "failures")
+
+    def __init__(
+        self,
+        callback: Handler,
+        *,
+        dms: typing.Optional[bool] = None,
+        bots: bool = False,
+        guilds: typing.Optional[IdIndex] = None,
+        channels: typing.Optional[IdIndex] = None,
+        categories: typing.Optional[IdIndex] = None,
+        authors: typing.Optional[IdIndex] = None,
+        mentions: typing.Optional[IdIndex] = None,
+        check: typing.Optional[typing.Callable[[typing.Any, discord.Message], bool]] = None,
+    ) -> None:
+        self.name: str = callback.__qualname__
+        self.callback = callback
+        self.dms = dms
+        self.bots = bots
+        self.guilds = guilds
+        self.channels = channels
+        self.categories = categories
+        self.authors = authors
+        self.mentions = mentions
+        self.check = check
+        self.cog: typing.Optional[commands.Cog] = None
+
+        self.invocations = 0
+        self.failures = 0
+
+    def bind(self, cog: commands.Cog) -> 'MessageRoute':
+        route = MessageRoute(self.callback)
+        for attr in ("name", "dms", "bots", *FILTERS, "check"):
+            setattr(route, attr, getattr(self, attr))
+        route.cog = cog
+        return route
+
+    def matches(self, bot: commands.Bot, message: discord.Message) -> bool:
+        if message.author.bot and not self.bots:
+            return False
+        if self.dms is not None and (message.guild is None) is not self.dms:
+            return False
+        if self.guilds is not None and (message.guild is None or message.guild.id not in _resolve(self.guilds, bot)):
+            return False
+        if self.channels is not None and message.channel.id not in _resolve(self.channels, bot):
+            return False
+        if self.categories is not None and getattr(message.channel, 'category_id', None) not in _resolve(
+            self.categories, bot
+        ):
+            return False
+        if self.authors is not None and message.author.id not in _resolve(self.authors, bot):
+            return False
+        if self.mentions is not None:
+            index = _resolve(self.mentions, bot)
+            if not any(user.id in index for user in message.mentions):
+                return False
+        return self.check is None or self.check(bot, message)
+
+
+def _resolve(index: IdIndex, bot: commands.Bot) -> typing.Container[int]:
+    return index(bot) if callable(index) else index  # type: ignore
+
+
+def message_route(**filters: typing.Any) -> typing.Callable[[Handler], Handler]:
+    """Marks a cog method as a routed message handler. Takes the keyword arguments of MessageRoute.
+
+    Unlike an `on_message` listener, no task is created for messages that don't match the route.
+    """
+
+    def decorator(func: Handler) -> Handler:
+        routes = getattr(func, '__message_routes__', [])
+        routes.append(MessageRoute(func, **filters))
+        func.__message_routes__ = routes  # type: ignore
+        return func
+
+    return decorator
+
+
+class MessageRouter:
+    """Calls the routed handlers of the loaded cogs for each message that matches their route."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.routes: typing.List[MessageRoute] = []
+        self._running: typing.Set[asyncio.Task] = set()
+
+        # metrics
+        self.messages = 0
+        self.tasks = 0
+
+    def add_cog(self, cog: commands.Cog) -> None:
+        for name in dir(type(cog)):
+            func = getattr(type(cog), name, None)
+            for route in getattr(func, '__message_routes__', ()):
+                self.routes.append(route.bind(cog))
+
+    def remove_cog(self, cog: commands.Cog) -> None:
+        self.routes = [route for route in self.routes if route.cog is not cog]
+
+    def dispatch(self, message: discord.Message) -> None:
+        self.messages += 1
+        for route in self.routes:
+            try:
+                matched = route.matches(self.bot, message)
+            except Exception as e:
+                log.error("Failed to check the route of %s", route.name, exc_info=e)
+                continue
+            if matched:
+                route.invocations += 1
+                self.tasks += 1
+                task = asyncio.create_task(self._run(route, message), name=f"message-route:{route.name}")
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _run(self, route: MessageRoute, message: discord.Message) -> None:
+        try:
+            await route.callback(route.cog, message)
+        except Exception:
+            route.failures += 1
+            await self.bot.on_error(f"on_message:{route.name}", message)
+
+    def metrics(self) -> typing.List[typing.Tuple[str, int, int]]:
+        return [(route.name, route.invocations, route.failures) for route in self.routes]
@@ -0,0 +1,163 @@
+import datetime
+import logging
+import re
+import typing
+
+import asyncpg
+
+log = logging.getLogger("modlog_store")
+
+CASE_COLUMNS = "action, reason, offender, role_id, moderator, message_id, log_date, until"
+LEGACY_TABLE = re.compile(r"^modlogs_(\d+)$")
+
+
+class ModlogStore:
+    """Every guild's mod-log cases, in one `modlog_cases` table hash partitioned by guild.
+
+    Case numbers are counted per guild in `modlog_case_counters`, so they stay
+    1, 2, 3... within a guild. Every query has a fixed text, so asyncpg prepares
+    each one once per connection instead of once per guild.
+    """
+
+    def __init__(self, pool: asyncpg.Pool, *, partitions: int = 16) -> None:
+        self.pool = pool
+        self.partitions = partitions
+
+    async def setup(self) -> None:
+        partitions = "\n".join(
+            f"CREATE TABLE IF NOT EXISTS modlog_cases_p{remainder} PARTITION OF modlog_cases "
+            f"FOR VALUES WITH (MODULUS {self.partitions}, REMAINDER {remainder});"
+            for remainder in range(self.partitions)
+        )
+        await self.pool.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS modlog_cases (
+                guild_id   BIGINT      NOT NULL,
+                case_id    INTEGER     NOT NULL,
+                action     TEXT        NOT NULL,
+                reason     TEXT,
+                offender   BIGINT      NOT NULL,
+                role_id    BIGINT,
+                moderator  BIGINT,
+                message_id BIGINT,
+                log_date   TIMESTAMPTZ NOT NULL,
+                until      TIMESTAMPTZ,
+                PRIMARY KEY (guild_id, case_id)
+            ) PARTITION BY HASH (guild_id);
+            {partitions}
+            CREATE TABLE IF NOT EXISTS modlog_case_counters (
+                guild_id  BIGINT  PRIMARY KEY,
+                last_case INTEGER NOT NULL
+            );
+            """
+        )
+        # before anything is logged, so new cases are numbered after the legacy ones instead of colliding with them.
+        await self.migrate_legacy()
+
+    async def create(
+        self,
+        guild_id: int,
+        action: str,
+        offender: int,
+        log_date: datetime.datetime,
+        *,
+        reason: typing.Optional[str] = None,
+        role_id: typing.Optional[int] = None,
+        moderator: typing.Optional[int] = None,
+        until: typing.Optional[datetime.datetime] = None,
+    ) -> int:
+        """Logs a new case, returning its number."""
+        # the counter row is locked until the insert commits, so concurrent cases of a guild get distinct numbers.
+        return await self.pool.fetchval(
+            """
+            WITH counter AS (
+                INSERT INTO modlog_case_counters (guild_id, last_case) VALUES ($1, 1)
+                ON CONFLICT (guild_id) DO UPDATE SET last_case = modlog_case_counters.last_case + 1
+                RETURNING last_case
+            )
+            INSERT INTO modlog_cases (guild_id, case_id, action, reason, offender, role_id, moderator, log_date, until)
+            SELECT $1, last_case, $2, $3, $4, $5, $6, $7, $8 FROM counter
+            RETURNING case_id
+            """,
+            guild_id,
+            action,
+            reason,
+            offender,
+            role_id,
+            moderator,
+            log_date,
+            until,
+        )
+
+    async def get(self, guild_id: int, case_id: int) -> typing.Optional[asyncpg.Record]:
+        return await self.pool.fetchrow(
+            f"SELECT {CASE_COLUMNS} FROM modlog_cases WHERE guild_id = $1 AND case_id = $2", guild_id, case_id
+        )
+
+    async def update(self, guild_id: int, case_id: int, **columns: typing.Any) -> bool:
+        """Updates some of a case's columns, returning whether the case exists."""
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, start=3))
+        status = await self.pool.execute(
+            f"UPDATE modlog_cases SET {assignments} WHERE guild_id = $1 AND case_id = $2",
+            guild_id,
+            case_id,
+            *columns.values(),
+        )
+        return status != "UPDATE 0"
+
+    async def clear(self, guild_id: int) -> None:
+        """Deletes a guild's cases, and starts counting them from 1 again."""
+        async with self.pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("DELETE FROM modlog_cases WHERE guild_id = $1", guild_id)
+                await conn.execute("DELETE FROM modlog_case_counters WHERE guild_id = $1", guild_id)
+
+    async def migrate_legacy(self) -> typing.Dict[int, int]:
+        """Moves the cases of the old per guild `modlogs.modlogs_<guild_id>` tables in, dropping each table after.
+
+        Each guild is moved in its own transaction, so running it again picks up where it stopped.
+        A table is only dropped if all of its cases were moved. If some case numbers were already
+        taken, it is kept for a look by hand. Returns how many cases were moved per guild.
+        """
+        tables = await self.pool.fetch("SELECT tablename FROM pg_tables WHERE schemaname = 'modlogs'")
+        moved: typing.Dict[int, int] = {}
+        for record in tables:
+            match = LEGACY_TABLE.match(record["tablename"])
+            if not match:
+                continue
+            guild_id = int(match.group(1))
+            table = f'modlogs."{record["tablename"]}"'
+            async with self.pool.acquire() as conn:
+                async with conn.transaction():
+                    total = await conn.fetchval(f"SELECT COUNT(*) FROM {table}")
+                    status = await conn.execute(
+                        f"INSERT INTO modlog_cases (guild_id, case_id, {CASE_COLUMNS}) "
+                        f"SELECT $1, case_id, {CASE_COLUMNS} FROM {table} "
+                        "ON CONFLICT (guild_id, case_id) DO NOTHING",
+                        guild_id,
+                    )
+                    # counting from the highest case of either, so no new case reuses a legacy number.
+                    await conn.execute(
+                        "INSERT INTO modlog_case_counters (guild_id, last_case) "
+                        "SELECT $1, GREATEST("
+                        "(SELECT COALESCE(MAX(case_id), 0) FROM modlog_cases WHERE guild_id = $1), "
+                        f"(SELECT COALESCE(MAX(case_id), 0) FROM {table})) "
+                        "ON CONFLICT (guild_id) DO UPDATE SET last_case = GREATEST(modlog_case_counters.last_case, "
+                        "EXCLUDED.last_case)",
+                        guild_id,
+                    )
+                    copied = int(status.split()[-1])
+                    if copied == total:
+                        await conn.execute(f"DROP TABLE {table}")
+            moved[guild_id] = copied
+            if copied < total:
+                log.warning(
+                    "Only moved %s of %s mod-log cases of %s, their case numbers were taken. Kept %s",
+                    copied,
+                    total,
+                    guild_id,
+                    table,
+                )
+            else:
+                log.info("Moved %s mod-log cases of %s", copied, guild_id)
+        return moved
@@ -240,15 +240,16 @@ class ViewPaginator(discord.ui.View):
                     child.disabled = True
                 await self.message.edit(view=self)
 
-    async def start(self, *, start_message: discord.Message = None) -> None:
+    async def start(self, *, start_message: discord.Message = None, page_number: int = 0) -> None:
         if self.check_embeds and not self.ctx.channel.permissions_for(self.ctx.me).embed_links:
             await self.ctx.send('Bot does not have embed links permission in this channel.')
             return
 
         await self.source._prepare_once()
-        page = await self.source.get_page(0)
+        page = await self.source.get_page(page_number)
+        self.current_page = page_number
         kwargs = await self._get_kwargs_from_page(page)
-        self._update_labels(0)
+        self._update_labels(page_number)
         if not start_message:
             self.message = await self.ctx.send(**kwargs, view=self)
         else:
@@ -735,6 +736,44 @@ class NodesMenu(menus.ListPageSource):
         return embed
 
 
+class LeaderboardPageSource(menus.ListPageSource):
+    """Pages of (user ID, balance) entries, richest first, like a `Leaderboard` or a slice of it."""
+
+    def __init__(
+        self,
+        entries: typing.Sequence[typing.Tuple[int, int]],
+        *,
+        ctx: CustomContext,
+        title: str,
+        emoji: str,
+        rank: typing.Optional[int] = None,
+    ):
+        super().__init__(entries, per_page=10)
+        self.ctx: CustomContext = ctx
+        self.title = title
+        self.emoji = emoji
+        self.rank = rank
+
+    async def format_page(self, menu, entries):
+        offset = menu.current_page * self.per_page
+        lines = []
+        for number, (user_id, balance) in enumerate(entries, start=offset + 1):
+            user = discord.utils.escape_markdown(str(self.ctx.bot.get_user(user_id) or 'Unknown User'))
+            line = f"`{number}`) **{user}** - {balance} {self.emoji}"
+            lines.append(f"__{line}__" if user_id == self.ctx.author.id else line)
+
+        embed = discord.Embed(
+            title=f"{self.title} (page {menu.current_page + 1}/{self.get_max_pages()})",
+            description="\n".join(lines),
+            colour=self.ctx.color,
+        )
+        footer = f"Showing users {offset + 1}-{offset + len(entries)} of {len(self.entries)}."
+        if self.rank is not None:
+            footer += f" You are #{self.rank}."
+        embed.set_footer(text=footer)
+        return embed
+
+
 class QueueMenu(menus.ListPageSource):
     def __init__(self, data, ctx) -> discord.Embed:
         self.data = data
@@ -0,0 +1,27 @@
+import re
+import typing
+
+
+class PrefixMatcher:
+    """A guild's prefixes, compiled into one regex.
+
+    Prefixes are tried longest first, and a set of their first characters lets
+    `match` turn down most messages without running the regex at all.
+    """
+
+    __slots__ = ("prefixes", "_first_chars", "_pattern")
+
+    def __init__(self, prefixes: typing.Iterable[str], mentions: typing.Iterable[str] = ()) -> None:
+        self.prefixes: typing.Tuple[str, ...] = tuple(
+            dict.fromkeys(p for p in (*prefixes, *mentions) if isinstance(p, str) and p)
+        )
+        ordered = sorted(self.prefixes, key=len, reverse=True)
+        self._first_chars = frozenset(p[0] for p in ordered)
+        self._pattern = re.compile("|".join(map(re.escape, ordered))) if ordered else None
+
+    def match(self, content: str) -> typing.Optional[str]:
+        """Returns the prefix the content starts with, if any."""
+        if not content or content[0] not in self._first_chars:
+            return None
+        match = self._pattern.match(content)  # type: ignore # not None if there are first chars
+        return match.group() if match else None
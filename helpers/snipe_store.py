@@ -0,0 +1,129 @@
+import time
+import typing
+from collections import OrderedDict, deque
+
+if typing.TYPE_CHECKING:
+    from cogs.moderation.snipe import SimpleMessage
+
+ChannelKey = typing.Tuple[int, int]
+Entry = typing.Tuple[float, 'SimpleMessage']
+
+
+class SnipeStore:
+    """Holds recently deleted messages per channel, within a global memory budget.
+
+    Channels are kept in least-recently-used order. Entries older than `ttl`
+    seconds are expired, and while the estimated size of every stored message
+    is above `max_bytes`, the coldest channel is evicted as a whole.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 6 * 60 * 60,
+        per_channel: int = 50,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.per_channel = per_channel
+
+        self._channels: typing.OrderedDict[ChannelKey, typing.Deque[Entry]] = OrderedDict()
+        self._guilds: typing.Dict[int, typing.Set[int]] = {}
+        self.size = 0
+        self.messages = 0
+
+        # metrics
+        self.expired = 0
+        self.evicted_channels = 0
+        self.evicted_messages = 0
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._guilds
+
+    def add(self, guild_id: int, channel_id: int, message: 'SimpleMessage') -> None:
+        key = (guild_id, channel_id)
+        try:
+            entries = self._channels[key]
+            self._channels.move_to_end(key)
+        except KeyError:
+            entries = self._channels[key] = deque()
+            self._guilds.setdefault(guild_id, set()).add(channel_id)
+
+        if len(entries) >= self.per_channel:
+            self._forget(entries.popleft()[1])
+        entries.append((time.monotonic(), message))
+        self.size += message.size
+        self.messages += 1
+
+        self._expire_cold()
+        while self.size > self.max_bytes and len(self._channels) > 1:
+            evicted_key = next(iter(self._channels))
+            self.evicted_messages += len(self._channels[evicted_key])
+            self.evicted_channels += 1
+            self._drop_channel(evicted_key)
+
+    def get(self, guild_id: int, channel_id: int) -> typing.List['SimpleMessage']:
+        """Returns the channel's deleted messages, oldest first."""
+        key = (guild_id, channel_id)
+        entries = self._channels.get(key)
+        if not entries:
+            return []
+        self._expire(key, entries)
+        if key in self._channels:
+            self._channels.move_to_end(key)
+        return [message for _, message in entries]
+
+    def remove_channel(self, guild_id: int, channel_id: int) -> None:
+        self._drop_channel((guild_id, channel_id))
+
+    def remove_guild(self, guild_id: int) -> None:
+        for channel_id in list(self._guilds.get(guild_id, ())):
+            self._drop_channel((guild_id, channel_id))
+
+    def footprint(self) -> typing.Dict[str, int]:
+        return {
+            "guilds": len(self._guilds),
+            "channels": len(self._channels),
+            "messages": self.messages,
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "expired": self.expired,
+            "evicted_channels": self.evicted_channels,
+            "evicted_messages": self.evicted_messages,
+        }
+
+    def _forget(self, message: 'SimpleMessage') -> None:
+        self.size -= message.size
+        self.messages -= 1
+
+    def _expire(self, key: ChannelKey, entries: typing.Deque[Entry]) -> None:
+        deadline = time.monotonic() - self.ttl
+        while entries and entries[0][0] < deadline:
+            self._forget(entries.popleft()[1])
+            self.expired += 1
+        if not entries:
+            self._drop_channel(key)
+
+    def _expire_cold(self) -> None:
+        # the coldest channels are first, so stop at the first one that still has fresh messages.
+        deadline = time.monotonic() - self.ttl
+        while self._channels:
+            key, entries = next(iter(self._channels.items()))
+            if entries[-1][0] >= deadline:
+                break
+            self.expired += len(entries)
+            self._drop_channel(key)
+
+    def _drop_channel(self, key: ChannelKey) -> None:
+        entries = self._channels.pop(key, None)
+        if entries is None:
+            return
+        for _, message in entries:
+            self._forget(message)
+        guild_id, channel_id = key
+        channels = self._guilds.get(guild_id)
+        if channels is not None:
+            channels.discard(channel_id)
+            if not channels:
+                del self._guilds[guild_id]
@@ -0,0 +1,271 @@
+import asyncio
+import datetime
+import json
+import logging
+import typing
+from collections import defaultdict
+
+import asyncpg
+import discord
+
+if typing.TYPE_CHECKING:
+    from helpers.bot_base import BaseDuck
+
+log = logging.getLogger("timers")
+
+TimerKey = typing.Tuple[str, str]
+
+
+class Timer:
+    """A scheduled event. `key` identifies it within its event, so scheduling it again reschedules it."""
+
+    __slots__ = ("id", "event", "key", "expires", "data")
+
+    def __init__(self, id: int, event: str, key: str, expires: datetime.datetime, data: typing.Dict[str, typing.Any]):
+        self.id = id
+        self.event = event
+        self.key = key
+        self.expires = expires
+        self.data = data
+
+    @classmethod
+    def from_record(cls, record: asyncpg.Record) -> 'Timer':
+        return cls(record["id"], record["event"], record["key"], record["expires"], json.loads(record["data"]))
+
+    def __repr__(self) -> str:
+        return f"<Timer id={self.id} event={self.event!r} key={self.key!r} expires={self.expires}>"
+
+
+class TimerHeap:
+    """A binary min-heap of timers by expiry, that also knows where each timer is,
+    so that one can be removed or rescheduled in O(log n)."""
+
+    def __init__(self) -> None:
+        self._heap: typing.List[Timer] = []
+        self._positions: typing.Dict[TimerKey, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, key: TimerKey) -> bool:
+        return key in self._positions
+
+    def __iter__(self) -> typing.Iterator[Timer]:
+        return iter(self._heap)
+
+    def get(self, key: TimerKey) -> typing.Optional[Timer]:
+        position = self._positions.get(key)
+        return self._heap[position] if position is not None else None
+
+    def peek(self) -> typing.Optional[Timer]:
+        return self._heap[0] if self._heap else None
+
+    def push(self, timer: Timer) -> None:
+        """Adds the timer, replacing the one with the same key if there is one."""
+        key = (timer.event, timer.key)
+        position = self._positions.get(key)
+        if position is None:
+            self._heap.append(timer)
+            position = len(self._heap) - 1
+        else:
+            self._heap[position] = timer
+        self._positions[key] = position
+        self._sift(position)
+
+    def pop(self) -> Timer:
+        return self._remove_at(0)
+
+    def remove(self, key: TimerKey) -> typing.Optional[Timer]:
+        position = self._positions.get(key)
+        return self._remove_at(position) if position is not None else None
+
+    def _remove_at(self, position: int) -> Timer:
+        timer = self._heap[position]
+        last = self._heap.pop()
+        del self._positions[(timer.event, timer.key)]
+        if position < len(self._heap):
+            self._heap[position] = last
+            self._positions[(last.event, last.key)] = position
+            self._sift(position)
+        return timer
+
+    def _less(self, a: int, b: int) -> bool:
+        first, second = self._heap[a], self._heap[b]
+        return (first.expires, first.id) < (second.expires, second.id)
+
+    def _swap(self, a: int, b: int) -> None:
+        heap = self._heap
+        heap[a], heap[b] = heap[b], heap[a]
+        self._positions[(heap[a].event, heap[a].key)] = a
+        self._positions[(heap[b].event, heap[b].key)] = b
+
+    def _sift(self, position: int) -> None:
+        # up, for an earlier expiry
+        while position > 0:
+            parent = (position - 1) // 2
+            if not self._less(position, parent):
+                break
+            self._swap(position, parent)
+            position = parent
+        # down, for a later one
+        size = len(self._heap)
+        while True:
+            smallest = position
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < size and self._less(child, smallest):
+                    smallest = child
+            if smallest == position:
+                break
+            self._swap(position, smallest)
+            position = smallest
+
+
+class TimerService:
+    """Durable timers, kept in the `timers` table and in a TimerHeap.
+
+    When timers expire, every due timer of an event is handed over at once in a
+    `on_<event>_timers_complete(timers)` event, and they are all deleted with a
+    single query afterwards. Timers survive restarts; one that was due while the
+    bot was offline fires as soon as it is ready again.
+    """
+
+    def __init__(self, bot: 'BaseDuck', *, max_sleep: float = 3600.0) -> None:
+        self.bot = bot
+        self.max_sleep = max_sleep
+        self._heap = TimerHeap()
+        self._wakeup = asyncio.Event()
+        self._task: typing.Optional[asyncio.Task] = None
+
+        # metrics
+        self.fired = 0
+        self.batches = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def pool(self) -> asyncpg.Pool:
+        return self.bot.db
+
+    async def start(self) -> None:
+        await self.pool.execute(
+            """
+            CREATE TABLE IF NOT EXISTS timers (
+                id BIGSERIAL PRIMARY KEY,
+                event TEXT NOT NULL,
+                key TEXT NOT NULL,
+                expires TIMESTAMPTZ NOT NULL,
+                data JSONB NOT NULL DEFAULT '{}'::JSONB,
+                created TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                UNIQUE (event, key)
+            );
+            CREATE INDEX IF NOT EXISTS timers_expires_idx ON timers (expires);
+            """
+        )
+        await self.load()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="timers")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def load(self, event: typing.Optional[str] = None) -> int:
+        """Loads the stored timers, or only one event's, into memory."""
+        records = await self.pool.fetch("SELECT * FROM timers WHERE $1::TEXT IS NULL OR event = $1", event)
+        for record in records:
+            self._heap.push(Timer.from_record(record))
+        self._wakeup.set()
+        return len(records)
+
+    def get(self, event: str, key: str) -> typing.Optional[Timer]:
+        return self._heap.get((event, key))
+
+    async def create(self, event: str, key: str, expires: datetime.datetime, **data: typing.Any) -> Timer:
+        """Schedules a timer, or reschedules it if one with this key exists."""
+        record = await self.pool.fetchrow(
+            "INSERT INTO timers (event, key, expires, data) VALUES ($1, $2, $3, $4::JSONB) "
+            "ON CONFLICT (event, key) DO UPDATE SET expires = EXCLUDED.expires, data = EXCLUDED.data "
+            "RETURNING *",
+            event,
+            key,
+            expires,
+            json.dumps(data),
+        )
+        timer = Timer.from_record(record)
+        self._heap.push(timer)
+        if self._heap.peek() is timer:
+            self._wakeup.set()
+        return timer
+
+    async def cancel(self, event: str, key: str) -> bool:
+        return await self.cancel_many(event, [key]) > 0
+
+    async def cancel_many(self, event: str, keys: typing.Iterable[str]) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        await self.pool.execute("DELETE FROM timers WHERE event = $1 AND key = ANY($2::TEXT[])", event, keys)
+        return sum(self._heap.remove((event, key)) is not None for key in keys)
+
+    async def cancel_prefix(self, event: str, prefix: str) -> int:
+        """Cancels every timer of the event whose key starts with `prefix`. This one is O(n)."""
+        await self.pool.execute("DELETE FROM timers WHERE event = $1 AND starts_with(key, $2)", event, prefix)
+        keys = [timer.key for timer in self._heap if timer.event == event and timer.key.startswith(prefix)]
+        for key in keys:
+            self._heap.remove((event, key))
+        return len(keys)
+
+    async def _run(self) -> None:
+        # listeners are only added once the extensions load.
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            timer = self._heap.peek()
+            if timer is None:
+                await self._wakeup.wait()
+                continue
+            delay = (timer.expires - discord.utils.utcnow()).total_seconds()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=min(delay, self.max_sleep))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._fire_due()
+
+    async def _fire_due(self) -> None:
+        now = discord.utils.utcnow()
+        due: typing.List[Timer] = []
+        while (timer := self._heap.peek()) is not None and timer.expires <= now:
+            due.append(self._heap.pop())
+
+        by_event: typing.DefaultDict[str, typing.List[Timer]] = defaultdict(list)
+        for timer in due:
+            by_event[timer.event].append(timer)
+        for event, timers in by_event.items():
+            self.bot.dispatch(f"{event}_timers_complete", timers)
+        self.fired += len(due)
+        self.batches += 1
+
+        try:
+            # matched on expiry too, so a timer rescheduled meanwhile is kept.
+            await self.pool.execute(
+                "DELETE FROM timers USING UNNEST($1::BIGINT[], $2::TIMESTAMPTZ[]) AS v(id, expires) "
+                "WHERE timers.id = v.id AND timers.expires = v.expires",
+                [timer.id for timer in due],
+                [timer.expires for timer in due],
+            )
+        except Exception as e:
+            # they are fired again after a restart, which the handlers are fine with.
+            log.error("Failed to delete %s fired timers", len(due), exc_info=e)
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        upcoming = self._heap.peek()
+        return {
+            "pending": len(self._heap),
+            "next": upcoming.expires.isoformat() if upcoming else None,
+            "fired": self.fired,
+            "batches": self.batches,
+        }
@@ -0,0 +1,89 @@
+import time
+import typing
+from collections import defaultdict
+
+import asyncpg
+
+# (giver ID, receiver ID, item ID, amount)
+Transfer = typing.Tuple[int, int, int, int]
+
+
+class SettlementFailed(Exception):
+    """A trade couldn't be settled, and nothing was exchanged."""
+
+
+class Settlement(typing.NamedTuple):
+    """What a settled trade changed."""
+
+    # (user ID, item ID) to how much the user's amount of the item changed.
+    items: typing.Dict[typing.Tuple[int, int], int]
+    # user ID to their balance after the trade, for the users whose money changed.
+    balances: typing.Dict[int, int]
+    money: typing.Dict[int, int]
+    round_trips: int
+    duration: float
+
+
+def net_items(transfers: typing.Iterable[Transfer]) -> typing.Dict[typing.Tuple[int, int], int]:
+    """Sums the transfers into one change per (user, item), leaving out the ones that cancel out.
+
+    Each row may only be touched once by a statement, so a user giving and
+    receiving the same item has to be one change.
+    """
+    deltas: typing.DefaultDict[typing.Tuple[int, int], int] = defaultdict(int)
+    for giver, receiver, item_id, amount in transfers:
+        deltas[giver, item_id] -= amount
+        deltas[receiver, item_id] += amount
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+async def settle(
+    conn: asyncpg.Connection,
+    transfers: typing.Iterable[Transfer],
+    money: typing.Optional[typing.Mapping[int, int]] = None,
+) -> Settlement:
+    """Exchanges the items and money of a trade in one transaction, or raises `SettlementFailed` and changes nothing.
+
+    The items take one `unnest` upsert however many there are, and the money one
+    more UPDATE if any changes hands, so a trade costs at most four round trips
+    including BEGIN and COMMIT.
+    """
+    start = time.perf_counter()
+    items = net_items(transfers)
+    money = {user_id: delta for user_id, delta in (money or {}).items() if delta}
+    balances: typing.Dict[int, int] = {}
+    round_trips = 2
+    async with conn.transaction():
+        if items:
+            users, item_ids, deltas = zip(*((user_id, item_id, delta) for (user_id, item_id), delta in items.items()))
+            # a row that would go below 0 isn't updated, and a missing one is inserted with a negative amount,
+            # so either leaves a row out of the result or returns it negative.
+            rows = await conn.fetch(
+                "INSERT INTO inventory (user_id, item_id, amount) "
+                "SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::bigint[]) "
+                "ON CONFLICT (user_id, item_id) DO UPDATE SET amount = inventory.amount + EXCLUDED.amount "
+                "WHERE inventory.amount + EXCLUDED.amount >= 0 "
+                "RETURNING user_id, item_id, amount",
+                users,
+                item_ids,
+                deltas,
+            )
+            round_trips += 1
+            short = set(items) - {(r["user_id"], r["item_id"]) for r in rows if r["amount"] >= 0}
+            if short:
+                raise SettlementFailed(f"{len(short)} of the traded items are no longer in their owner's storage box")
+        if money:
+            users, deltas = zip(*money.items())
+            rows = await conn.fetch(
+                "UPDATE economy SET balance = economy.balance + d.delta "
+                "FROM unnest($1::bigint[], $2::bigint[]) AS d(user_id, delta) "
+                "WHERE economy.user_id = d.user_id AND NOT economy.deleted AND economy.balance + d.delta >= 0 "
+                "RETURNING economy.user_id, economy.balance",
+                users,
+                deltas,
+            )
+            round_trips += 1
+            balances = {r["user_id"]: r["balance"] for r in rows}
+            if len(balances) != len(money):
+                raise SettlementFailed("one of the traders doesn't have the money they offered anymore")
+    return Settlement(items, balances, money, round_trips, time.perf_counter() - start)
@@ -0,0 +1,84 @@
+import typing
+from collections import OrderedDict
+
+if typing.TYPE_CHECKING:
+    from cogs.economy.helper_classes import Wallet
+
+
+class WalletCache:
+    """The loaded wallets by user ID, in least-recently-used order.
+
+    Once there are more than `max_size`, the coldest wallets are dropped, except
+    for those in use: a wallet whose lock is held or that is in a trade is never
+    evicted, so whoever holds it keeps the only copy. Balances are changed with
+    SQL deltas, so a dropped wallet is simply loaded again when it is needed.
+    """
+
+    def __init__(self, *, max_size: int = 5000) -> None:
+        self.max_size = max_size
+        self._wallets: typing.OrderedDict[int, 'Wallet'] = OrderedDict()
+
+        # metrics
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._wallets)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._wallets
+
+    def __getitem__(self, user_id: int) -> 'Wallet':
+        wallet = self.get(user_id)
+        if wallet is None:
+            raise KeyError(user_id)
+        return wallet
+
+    def __setitem__(self, user_id: int, wallet: 'Wallet') -> None:
+        self._wallets[user_id] = wallet
+        self._wallets.move_to_end(user_id)
+        self._evict()
+
+    def __delitem__(self, user_id: int) -> None:
+        del self._wallets[user_id]
+
+    def get(self, user_id: int) -> typing.Optional['Wallet']:
+        wallet = self._wallets.get(user_id)
+        if wallet is None:
+            self.misses += 1
+            return None
+        self._wallets.move_to_end(user_id)
+        self.hits += 1
+        return wallet
+
+    def pop(self, user_id: int, default: typing.Any = None) -> typing.Any:
+        return self._wallets.pop(user_id, default)
+
+    @staticmethod
+    def in_use(wallet: 'Wallet') -> bool:
+        return wallet.lock.locked() or wallet.trade_session is not None
+
+    def _evict(self) -> None:
+        excess = len(self._wallets) - self.max_size
+        if excess <= 0:
+            return
+        # the wallets in use are skipped, the cache may stay over size if there are too many of them.
+        evictable = []
+        for user_id, wallet in self._wallets.items():
+            if not self.in_use(wallet):
+                evictable.append(user_id)
+                if len(evictable) == excess:
+                    break
+        for user_id in evictable:
+            del self._wallets[user_id]
+        self.evicted += len(evictable)
+
+    def metrics(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "wallets": len(self._wallets),
+            "in_use": sum(self.in_use(wallet) for wallet in self._wallets.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }